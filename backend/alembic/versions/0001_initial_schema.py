@@ -0,0 +1,101 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+The schema as Base.metadata.create_all() built it before migrations were
+introduced. Tables and indexes that already exist are left alone, so
+databases created by create_all() are adopted by upgrading them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _create_table(inspector, name, *columns):
+    if not inspector.has_table(name):
+        op.create_table(name, *columns)
+
+def _create_index(inspector, name, table, columns, unique=False):
+    if name not in {index["name"] for index in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns, unique=unique)
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    _create_table(
+        inspector, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    _create_table(
+        inspector, "workflows",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("is_public", sa.Boolean()),
+        sa.Column("forked_from", sa.Integer(), sa.ForeignKey("workflows.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    _create_table(
+        inspector, "workflow_nodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id")),
+        sa.Column("node_id", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("position", sa.JSON()),
+        sa.Column("data", sa.JSON()),
+    )
+    _create_table(
+        inspector, "workflow_edges",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id")),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("target", sa.String(), nullable=False),
+    )
+    _create_table(
+        inspector, "workflow_executions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id")),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("status", sa.String()),
+        sa.Column("input_data", sa.JSON()),
+        sa.Column("output_data", sa.JSON()),
+        sa.Column("node_states", sa.JSON()),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    inspector = sa.inspect(op.get_bind())
+    _create_index(inspector, "ix_users_id", "users", ["id"])
+    _create_index(inspector, "ix_users_email", "users", ["email"], unique=True)
+    _create_index(inspector, "ix_users_username", "users", ["username"], unique=True)
+    _create_index(inspector, "ix_workflows_id", "workflows", ["id"])
+    _create_index(inspector, "ix_workflows_user_id", "workflows", ["user_id", "id"])
+    _create_index(inspector, "ix_workflows_user_name", "workflows", ["user_id", "name", "id"])
+    _create_index(inspector, "ix_workflows_public_id", "workflows", ["is_public", "id"])
+    _create_index(inspector, "ix_workflows_public_name", "workflows", ["is_public", "name", "id"])
+    _create_index(inspector, "ix_workflow_nodes_id", "workflow_nodes", ["id"])
+    _create_index(inspector, "ix_workflow_nodes_workflow_id", "workflow_nodes", ["workflow_id"])
+    _create_index(inspector, "ix_workflow_edges_id", "workflow_edges", ["id"])
+    _create_index(inspector, "ix_workflow_edges_workflow_id", "workflow_edges", ["workflow_id"])
+    _create_index(inspector, "ix_workflow_executions_id", "workflow_executions", ["id"])
+
+def downgrade():
+    op.drop_table("workflow_executions")
+    op.drop_table("workflow_edges")
+    op.drop_table("workflow_nodes")
+    op.drop_table("workflows")
+    op.drop_table("users")
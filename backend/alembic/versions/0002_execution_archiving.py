@@ -0,0 +1,30 @@
+"""Execution history indexes and archiving
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("workflow_executions") as batch:
+        batch.add_column(sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+        batch.add_column(sa.Column("archive_ref", sa.String(), nullable=True))
+
+    op.create_index("ix_workflow_executions_workflow_created", "workflow_executions", ["workflow_id", "created_at"])
+    op.create_index("ix_workflow_executions_archived_created", "workflow_executions", ["archived_at", "created_at"])
+    op.create_index("ix_workflow_executions_created", "workflow_executions", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_workflow_executions_created", "workflow_executions")
+    op.drop_index("ix_workflow_executions_archived_created", "workflow_executions")
+    op.drop_index("ix_workflow_executions_workflow_created", "workflow_executions")
+    with op.batch_alter_table("workflow_executions") as batch:
+        batch.drop_column("archive_ref")
+        batch.drop_column("archived_at")
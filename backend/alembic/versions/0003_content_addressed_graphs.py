@@ -0,0 +1,170 @@
+"""Content-addressed workflow graphs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Moves workflow_nodes/workflow_edges rows into shared, content-addressed
+node_definitions and workflow_graphs, and points each workflow at its
+graph version through workflows.graph_hash.
+"""
+from collections import defaultdict
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+workflows = sa.table("workflows", sa.column("id", sa.Integer), sa.column("graph_hash", sa.String))
+workflow_nodes = sa.table(
+    "workflow_nodes",
+    sa.column("id", sa.Integer), sa.column("workflow_id", sa.Integer), sa.column("node_id", sa.String),
+    sa.column("type", sa.String), sa.column("position", sa.JSON), sa.column("data", sa.JSON),
+)
+workflow_edges = sa.table(
+    "workflow_edges",
+    sa.column("id", sa.Integer), sa.column("workflow_id", sa.Integer),
+    sa.column("source", sa.String), sa.column("target", sa.String),
+)
+node_definitions = sa.table(
+    "node_definitions", sa.column("hash", sa.String), sa.column("type", sa.String), sa.column("data", sa.JSON),
+)
+workflow_graphs = sa.table(
+    "workflow_graphs", sa.column("hash", sa.String), sa.column("nodes", sa.JSON), sa.column("edges", sa.JSON),
+)
+
+# Same encoding as app.services.workflow_graphs.content_hash
+def content_hash(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _insert_missing(conn, table, rows):
+    if not rows:
+        return
+    existing = set(conn.execute(sa.select(table.c.hash).where(table.c.hash.in_(list(rows)))).scalars())
+    missing = [row for key, row in rows.items() if key not in existing]
+    if missing:
+        conn.execute(table.insert(), missing)
+
+def upgrade():
+    op.create_table(
+        "node_definitions",
+        sa.Column("hash", sa.String(64), primary_key=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("data", sa.JSON()),
+    )
+    op.create_table(
+        "workflow_graphs",
+        sa.Column("hash", sa.String(64), primary_key=True),
+        sa.Column("nodes", sa.JSON(), nullable=False),
+        sa.Column("edges", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    with op.batch_alter_table("workflows") as batch:
+        batch.add_column(sa.Column("graph_hash", sa.String(64), nullable=True))
+        batch.create_foreign_key("fk_workflows_graph_hash", "workflow_graphs", ["graph_hash"], ["hash"])
+        batch.create_index("ix_workflows_graph_hash", ["graph_hash"])
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        ids = conn.execute(
+            sa.select(workflows.c.id).where(workflows.c.id > last_id).order_by(workflows.c.id).limit(BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+
+        nodes = defaultdict(list)
+        for row in conn.execute(
+            sa.select(workflow_nodes).where(workflow_nodes.c.workflow_id.in_(ids)).order_by(workflow_nodes.c.id)
+        ):
+            nodes[row.workflow_id].append(row)
+        edges = defaultdict(list)
+        for row in conn.execute(
+            sa.select(workflow_edges).where(workflow_edges.c.workflow_id.in_(ids)).order_by(workflow_edges.c.id)
+        ):
+            edges[row.workflow_id].append({"source": row.source, "target": row.target})
+
+        definitions, graphs, updates = {}, {}, []
+        for workflow_id in ids:
+            graph_nodes = []
+            for node in nodes[workflow_id]:
+                key = content_hash({"type": node.type, "data": node.data})
+                definitions[key] = {"hash": key, "type": node.type, "data": node.data}
+                graph_nodes.append({"node_id": node.node_id, "position": node.position, "definition": key})
+            graph = {"nodes": graph_nodes, "edges": edges[workflow_id]}
+            key = content_hash(graph)
+            graphs[key] = {"hash": key, **graph}
+            updates.append({"workflow_id": workflow_id, "graph_hash": key})
+
+        _insert_missing(conn, node_definitions, definitions)
+        _insert_missing(conn, workflow_graphs, graphs)
+        conn.execute(
+            workflows.update().where(workflows.c.id == sa.bindparam("workflow_id")).values(
+                graph_hash=sa.bindparam("graph_hash")
+            ),
+            updates
+        )
+        last_id = ids[-1]
+
+    op.drop_table("workflow_edges")
+    op.drop_table("workflow_nodes")
+
+def downgrade():
+    op.create_table(
+        "workflow_nodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id")),
+        sa.Column("node_id", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("position", sa.JSON()),
+        sa.Column("data", sa.JSON()),
+    )
+    op.create_index("ix_workflow_nodes_id", "workflow_nodes", ["id"])
+    op.create_index("ix_workflow_nodes_workflow_id", "workflow_nodes", ["workflow_id"])
+    op.create_table(
+        "workflow_edges",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id")),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("target", sa.String(), nullable=False),
+    )
+    op.create_index("ix_workflow_edges_id", "workflow_edges", ["id"])
+    op.create_index("ix_workflow_edges_workflow_id", "workflow_edges", ["workflow_id"])
+
+    conn = op.get_bind()
+    definitions = {row.hash: row for row in conn.execute(sa.select(node_definitions))}
+    graphs = {row.hash: row for row in conn.execute(sa.select(workflow_graphs))}
+    for workflow_id, graph_hash in conn.execute(sa.select(workflows.c.id, workflows.c.graph_hash)):
+        graph = graphs.get(graph_hash)
+        if graph is None:
+            continue
+        node_rows = [
+            {
+                "workflow_id": workflow_id,
+                "node_id": node["node_id"],
+                "type": definitions[node["definition"]].type,
+                "position": node["position"],
+                "data": definitions[node["definition"]].data,
+            }
+            for node in graph.nodes
+        ]
+        if node_rows:
+            conn.execute(workflow_nodes.insert(), node_rows)
+        edge_rows = [{"workflow_id": workflow_id, **edge} for edge in graph.edges]
+        if edge_rows:
+            conn.execute(workflow_edges.insert(), edge_rows)
+
+    with op.batch_alter_table("workflows") as batch:
+        batch.drop_index("ix_workflows_graph_hash")
+        batch.drop_constraint("fk_workflows_graph_hash", type_="foreignkey")
+        batch.drop_column("graph_hash")
+    op.drop_table("workflow_graphs")
+    op.drop_table("node_definitions")
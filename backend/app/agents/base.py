@@ -1,16 +1,64 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, AsyncIterator
-from langchain.schema import BaseMessage
+from typing import Any, Dict, AsyncIterator, List
+
+from app.agents.guardrails import BaseGuardrail, build_guardrails, run_guardrails
 
 class BaseAgent(ABC):
+    # Deterministic agents without side effects can have their runs
+    # recorded and replayed for identical inputs (see app.agents.replay)
+    cacheable = False
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-    
+        self.input_guardrails: List[BaseGuardrail] = build_guardrails(
+            config.get("input_guardrails", []), config
+        )
+        self.output_guardrails: List[BaseGuardrail] = build_guardrails(
+            config.get("output_guardrails", []), config
+        )
+
     @abstractmethod
-    async def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
+    def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
+        # Implemented as an async generator
         pass
-    
+
     async def apply_guardrails(self, data: Any, guardrails: list) -> Any:
-        for guardrail in guardrails:
-            data = await guardrail.validate(data)
-        return data
\ No newline at end of file
+        # Pure checks run concurrently, transforming guardrails in order
+        return await run_guardrails(data, guardrails)
+
+    async def stream_llm(self, runnable, inputs: Dict[str, Any]) -> str:
+        """
+        Stream an LLM call, checking output guardrails on every chunk.
+
+        A violation aborts the stream (and with it the HTTP request) instead
+        of paying for the rest of the generation. Guardrails that can only
+        judge the finished text run once the stream completes.
+        """
+        checks = []
+        final_only = []
+        for guardrail in self.output_guardrails:
+            check = guardrail.start_stream()
+            if check is None:
+                final_only.append(guardrail)
+            else:
+                checks.append(check)
+
+        parts = []
+        stream = runnable.astream(inputs)
+        try:
+            async for chunk in stream:
+                text = getattr(chunk, "content", chunk)
+                if not isinstance(text, str):
+                    text = str(text)
+                parts.append(text)
+                for check in checks:
+                    check.feed(text)
+        finally:
+            await stream.aclose()
+
+        for check in checks:
+            check.finish()
+
+        output = "".join(parts)
+        # Guardrails that transform their input (e.g. redaction) hand back the text to use
+        return await self.apply_guardrails(output, final_only)
\ No newline at end of file
@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from functools import lru_cache
+import re
+
+class BlocklistMatch(NamedTuple):
+    word: str
+    start: int
+    end: int
+
+def _build_trie(words: Iterable[str]) -> Dict[str, dict]:
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return trie
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Turn a trie into a regex that tries longer words before their prefixes."""
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if terminal else body
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class BlocklistMatcher:
+    """
+    Multi-pattern matcher for guardrail blocklists.
+
+    The blocklist is compiled once into an Aho-Corasick automaton
+    (pyahocorasick) so a scan is a single pass over the text regardless of
+    how many words are blocked. Without the C extension it falls back to one
+    trie-shaped regular expression. Every occurrence is reported, including
+    overlapping ones (the regex fallback keeps only the longest word per start
+    offset); offsets always refer to the original text.
+    """
+
+    def __init__(self, words: Iterable[str], case_sensitive: bool = False, whole_words: bool = False):
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+
+        # Folded form -> word as configured, used to report matches
+        self._canonical: Dict[str, str] = {}
+        for word in words:
+            if word:
+                self._canonical.setdefault(self._fold(word), word)
+        self.max_word_length = max((len(w) for w in self._canonical), default=0)
+
+        self._automaton: Any = None
+        self._pattern: Optional[re.Pattern] = None
+        self._ignorecase_pattern: Optional[re.Pattern] = None
+        if self._canonical:
+            try:
+                import ahocorasick
+                self._automaton = ahocorasick.Automaton()
+                for key in self._canonical:
+                    self._automaton.add_word(key, key)
+                self._automaton.make_automaton()
+            except ImportError:
+                self._pattern = self._compile_pattern(0)
+
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _compile_pattern(self, flags: int) -> re.Pattern:
+        body = _trie_pattern(_build_trie(self._canonical))
+        if self.whole_words:
+            return re.compile(rf"(?<!\w)(?=({body})(?!\w))", flags)
+        return re.compile(rf"(?=({body}))", flags)
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def finditer(self, text: str) -> Iterator[BlocklistMatch]:
+        if not self._canonical:
+            return iter(())
+
+        # Fold the whole text once; matching on the folded copy is much
+        # cheaper than a case-insensitive scan
+        folded = self._fold(text)
+        if len(folded) != len(text):
+            # A few characters change length when lowercased, which would
+            # shift offsets. Scan the original text case-insensitively instead.
+            return self._iter_ignorecase(text)
+
+        if self._pattern is not None:
+            return self._iter_pattern(self._pattern, folded)
+        return self._iter_automaton(text, folded)
+
+    def _iter_automaton(self, text: str, folded: str) -> Iterator[BlocklistMatch]:
+        for last, key in self._automaton.iter(folded):
+            start, end = last - len(key) + 1, last + 1
+            if self.whole_words and (
+                (start > 0 and _is_word_char(text[start - 1]))
+                or (end < len(text) and _is_word_char(text[end]))
+            ):
+                continue
+            yield BlocklistMatch(self._canonical[key], start, end)
+
+    def _iter_pattern(self, pattern: re.Pattern, text: str) -> Iterator[BlocklistMatch]:
+        for m in pattern.finditer(text):
+            word = self._canonical.get(self._fold(m.group(1)), m.group(1))
+            yield BlocklistMatch(word, m.start(1), m.end(1))
+
+    def _iter_ignorecase(self, text: str) -> Iterator[BlocklistMatch]:
+        if self._ignorecase_pattern is None:
+            self._ignorecase_pattern = self._compile_pattern(re.IGNORECASE)
+        return self._iter_pattern(self._ignorecase_pattern, text)
+
+    def find_all(self, text: str) -> List[BlocklistMatch]:
+        return sorted(self.finditer(text), key=lambda m: (m.start, -m.end))
+
+    def search(self, text: str) -> Optional[BlocklistMatch]:
+        return next(self.finditer(text), None)
+
+@lru_cache(maxsize=64)
+def _compile(words: Tuple[str, ...], case_sensitive: bool, whole_words: bool) -> BlocklistMatcher:
+    return BlocklistMatcher(words, case_sensitive=case_sensitive, whole_words=whole_words)
+
+def get_blocklist_matcher(
+    words: Iterable[str],
+    case_sensitive: bool = False,
+    whole_words: bool = False
+) -> BlocklistMatcher:
+    """Return the compiled matcher for a blocklist config, shared across agents."""
+    return _compile(tuple(sorted(set(words))), case_sensitive, whole_words)
\ No newline at end of file
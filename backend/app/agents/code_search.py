@@ -1,56 +1,76 @@
 from typing import Dict, Any, AsyncIterator
-import httpx
 from app.agents.base import BaseAgent
+from app.agents.guardrails import GuardrailViolation
+from app.services.github_client import GitHubRateLimitError, get_github_client
 
 class CodeSearchAgent(BaseAgent):
+    cacheable = True
+
     async def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
         query = input_data.get("query", "")
         language = input_data.get("language", "")
-        
+        per_page = input_data.get("per_page", self.config.get("per_page", 10))
+        pages = input_data.get("pages", self.config.get("pages", 1))
+
+        try:
+            query = await self.apply_guardrails(query, self.input_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Query rejected by guardrail: {e}"}
+            return
+
         yield {"status": "searching", "message": f"Searching code for: {query}"}
-        
-        # GitHub code search (simplified - in production use proper API)
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            
-            params = {
-                "q": f"{query} language:{language}" if language else query,
-                "per_page": 10
-            }
-            
-            response = await client.get(
-                "https://api.github.com/search/code",
-                headers=headers,
-                params=params
+
+        # Shared client: pooled connections, ETag revalidation, rate-limit aware
+        client = get_github_client()
+
+        try:
+            items = await client.search_code(
+                query,
+                language=language,
+                per_page=per_page,
+                pages=pages
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                results = []
-                for item in data.get("items", []):
-                    result = {
-                        "repository": item["repository"]["full_name"],
-                        "file_path": item["path"],
-                        "url": item["html_url"],
-                        "score": item["score"]
-                    }
-                    results.append(result)
-                    
-                    yield {
-                        "status": "found_code",
-                        "result": result,
-                        "message": f"Found in: {result['repository']}"
-                    }
-                
-                yield {
-                    "status": "completed",
-                    "results": results,
-                    "count": len(results),
-                    "message": f"Found {len(results)} code results"
-                }
-            else:
-                yield {
-                    "status": "error",
-                    "message": "Failed to search code"
-                }
\ No newline at end of file
+        except GitHubRateLimitError as e:
+            yield {
+                "status": "error",
+                "message": f"GitHub rate limit exceeded, retry after {int(e.reset_at)}"
+            }
+            return
+        except Exception:
+            yield {
+                "status": "error",
+                "message": "Failed to search code"
+            }
+            return
+
+        results = [
+            {
+                "repository": item["repository"]["full_name"],
+                "file_path": item["path"],
+                "url": item["html_url"],
+                "score": item.get("score")
+            }
+            for item in items
+        ]
+
+        # Checked before anything is streamed, so nothing the output
+        # guardrails reject reaches the client
+        try:
+            results = await self.apply_guardrails(results, self.output_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Results rejected by guardrail: {e}"}
+            return
+
+        for result in results:
+            yield {
+                "status": "found_code",
+                "result": result,
+                "message": f"Found in: {result['repository']}"
+            }
+
+        yield {
+            "status": "completed",
+            "results": results,
+            "count": len(results),
+            "message": f"Found {len(results)} code results"
+        }
\ No newline at end of file
@@ -1,25 +1,128 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Type
 from abc import ABC, abstractmethod
+import asyncio
+
+from app.agents.blocklist import BlocklistMatch, get_blocklist_matcher
+
+class GuardrailViolation(ValueError):
+    pass
+
+class BlockedContentError(GuardrailViolation):
+    def __init__(self, matches: List[BlocklistMatch]):
+        self.matches = matches
+        words = list(dict.fromkeys(m.word for m in matches))
+        if len(words) == 1:
+            message = f"Content contains blocked word: {words[0]}"
+        else:
+            message = f"Content contains blocked words: {', '.join(words)}"
+        super().__init__(message)
+
+class StreamCheck:
+    """
+    Incremental check over a text stream, created per LLM generation.
+    
+    `feed` is called for every chunk and raises GuardrailViolation as soon as the
+    output so far can no longer pass; `finish` is called once the stream ends.
+    """
+    
+    def feed(self, chunk: str):
+        raise NotImplementedError
+    
+    def finish(self):
+        pass
 
 class BaseGuardrail(ABC):
+    # Pure checks return their input unchanged and may run concurrently;
+    # guardrails that transform the value set this and are chained in order
+    transforms = False
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
     
     @abstractmethod
     async def validate(self, data: Any) -> Any:
         pass
+    
+    def start_stream(self) -> Optional[StreamCheck]:
+        # Guardrails that can't judge partial output only validate the final value
+        return None
+
+class ContentStreamCheck(StreamCheck):
+    def __init__(self, matcher):
+        self.matcher = matcher
+        # Keep enough trailing text to catch words split across chunks, plus
+        # one character of left context for whole-word matching
+        self._keep = matcher.max_word_length + 1
+        self._tail = ""
+        # Whether text before the tail was dropped, i.e. its first
+        # character has left context that is no longer in the buffer
+        self._truncated = False
+    
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        buffer = self._tail + chunk
+        self._check(buffer, final=False)
+        if len(buffer) > self._keep:
+            self._tail = buffer[-self._keep:]
+            self._truncated = True
+        else:
+            self._tail = buffer
+    
+    def finish(self):
+        self._check(self._tail, final=True)
+    
+    def _check(self, buffer: str, final: bool):
+        matches = []
+        for m in self.matcher.finditer(buffer):
+            if self.matcher.whole_words:
+                # Left context is unknown for a match at the very start of a
+                # truncated tail; it was already judged on the previous chunk,
+                # which still had that context
+                if m.start == 0 and self._truncated:
+                    continue
+                # A word ending at the buffer edge may continue in the next chunk
+                if m.end == len(buffer) and not final:
+                    continue
+            matches.append(m)
+        if matches:
+            raise BlockedContentError(matches)
+
+def _strings(data: Any) -> Iterator[str]:
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from _strings(value)
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            yield from _strings(item)
 
 class ContentFilter(BaseGuardrail):
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        # Compiled once per blocklist config and shared by every agent using it
+        self.matcher = get_blocklist_matcher(
+            config.get('blocked_words', []),
+            case_sensitive=config.get('case_sensitive', False),
+            whole_words=config.get('whole_words', False)
+        )
+    
+    def find_matches(self, text: str) -> List[BlocklistMatch]:
+        return self.matcher.find_all(text)
+    
     async def validate(self, data: Any) -> Any:
-        # Filter inappropriate content
-        if isinstance(data, str):
-            # Simple example - in production use proper content filtering
-            blocked_words = self.config.get('blocked_words', [])
-            for word in blocked_words:
-                if word.lower() in data.lower():
-                    raise ValueError(f"Content contains blocked word: {word}")
+        # Filter inappropriate content, including the text fields of
+        # structured results (search hits, papers...)
+        for text in _strings(data):
+            matches = self.find_matches(text)
+            if matches:
+                raise BlockedContentError(matches)
         
         return data
+    
+    def start_stream(self) -> Optional[StreamCheck]:
+        return ContentStreamCheck(self.matcher) if len(self.matcher) else None
 
 class QualityCheck(BaseGuardrail):
     async def validate(self, data: Any) -> Any:
@@ -27,10 +130,10 @@ class QualityCheck(BaseGuardrail):
         min_length = self.config.get('min_length', 10)
         
         if isinstance(data, str) and len(data) < min_length:
-            raise ValueError(f"Content too short. Minimum length: {min_length}")
+            raise GuardrailViolation(f"Content too short. Minimum length: {min_length}")
         
         if isinstance(data, list) and len(data) == 0:
-            raise ValueError("Empty results not allowed")
+            raise GuardrailViolation("Empty results not allowed")
         
         return data
 
@@ -40,15 +143,61 @@ class FormatValidator(BaseGuardrail):
         expected_format = self.config.get('format', 'any')
         
         if expected_format == 'json' and not isinstance(data, (dict, list)):
-            raise ValueError("Expected JSON format")
+            raise GuardrailViolation("Expected JSON format")
         
         if expected_format == 'text' and not isinstance(data, str):
-            raise ValueError("Expected text format")
+            raise GuardrailViolation("Expected text format")
         
         return data
 
-GUARDRAIL_MAP = {
+GUARDRAIL_MAP: Dict[str, Type[BaseGuardrail]] = {
     'content_filter': ContentFilter,
     'quality_check': QualityCheck,
     'format_validator': FormatValidator,
-}
\ No newline at end of file
+}
+
+def build_guardrails(names: List[str], config: Dict[str, Any]) -> List[BaseGuardrail]:
+    """Instantiate guardrails by name, each configured from `<name>_config`."""
+    guardrails = []
+    for name in names:
+        guardrail_class = GUARDRAIL_MAP.get(name)
+        if guardrail_class:
+            guardrails.append(guardrail_class(config.get(f"{name}_config", {})))
+    return guardrails
+
+async def _check_concurrently(data: Any, guardrails: List[BaseGuardrail]):
+    if len(guardrails) == 1:
+        await guardrails[0].validate(data)
+        return
+    tasks = [asyncio.ensure_future(g.validate(data)) for g in guardrails]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            error = task.exception()
+            if error is not None:
+                raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def run_guardrails(data: Any, guardrails: List[BaseGuardrail]) -> Any:
+    """
+    Validate `data` against the guardrails in order and return the result.
+    
+    Runs of consecutive pure checks are validated concurrently, the first
+    failure cancelling the others; a guardrail that transforms its input
+    gets the value left by the ones before it, like a sequential chain.
+    """
+    checks: List[BaseGuardrail] = []
+    for guardrail in guardrails:
+        if not guardrail.transforms:
+            checks.append(guardrail)
+            continue
+        if checks:
+            await _check_concurrently(data, checks)
+            checks = []
+        data = await guardrail.validate(data)
+    if checks:
+        await _check_concurrently(data, checks)
+    return data
@@ -1,16 +1,60 @@
-from typing import Dict, Any, AsyncIterator
+from typing import Dict, Any, AsyncIterator, List
 import arxiv
 import asyncio
+import hashlib
+import json
 from app.agents.base import BaseAgent
+from app.agents.guardrails import GuardrailViolation
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.tracing import span
 
 class LiteratureSearchAgent(BaseAgent):
+    cacheable = True
+    
     async def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
         query = input_data.get("query", "")
         max_results = input_data.get("max_results", 10)
         
+        try:
+            query = await self.apply_guardrails(query, self.input_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Query rejected by guardrail: {e}"}
+            return
+        
         yield {"status": "searching", "message": f"Searching for papers on: {query}"}
         
-        # Search arxiv
+        # Search arxiv; identical searches share one request across workers
+        raw = json.dumps([query, max_results])
+        papers = await cache.get_or_compute(
+            f"literature:arxiv:{hashlib.sha256(raw.encode()).hexdigest()}",
+            lambda: self._search_papers(query, max_results),
+            ttl=settings.LITERATURE_SEARCH_CACHE_TTL
+        )
+        
+        # Checked before anything is streamed, so nothing the output
+        # guardrails reject reaches the client
+        try:
+            papers = await self.apply_guardrails(papers, self.output_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Results rejected by guardrail: {e}"}
+            return
+        
+        for paper_info in papers:
+            yield {
+                "status": "found_paper",
+                "paper": paper_info,
+                "message": f"Found: {paper_info['title']}"
+            }
+        
+        yield {
+            "status": "completed",
+            "papers": papers,
+            "count": len(papers),
+            "message": f"Found {len(papers)} papers"
+        }
+    
+    async def _search_papers(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         search = arxiv.Search(
             query=query,
             max_results=max_results,
@@ -19,31 +63,20 @@ class LiteratureSearchAgent(BaseAgent):
         
         papers = []
         async for result in self._async_search(search):
-            paper_info = {
+            papers.append({
                 "title": result.title,
                 "authors": [author.name for author in result.authors],
                 "summary": result.summary,
                 "published": result.published.isoformat(),
                 "pdf_url": result.pdf_url,
                 "arxiv_id": result.entry_id
-            }
-            papers.append(paper_info)
-            
-            yield {
-                "status": "found_paper",
-                "paper": paper_info,
-                "message": f"Found: {result.title}"
-            }
-        
-        yield {
-            "status": "completed",
-            "papers": papers,
-            "count": len(papers),
-            "message": f"Found {len(papers)} papers"
-        }
+            })
+        return papers
     
     async def _async_search(self, search):
         loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(None, lambda: list(search.results()))
+        with span("http", service="arxiv", query=search.query, max_results=search.max_results) as request_span:
+            results = await loop.run_in_executor(None, lambda: list(search.results()))
+            request_span.set(results=len(results))
         for result in results:
             yield result
\ No newline at end of file
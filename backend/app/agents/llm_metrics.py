@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.core.metrics import llm_call_seconds, llm_calls, llm_tokens
+from app.core.tracing import start_span
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Records calls, latency and token usage per model for the LLMs it is
+    attached to (callbacks=[llm_metrics]). Token counts come from the
+    provider's usage report, so streamed calls only count tokens when the
+    model streams usage (ChatOpenAI(stream_usage=True)). Calls made within a
+    traced execution also get an "llm" span.
+    """
+
+    def __init__(self):
+        self._started: Dict[UUID, tuple] = {}
+
+    @staticmethod
+    def _model(kwargs: Dict[str, Any], serialized: Optional[Dict[str, Any]]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or (kwargs.get("metadata") or {}).get("ls_model_name")
+        if not model and serialized:
+            model = (serialized.get("kwargs") or {}).get("model_name")
+        return model or "unknown"
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any], serialized: Optional[Dict[str, Any]]):
+        model = self._model(kwargs, serialized)
+        self._started[run_id] = (model, time.perf_counter(), start_span("llm", model=model))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, kwargs, serialized)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, kwargs, serialized)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        model, start, span = started
+        llm_call_seconds.labels(model).observe(time.perf_counter() - start)
+        llm_calls.labels(model, "ok").inc()
+
+        prompt_tokens, completion_tokens = 0, 0
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        else:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+        if prompt_tokens:
+            llm_tokens.labels(model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            llm_tokens.labels(model, "completion").inc(completion_tokens)
+        if span is not None:
+            span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            model, _, span = started
+            llm_calls.labels(model, "error").inc()
+            if span is not None:
+                span.end(error)
+
+llm_metrics = LLMMetricsCallback()
@@ -1,96 +1,194 @@
-from typing import Dict, Any, AsyncIterator
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from io import BytesIO
-import base64
 from datetime import datetime
+from functools import lru_cache
+import asyncio
+import os
+import tempfile
 
 from app.agents.base import BaseAgent
+from app.agents.guardrails import GuardrailViolation
+from app.core.artifacts import get_artifact_store
+
+# How many flowables LazyStory keeps materialized ahead of the layout engine.
+# keepWithNext chains longer than this are simply laid out without the hint.
+STORY_LOOKAHEAD = 16
+
+@lru_cache(maxsize=1)
+def get_report_styles() -> Dict[str, ParagraphStyle]:
+    """Compiled paragraph styles, built once per process and shared by all reports."""
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center
+        ),
+        "heading": styles['Heading2'],
+        "normal": styles['Normal'],
+    }
+
+class LazyStory:
+    """
+    Story for platypus `build()` that pulls flowables from an iterator on demand.
+
+    reportlab consumes the story from the front (`[0]`, `del [0]`,
+    `insert(0, ...)`, `[0:0] = split_parts`), so only a small lookahead buffer
+    ever has to be materialized. Flowables are released as soon as they have
+    been drawn, which keeps memory flat no matter how many papers a report has.
+    """
+
+    def __init__(self, flowables: Iterable[Flowable], lookahead: int = STORY_LOOKAHEAD):
+        self._source: Iterator[Flowable] = iter(flowables)
+        self._buffer: List[Flowable] = []
+        self._lookahead = lookahead
+        self._exhausted = False
+
+    def _fill(self, size: int):
+        while not self._exhausted and len(self._buffer) < size:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+
+    def __len__(self) -> int:
+        self._fill(self._lookahead)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else self._lookahead)
+        elif index >= 0:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else self._lookahead)
+        else:
+            self._fill(index + 1)
+        del self._buffer[index]
+
+    def insert(self, index: int, flowable: Flowable):
+        self._buffer.insert(index, flowable)
+
+def iter_report_flowables(
+    title: str,
+    sections: Iterable[Dict[str, Any]],
+    metadata: Dict[str, Any]
+) -> Iterator[Flowable]:
+    styles = get_report_styles()
+    normal = styles["normal"]
+
+    # Title
+    yield Paragraph(title, styles["title"])
+    yield Spacer(1, 0.5*inch)
+
+    # Metadata
+    if metadata:
+        yield Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", normal)
+        if 'author' in metadata:
+            yield Paragraph(f"Author: {metadata['author']}", normal)
+        yield Spacer(1, 0.3*inch)
+
+    # Sections
+    for section in sections:
+        # Section title
+        if 'title' in section:
+            yield Paragraph(section['title'], styles["heading"])
+            yield Spacer(1, 0.2*inch)
+
+        # Section content
+        if 'content' in section:
+            # Handle different content types
+            content = section['content']
+            if isinstance(content, str):
+                for para in content.split('\n\n'):
+                    yield Paragraph(para, normal)
+                    yield Spacer(1, 0.1*inch)
+            elif isinstance(content, list):
+                for item in content:
+                    yield Paragraph(f"• {item}", normal)
+                yield Spacer(1, 0.1*inch)
+
+        # Section data (papers, code, etc.)
+        if 'data' in section:
+            data = section['data']
+            if isinstance(data, list):
+                for item in data:
+                    # Format based on item type
+                    if isinstance(item, dict) and 'title' in item:  # Paper
+                        yield Paragraph(f"<b>{item['title']}</b>", normal)
+                        if 'authors' in item:
+                            yield Paragraph(f"Authors: {', '.join(item['authors'])}", normal)
+                        if 'summary' in item:
+                            yield Paragraph(item['summary'][:200] + "...", normal)
+                        yield Spacer(1, 0.1*inch)
+
+def render_report(
+    path: str,
+    title: str,
+    sections: Iterable[Dict[str, Any]],
+    metadata: Dict[str, Any]
+) -> int:
+    """Render a report straight to `path` and return the number of pages."""
+    doc = SimpleDocTemplate(path, pagesize=letter, pageCompression=1)
+    doc.build(LazyStory(iter_report_flowables(title, sections, metadata)))
+    return doc.page
 
 class PDFGeneratorAgent(BaseAgent):
     async def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
         yield {"status": "generating", "message": "Creating PDF report..."}
-        
+
         # Extract data from input
         title = input_data.get("title", "Research Report")
         sections = input_data.get("sections", [])
         metadata = input_data.get("metadata", {})
-        
-        # Create PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        story.append(Paragraph(title, title_style))
-        story.append(Spacer(1, 0.5*inch))
-        
-        # Metadata
-        if metadata:
-            story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles['Normal']))
-            if 'author' in metadata:
-                story.append(Paragraph(f"Author: {metadata['author']}", styles['Normal']))
-            story.append(Spacer(1, 0.3*inch))
-        
-        # Sections
-        for section in sections:
-            # Section title
-            if 'title' in section:
-                story.append(Paragraph(section['title'], styles['Heading2']))
-                story.append(Spacer(1, 0.2*inch))
-            
-            # Section content
-            if 'content' in section:
-                # Handle different content types
-                content = section['content']
-                if isinstance(content, str):
-                    paragraphs = content.split('\n\n')
-                    for para in paragraphs:
-                        story.append(Paragraph(para, styles['Normal']))
-                        story.append(Spacer(1, 0.1*inch))
-                elif isinstance(content, list):
-                    for item in content:
-                        story.append(Paragraph(f"• {item}", styles['Normal']))
-                    story.append(Spacer(1, 0.1*inch))
-            
-            # Section data (papers, code, etc.)
-            if 'data' in section:
-                data = section['data']
-                if isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict):
-                            # Format based on item type
-                            if 'title' in item:  # Paper
-                                story.append(Paragraph(f"<b>{item['title']}</b>", styles['Normal']))
-                                if 'authors' in item:
-                                    story.append(Paragraph(f"Authors: {', '.join(item['authors'])}", styles['Normal']))
-                                if 'summary' in item:
-                                    story.append(Paragraph(item['summary'][:200] + "...", styles['Normal']))
-                                story.append(Spacer(1, 0.1*inch))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Get PDF bytes
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        
-        # Convert to base64 for transmission
-        pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-        
+
+        try:
+            sections = await self.apply_guardrails(sections, self.input_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Report rejected by guardrail: {e}"}
+            return
+
+        filename = f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+        # Render to a temp file off the event loop, then hand it to the artifact
+        # store; the PDF is never held in memory as a whole
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            loop = asyncio.get_event_loop()
+            pages = await loop.run_in_executor(
+                None, render_report, path, title, sections, metadata
+            )
+
+            # Only a reference is passed along; the bytes are served by
+            # /api/artifacts/{artifact_id}
+            artifact = await asyncio.to_thread(
+                get_artifact_store().put_file, path, "application/pdf", filename
+            )
+        finally:
+            os.unlink(path)
+
+        try:
+            artifact = await self.apply_guardrails(artifact, self.output_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Report rejected by guardrail: {e}"}
+            return
+
         yield {
             "status": "completed",
-            "pdf_base64": pdf_base64,
-            "filename": f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            "artifact": artifact,
+            "filename": filename,
+            "pages": pages,
             "message": "PDF report generated successfully"
         }
\ No newline at end of file
@@ -1,25 +1,39 @@
-from typing import Dict, Any, AsyncIterator
+from typing import Dict, Any, AsyncIterator, Optional
+import json
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, END
 
 from app.agents.base import BaseAgent
+from app.agents.llm_metrics import llm_metrics
+from app.agents.guardrails import GuardrailViolation
+from app.services.plan_store import get_plan_store, validate_plan
 
 class PlannerAgent(BaseAgent):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.llm = ChatOpenAI(temperature=0, model="gpt-4")
+        # Usage is streamed too, so token counts reach the metrics
+        self.llm = ChatOpenAI(temperature=0, model="gpt-4", stream_usage=True, callbacks=[llm_metrics])
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a research planning assistant. Given a research question, 
             create a workflow plan that breaks down the task into steps. Each step should 
             specify which agent to use (literature_search, code_search, summarizer, etc.).
             
-            Output a structured plan with:
-            1. Steps in sequence
-            2. Agent type for each step
-            3. Expected inputs/outputs
-            4. Dependencies between steps"""),
+            Output ONLY a valid JSON object with this structure:
+            {{
+              "steps": [
+                {{
+                  "id": "step1",
+                  "agent": "literature_search",
+                  "description": "Search for relevant papers",
+                  "inputs": ["research_question"],
+                  "outputs": ["papers"]
+                }}
+              ]
+            }}
+            List the steps in sequence; inputs name the outputs of earlier steps
+            they depend on. Do not include any text before or after the JSON."""),
             ("human", "{question}")
         ])
     
@@ -28,12 +42,42 @@ class PlannerAgent(BaseAgent):
         
         question = input_data.get("question", "")
         
-        chain = self.prompt | self.llm
-        response = await chain.ainvoke({"question": question})
+        try:
+            question = await self.apply_guardrails(question, self.input_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Planning rejected by guardrail: {e}"}
+            return
+        
+        # Skip the LLM round trip when a near-duplicate question was planned before
+        plan_store = get_plan_store("planner_agent")
+        reused = plan_store.lookup(question)
+        if reused:
+            plan, similarity, original_question = reused
+            yield {
+                "status": "completed",
+                "plan": plan,
+                "graph": self._create_workflow_graph(plan),
+                "reused_from": original_question,
+                "similarity": similarity,
+                "message": "Reused workflow plan from a similar question"
+            }
+            return
+        
+        try:
+            chain = self.prompt | self.llm
+            plan_text = await self.stream_llm(chain, {"question": question})
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Planning rejected by guardrail: {e}"}
+            return
         
         yield {"status": "planning", "message": "Creating workflow plan..."}
         
-        plan = self._parse_plan(response.content)
+        parsed = self._parse_plan(plan_text)
+        if parsed is None:
+            plan = self._default_plan()
+        else:
+            plan = parsed
+            plan_store.add(question, plan)
         
         workflow_graph = self._create_workflow_graph(plan)
         
@@ -44,9 +88,30 @@ class PlannerAgent(BaseAgent):
             "message": "Workflow plan created successfully"
         }
     
-    def _parse_plan(self, llm_output: str) -> Dict[str, Any]:
-        # Parse LLM output into structured plan
-        # This is simplified - in production, use proper parsing
+    def _parse_plan(self, llm_output: str) -> Optional[Dict[str, Any]]:
+        # Parse LLM output into structured plan; None if it isn't a valid plan
+        content = llm_output.strip()
+        if '```json' in content:
+            content = content.split('```json')[1].split('```')[0].strip()
+        elif '```' in content:
+            content = content.split('```')[1].split('```')[0].strip()
+        
+        try:
+            plan = json.loads(content)
+        except json.JSONDecodeError:
+            return None
+        
+        if not validate_plan(plan):
+            return None
+        
+        for i, step in enumerate(plan["steps"]):
+            step.setdefault("id", f"step{i + 1}")
+            step.setdefault("description", step["agent"].replace("_", " ").title())
+            step.setdefault("inputs", [])
+            step.setdefault("outputs", [])
+        return plan
+    
+    def _default_plan(self) -> Dict[str, Any]:
         return {
             "steps": [
                 {
@@ -0,0 +1,175 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+
+from app.agents.base import BaseAgent
+from app.core.cache import CacheInterface, cache
+from app.core.config import settings
+
+# Node config keys that control caching rather than what the agent does
+CONTROL_KEYS = ("cache", "replay")
+
+def replay_key(agent_type: str, config: Dict[str, Any], input_data: Any) -> str:
+    """Cache key for an agent run: type, config and canonical JSON of the input."""
+    config = {key: value for key, value in config.items() if key not in CONTROL_KEYS}
+    canonical = json.dumps([agent_type, config, input_data], sort_keys=True, separators=(",", ":"), default=str)
+    return f"agent:replay:{agent_type}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+class ReplayAborted(RuntimeError):
+    """The run a consumer was tailing stopped before finishing."""
+
+class _Recording:
+    """Events of a run in progress, which identical runs in this process tail."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        # How the run ended: completed, failed with error, or neither when
+        # its consumer went away (aclose, disconnect) before the end
+        self.completed = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+    async def append(self, event: Dict[str, Any]):
+        async with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    async def finish(self):
+        async with self.changed:
+            self.done = True
+            self.changed.notify_all()
+
+    async def tail(self) -> AsyncIterator[Dict[str, Any]]:
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.done or index < len(self.events))
+                pending = self.events[index:]
+                done = self.done
+            for event in pending:
+                yield event
+            index += len(pending)
+            if done and index >= len(self.events):
+                return
+
+_recordings: Dict[str, _Recording] = {}
+_stats = {"hits": 0, "misses": 0, "tailed": 0, "resumed": 0, "aborted": 0, "stored": 0, "not_stored": 0}
+
+def _completed(events: List[Dict[str, Any]]) -> bool:
+    # Only successful runs are replayed; errors should be retried
+    if not events or events[-1].get("status") != "completed":
+        return False
+    return not any(event.get("status") == "error" for event in events)
+
+class ReplayingAgent:
+    """
+    Wraps an agent so identical invocations replay its recorded events.
+
+    The first run streams live while its events are recorded; once it
+    completes, the whole sequence is cached for AGENT_REPLAY_TTL and later
+    runs with the same agent type, config and input replay it without doing
+    any work. Identical runs started while the first is still going tail
+    its events instead of starting their own; they get its error if it
+    fails. If it is aborted, a tailer that got nothing yet takes over and
+    one that did fails with ReplayAborted: a rerun of an LLM-backed agent
+    doesn't repeat the same events, so they can't be spliced. With collapse,
+    hits replay only the final event, which carries the result.
+    """
+
+    def __init__(self, agent: BaseAgent, agent_type: str, collapse: bool = False, backend: Optional[CacheInterface] = None):
+        self.agent = agent
+        self.agent_type = agent_type
+        self.collapse = collapse
+        self.backend = backend or cache
+        self.ttl = settings.AGENT_REPLAY_TTL
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.agent.config
+
+    async def process(self, input_data: Any) -> AsyncIterator[Dict[str, Any]]:
+        key = replay_key(self.agent_type, self.agent.config, input_data)
+
+        try:
+            raw = await self.backend.get(key)
+        except Exception:
+            raw = None
+        if raw is not None:
+            _stats["hits"] += 1
+            events = json.loads(raw)
+            for event in (events[-1:] if self.collapse else events):
+                yield event
+            return
+
+        while True:
+            recording = _recordings.get(key)
+            if recording is None:
+                break
+            _stats["tailed"] += 1
+            delivered = False
+            async for event in recording.tail():
+                delivered = True
+                yield event
+            if recording.error is not None:
+                raise recording.error
+            if recording.completed:
+                return
+            if delivered:
+                _stats["aborted"] += 1
+                raise ReplayAborted(f"The {self.agent_type} run this one was following was aborted")
+            # The run we were tailing was aborted before producing anything;
+            # follow whoever took over, or run the agent ourselves
+            _stats["resumed"] += 1
+
+        _stats["misses"] += 1
+        recording = _recordings[key] = _Recording()
+        try:
+            async for event in self.agent.process(input_data):
+                await recording.append(event)
+                yield event
+            recording.completed = True
+        except Exception as e:
+            recording.error = e
+            raise
+        finally:
+            await recording.finish()
+            if _recordings.get(key) is recording:
+                del _recordings[key]
+        await self._store(key, recording.events)
+
+    async def _store(self, key: str, events: List[Dict[str, Any]]):
+        if not _completed(events) or len(events) > settings.AGENT_REPLAY_MAX_EVENTS:
+            _stats["not_stored"] += 1
+            return
+        try:
+            # No default=: events that don't survive JSON unchanged aren't replayed
+            raw = json.dumps(events)
+        except (TypeError, ValueError):
+            _stats["not_stored"] += 1
+            return
+        try:
+            await self.backend.set(key, raw, expire=self.ttl)
+            _stats["stored"] += 1
+        except Exception as e:
+            print(f"Agent replay cache write failed: {e}")
+
+def with_replay(agent: BaseAgent, agent_type: str) -> Any:
+    """
+    The agent wrapped in a ReplayingAgent if its class is cacheable and the
+    node config doesn't opt out ("cache": false); "replay": "final" replays
+    only the final event.
+    """
+    config = agent.config
+    if not settings.AGENT_REPLAY_TTL or not getattr(agent, "cacheable", False) or config.get("cache") is False:
+        return agent
+    return ReplayingAgent(agent, agent_type, collapse=config.get("replay") == "final")
+
+def replay_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"] + _stats["tailed"]
+    return {
+        **_stats,
+        "running": len(_recordings),
+        "hit_rate": round((_stats["hits"] + _stats["tailed"]) / lookups, 3) if lookups else 0.0,
+    }
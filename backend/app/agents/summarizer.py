@@ -2,11 +2,17 @@ from typing import Dict, Any, AsyncIterator
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from app.agents.base import BaseAgent
+from app.agents.llm_metrics import llm_metrics
+from app.agents.guardrails import GuardrailViolation
 
 class SummarizerAgent(BaseAgent):
+    # temperature=0, so identical content gets the same summary
+    cacheable = True
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo-16k")
+        # Usage is streamed too, so token counts reach the metrics
+        self.llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo-16k", stream_usage=True, callbacks=[llm_metrics])
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a research summarizer. Your task is to synthesize 
@@ -30,24 +36,21 @@ class SummarizerAgent(BaseAgent):
             content = "\n\n".join([str(item) for item in content])
         
         # Apply input guardrails if configured
-        if self.config.get("input_guardrails"):
-            for guardrail_name in self.config["input_guardrails"]:
-                # Apply guardrail
-                pass
+        try:
+            content = await self.apply_guardrails(content, self.input_guardrails)
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Input rejected by guardrail: {e}"}
+            return
         
         yield {"status": "summarizing", "message": "Generating summary..."}
         
-        # Generate summary
+        # Generate summary, checking output guardrails while tokens stream in
         chain = self.prompt | self.llm
-        response = await chain.ainvoke({"content": content})
-        
-        summary = response.content
-        
-        # Apply output guardrails if configured
-        if self.config.get("output_guardrails"):
-            for guardrail_name in self.config["output_guardrails"]:
-                # Apply guardrail
-                pass
+        try:
+            summary = await self.stream_llm(chain, {"content": content})
+        except GuardrailViolation as e:
+            yield {"status": "error", "message": f"Summary rejected by guardrail: {e}"}
+            return
         
         # Extract key points
         key_points = self._extract_key_points(summary)
@@ -2,12 +2,14 @@ from fastapi import APIRouter, Depends
 from typing import List, Dict, Any
 
 from app.api.auth import get_current_user
-from app.models import User
+from app.services.principals import Principal
+from app.agents.replay import replay_stats
+from app.services.plan_store import plan_store_stats
 
 router = APIRouter()
 
 @router.get("/types")
-async def get_agent_types(current_user: User = Depends(get_current_user)):
+async def get_agent_types(current_user: Principal = Depends(get_current_user)):
     return [
         {
             "id": "planner",
@@ -42,7 +44,7 @@ async def get_agent_types(current_user: User = Depends(get_current_user)):
     ]
 
 @router.get("/guardrails")
-async def get_guardrail_types(current_user: User = Depends(get_current_user)):
+async def get_guardrail_types(current_user: Principal = Depends(get_current_user)):
     return [
         {
             "id": "content_filter",
@@ -59,4 +61,14 @@ async def get_guardrail_types(current_user: User = Depends(get_current_user)):
             "name": "Format Validator",
             "description": "Validates data format and structure"
         }
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/planner/plan-cache")
+async def get_plan_cache_stats(current_user: Principal = Depends(get_current_user)):
+    # Hit rate and similarity statistics of research plan reuse
+    return plan_store_stats()
+
+@router.get("/replay-cache")
+async def get_replay_cache_stats(current_user: Principal = Depends(get_current_user)):
+    # Recorded agent runs: hits, runs tailed while recording, stores
+    return replay_stats()
\ No newline at end of file
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional, Tuple
+import asyncio
+import re
+
+from app.core.artifacts import ArtifactNotFound, get_artifact_store
+
+router = APIRouter()
+
+# Artifact ids are content hashes, so a given URL never changes
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range. Returns None if it can't be satisfied."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s == "":
+            # Suffix range: last N bytes
+            length = int(end_s)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+@router.api_route("/{artifact_id}", methods=["GET", "HEAD"])
+async def download_artifact(artifact_id: str, request: Request, filename: Optional[str] = None):
+    store = get_artifact_store()
+    try:
+        info = await asyncio.to_thread(store.stat, artifact_id)
+    except ArtifactNotFound:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    size = info["size"]
+    etag = f'"{artifact_id}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        safe_name = re.sub(r"[^\w.\-]", "_", filename)
+        headers["Content-Disposition"] = f'attachment; filename="{safe_name}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    start, end = 0, size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    # Ignore the range if If-Range names a different representation
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=info["content_type"])
+
+    return StreamingResponse(
+        store.open_range(artifact_id, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=info["content_type"]
+    )
\ No newline at end of file
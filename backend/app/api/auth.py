@@ -1,78 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
+import asyncio
 
-from app.core.database import get_db
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.database import SessionLocal
+from app.core.security import auth_latency, check_password, create_access_token, hash_password
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
+from app.services.principals import Principal, principal_cache, resolve_principal, revoke_token
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-@router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
-    
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Email or username already registered"
+# The User queries are sync, so they run on a worker thread like the
+# principal lookups instead of blocking the event loop
+def _user_exists(email: str, username: str) -> bool:
+    with SessionLocal() as db:
+        return db.query(User).filter(
+            (User.email == email) | (User.username == username)
+        ).first() is not None
+
+def _create_user(email: str, username: str, hashed_password: str) -> Optional[User]:
+    with SessionLocal() as db:
+        db_user = User(
+            email=email,
+            username=username,
+            hashed_password=hashed_password
         )
-    
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        username=user.username,
-        hashed_password=hashed_password
+        db.add(db_user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Registered concurrently under the same email or username
+            db.rollback()
+            return None
+        db.refresh(db_user)
+        return db_user
+
+def _find_user(username: str) -> Optional[User]:
+    with SessionLocal() as db:
+        return db.query(User).filter(User.username == username).first()
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate):
+    already_registered = HTTPException(
+        status_code=400,
+        detail="Email or username already registered"
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    if await asyncio.to_thread(_user_exists, user.email, user.username):
+        raise already_registered
+    
+    hashed_password = await hash_password(user.password)
+    db_user = await asyncio.to_thread(_create_user, user.email, user.username, hashed_password)
+    if db_user is None:
+        raise already_registered
     
     return db_user
 
 @router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    with auth_latency.time("login"):
+        user = await asyncio.to_thread(_find_user, form_data.username)
+        
+        if not user or not await check_password(form_data.password, user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        access_token = create_access_token(data={"sub": user.username})
+        return {"access_token": access_token, "token_type": "bearer"}
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    # Resolved tokens are cached for AUTH_CACHE_TTL, so most requests neither
+    # decode the JWT nor touch the database
+    principal = await resolve_principal(token)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
+            detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return principal
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    from jose import JWTError, jwt
-    from app.core.config import settings
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    
-    return user
+@router.post("/logout", status_code=204)
+async def logout(token: str = Depends(oauth2_scheme), current_user: Principal = Depends(get_current_user)):
+    await revoke_token(token)
+    return Response(status_code=204)
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
+    return current_user
+
+@router.get("/stats")
+async def get_auth_stats(current_user: Principal = Depends(get_current_user)):
+    # Principal cache hit rate and auth-path latencies
+    return {"principal_cache": principal_cache.stats(), "latency": auth_latency.stats()}
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Response
+from typing import Any, Dict, Iterable, List, Tuple
+import sys
+
+from app.agents.replay import replay_stats
+from app.core.cache import cache
+from app.core.connections import manager
+from app.core.metrics import CONTENT_TYPE, Sample, registry
+from app.services.plan_store import plan_store_stats
+from app.services.principals import principal_cache
+
+router = APIRouter()
+
+Family = Tuple[str, str, str, List[Sample]]
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every cache in the process, by cache name."""
+    caches = {}
+    shared = cache.stats()
+    if shared.get("backend") == "tiered":
+        caches["l1"] = shared["l1"]
+        caches["l2"] = shared["l2"]
+    else:
+        caches["shared"] = shared
+    caches["principals"] = principal_cache.stats()
+    caches["agent_replay"] = replay_stats()
+    for store in plan_store_stats():
+        caches[f"plan:{store['name']}"] = store
+    return caches
+
+def collect_caches() -> Iterable[Family]:
+    hits, misses, ratio, evictions, entries, size = [], [], [], [], [], []
+    for name, stats in _cache_stats().items():
+        labels = {"cache": name}
+        if "hits" in stats:
+            hits.append(("_total", labels, stats["hits"]))
+            misses.append(("_total", labels, stats.get("misses", 0)))
+            lookups = stats["hits"] + stats.get("misses", 0)
+            ratio.append(("", labels, stats["hits"] / lookups if lookups else 0.0))
+        if "evictions" in stats:
+            evictions.append(("_total", labels, stats["evictions"]))
+        if "entries" in stats:
+            entries.append(("", labels, stats["entries"]))
+        if "bytes" in stats:
+            size.append(("", labels, stats["bytes"]))
+    yield "cache_hits", "counter", "Cache hits.", hits
+    yield "cache_misses", "counter", "Cache misses.", misses
+    yield "cache_hit_ratio", "gauge", "Hits over lookups since start.", ratio
+    yield "cache_evictions", "counter", "Entries evicted to stay within bounds.", evictions
+    yield "cache_entries", "gauge", "Entries held in process.", entries
+    yield "cache_bytes", "gauge", "Estimated bytes held in process.", size
+
+def collect_sockets() -> Iterable[Family]:
+    connections = list(manager.connections.values())
+    depths = [len(connection) for connection in connections]
+    yield "ws_active_connections", "gauge", "Open WebSocket connections.", [("", {}, len(connections))]
+    yield "ws_subscribed_topics", "gauge", "Topics with local subscribers.", [("", {}, len(manager.subscribers))]
+    yield "ws_send_queue_depth", "gauge", "Events queued across all send queues.", [("", {}, sum(depths))]
+    yield "ws_send_queue_max_depth", "gauge", "Deepest send queue.", [("", {}, max(depths, default=0))]
+
+def collect_sessions() -> Iterable[Family]:
+    # Only loaded by the research app (main_simple)
+    sessions = sys.modules.get("app.services.sessions")
+    if sessions is not None:
+        running = sum(1 for task in sessions._local_tasks.values() if not task.done())
+        yield "research_executions_running", "gauge", "Research executions running in this process.", [("", {}, running)]
+        store = sessions.get_session_store()
+        if hasattr(store, "__len__"):
+            yield "research_sessions", "gauge", "Resumable research sessions held in process.", [("", {}, len(store))]
+
+    research_graph = sys.modules.get("app.workflows.research_graph")
+    if research_graph is not None:
+        from app.workflows.checkpointer import checkpoint_store_size
+        size = checkpoint_store_size(research_graph.research_graph)
+        if "bytes" in size:
+            yield "checkpoint_store_bytes", "gauge", "Size of the checkpoint database, WAL included.", [("", {}, size["bytes"])]
+        if "threads" in size:
+            yield "checkpoint_store_threads", "gauge", "Threads held by the in-process checkpointer.", [("", {}, size["threads"])]
+
+registry.add_collector(collect_caches)
+registry.add_collector(collect_sockets)
+registry.add_collector(collect_sessions)
+
+@router.get("/metrics")
+async def metrics():
+    # Unauthenticated like any Prometheus target; expose it on an internal port only
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from app.api.auth import get_current_user
+from app.core.tracing import get_tracer
+from app.services.principals import Principal
+
+router = APIRouter()
+
+# Callers only see traces of their own workflow runs (user_id on the root
+# span); the file exporter scans its file, so lookups run in the threadpool
+
+@router.get("")
+async def find_traces(
+    workflow_id: Optional[int] = None,
+    execution_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user),
+):
+    """Root spans of the caller's traced workflow runs, newest first."""
+    filters = {"user_id": current_user.id}
+    if workflow_id is not None:
+        filters["workflow_id"] = workflow_id
+    if execution_id is not None:
+        filters["execution_id"] = execution_id
+    return await run_in_threadpool(get_tracer().find_traces, **filters)
+
+@router.get("/stats")
+async def get_trace_stats(current_user: Principal = Depends(get_current_user)):
+    return get_tracer().stats()
+
+@router.get("/{trace_id}")
+async def get_trace(trace_id: str, current_user: Principal = Depends(get_current_user)):
+    """Every span of one of the caller's traces, in start order."""
+    spans = await run_in_threadpool(get_tracer().get_trace, trace_id, user_id=current_user.id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
@@ -1,30 +1,22 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
 from sqlalchemy.orm import Session
-import json
+from typing import Optional, Tuple
 import asyncio
-from typing import Dict
 
-from app.core.database import get_db
+from app.core.connections import manager
+from app.core.database import SessionLocal, get_db
+from app.core.events import ErrorEvent
+from app.core.serialization import receive_message
+from app.models import Workflow
+from app.services.principals import resolve_principal
 from app.services.workflow_executor import WorkflowExecutor
 
 router = APIRouter()
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-    
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        self.active_connections[client_id] = websocket
-    
-    def disconnect(self, client_id: str):
-        self.active_connections.pop(client_id, None)
-    
-    async def send_message(self, message: dict, client_id: str):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_json(message)
-
-manager = ConnectionManager()
+def _workflow_access(workflow_id: int) -> Optional[Tuple[int, bool]]:
+    with SessionLocal() as db:
+        workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        return (workflow.user_id, bool(workflow.is_public)) if workflow is not None else None
 
 @router.websocket("/workflow/{workflow_id}")
 async def websocket_endpoint(
@@ -32,21 +24,38 @@ async def websocket_endpoint(
     workflow_id: int,
     db: Session = Depends(get_db)
 ):
+    # Browsers can't set headers on a WebSocket, so the bearer token comes
+    # as a query parameter; the same rules as GET /api/workflows/{id} apply
+    token = websocket.query_params.get("token")
+    principal = await resolve_principal(token) if token else None
+    access = await asyncio.to_thread(_workflow_access, workflow_id) if principal is not None else None
+    if principal is None or access is None or (access[0] != principal.id and not access[1]):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Public workflows can be watched by anyone signed in, run only by their owner
+    is_owner = access[0] == principal.id
+    
     client_id = f"client_{id(websocket)}"
-    await manager.connect(websocket, client_id)
+    serializer = await manager.connect(websocket, client_id)
+    # Everyone connected to a workflow watches its runs
+    topic = f"workflow:{workflow_id}"
+    await manager.subscribe(client_id, topic)
     
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await receive_message(websocket, serializer)
+            
+            if data["type"] in ("execute", "update_node") and not is_owner:
+                await manager.send_message(ErrorEvent("Only the workflow's owner can run it"), client_id)
             
-            if data["type"] == "execute":
-                executor = WorkflowExecutor(db, manager, client_id)
+            elif data["type"] == "execute":
+                executor = WorkflowExecutor(db, manager, client_id, topic)
                 asyncio.create_task(
                     executor.execute_workflow(workflow_id, data.get("input_data", {}))
                 )
             
             elif data["type"] == "update_node":
-                executor = WorkflowExecutor(db, manager, client_id)
+                executor = WorkflowExecutor(db, manager, client_id, topic)
                 asyncio.create_task(
                     executor.update_and_rerun_node(
                         workflow_id,
@@ -56,4 +65,4 @@ async def websocket_endpoint(
                 )
     
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
\ No newline at end of file
+        await manager.disconnect(client_id)
\ No newline at end of file
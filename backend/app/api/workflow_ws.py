@@ -1,37 +1,146 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Any
-import json
-import uuid
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional
+import asyncio
 
+from app.core.connections import manager
+from app.core.events import (
+    CurrentState,
+    ErrorEvent,
+    ExecutionCompleted,
+    ExecutionStarted,
+    CheckpointState,
+    History,
+    Rewound,
+    SessionInfo,
+    StateVersion,
+    Trace,
+)
+from app.core.serialization import receive_message
+from app.core.tracing import get_tracer, start_trace
+from app.services.checkpoint_index import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_checkpoint_index
+from app.services.sessions import ResearchSession, SessionStore, get_session_store, keep_attached, route_control, run_with_lease
 from app.workflows.research_graph import research_graph, ResearchState
 
 router = APIRouter()
 
-# Store active sessions
-active_sessions: Dict[str, Dict[str, Any]] = {}
+async def stream_execution(session: ResearchSession, graph_input: Any, config: Dict[str, Any]):
+    """
+    Run the graph and publish a numbered StateVersion after every node, so
+    viewers get either the node's update or a delta of the full state.
+    """
+    thread_id = session.thread_id
+    pending = None
+    async for mode, chunk in research_graph.astream(
+        graph_input, config, stream_mode=["updates", "values"]
+    ):
+        if mode == "updates":
+            pending = chunk
+        elif pending:
+            # The values chunk following an update is the state after that step
+            for node, state_update in pending.items():
+                version = await session.store.next_version(session)
+                await session.publish(StateVersion(thread_id, node, version, state_update, chunk))
+            pending = None
+
+async def load_checkpoint(thread_id: str, checkpoint_id: str) -> Dict[str, Any]:
+    state = await research_graph.aget_state(
+        {"configurable": {"thread_id": thread_id, "checkpoint_id": checkpoint_id}}
+    )
+    return state.values
+
+async def run_execution(session: ResearchSession, graph_input: Any, config: Dict[str, Any], started: bool):
+    thread_id = session.thread_id
+    # One trace per execution; execution_started tells the client its id
+    with start_trace("research.execution", thread_id=thread_id, resumed=not started) as root:
+        try:
+            if started:
+                await session.publish(ExecutionStarted(thread_id, root.trace_id))
+            await stream_execution(session, graph_input, config)
+            if started:
+                await session.publish(ExecutionCompleted(thread_id))
+        except asyncio.CancelledError:
+            root.set(error="cancelled")
+            await session.publish(ErrorEvent("Execution cancelled"))
+            raise
+        except Exception as e:
+            root.set(error=str(e))
+            print(f"Execution error for {thread_id}: {str(e)}")
+            await session.publish(ErrorEvent(str(e)))
+
+async def start_execution(session: ResearchSession, graph_input: Any, config: Dict[str, Any], started: bool = True) -> bool:
+    """
+    Run the graph in a task so the socket keeps reading (acks, get_state)
+    while it executes. The task belongs to the session, not the socket, so
+    it keeps running across reconnects. The execution lease allows one
+    execution per session across all workers.
+    """
+    return await run_with_lease(session, run_execution(session, graph_input, config, started))
+
+async def watchable_thread(store: SessionStore, resume_token: Any) -> Optional[str]:
+    """
+    Thread id of the session a socket asked to watch, or None. Sockets are
+    not authenticated, so a session can only be watched by whoever holds its
+    resume token; topics are never taken from the client as-is.
+    """
+    if not isinstance(resume_token, str) or not resume_token:
+        return None
+    session = await store.resume(resume_token)
+    return session.thread_id if session is not None else None
 
 @router.websocket("/workflow")
 async def workflow_websocket(websocket: WebSocket):
-    await websocket.accept()
-    session_id = str(uuid.uuid4())
-    thread_id = f"research_{session_id}"
+    client_id = f"client_{id(websocket)}"
+    serializer = await manager.connect(websocket, client_id)
+    
+    # Reconnecting clients pass their resume token and the last sequence
+    # number they saw; they get the events they missed instead of a new run
+    # Sessions live in the shared store, so this may be any worker
+    store = get_session_store()
+    session = await store.resume(websocket.query_params.get("resume"))
+    resumed = session is not None
+    if session is None:
+        session = await store.create()
+    await store.attach(session)
+    # Idle sockets don't publish anything, so the session is kept alive here
+    keepalive = asyncio.create_task(keep_attached(session))
+    session_id = session.session_id
+    thread_id = session.thread_id
     
     try:
+        await manager.send_message(
+            SessionInfo(session_id, thread_id, session.resume_token, resumed, await store.last_seq(session)),
+            client_id
+        )
+        
+        # Execution events are published to the thread's topic, so other
+        # sockets can watch this run with a "subscribe" message
+        # A resumed socket holds live events until the missed ones are queued
+        await manager.subscribe(client_id, thread_id, hold=resumed)
+        if resumed:
+            try:
+                last_seq = int(websocket.query_params.get("last_seq", 0))
+            except ValueError:
+                # Replaying the whole log is safe; the client dedupes by seq
+                await manager.send_message(ErrorEvent("last_seq must be an integer"), client_id)
+                last_seq = 0
+            missed, gap = await store.events_after(session, last_seq)
+            if gap:
+                # Older events were evicted from the log; send the current state first
+                state = await research_graph.aget_state({"configurable": {"thread_id": thread_id}})
+                await manager.send_message(CurrentState(state.values, state.next), client_id)
+            manager.replay(client_id, thread_id, missed)
+        watch = await watchable_thread(store, websocket.query_params.get("watch"))
+        if watch:
+            await manager.subscribe(client_id, watch)
+        
         while True:
-            data = await websocket.receive_json()
+            data = await receive_message(websocket, serializer)
             
             if data["type"] == "execute":
                 # Start new execution
                 config = {"configurable": {"thread_id": thread_id}}
                 
-                # Send initial state
-                await websocket.send_json({
-                    "type": "execution_started",
-                    "thread_id": thread_id,
-                    "timestamp": datetime.now().isoformat()
-                })
-                
                 # Execute workflow with streaming
                 initial_state: ResearchState = {
                     "question": data["question"],
@@ -43,68 +152,79 @@ async def workflow_websocket(websocket: WebSocket):
                     "current_step": ""
                 }
                 
-                async for event in research_graph.astream(initial_state, config):
-                    # Send each step update
-                    for node, state_update in event.items():
-                        await websocket.send_json({
-                            "type": "node_update",
-                            "node": node,
-                            "state": state_update,
-                            "timestamp": datetime.now().isoformat()
-                        })
-                
-                # Send completion
-                await websocket.send_json({
-                    "type": "execution_completed",
-                    "thread_id": thread_id,
-                    "timestamp": datetime.now().isoformat()
-                })
+                if not await start_execution(session, initial_state, config):
+                    await manager.send_message(ErrorEvent("An execution is already running"), client_id)
             
             elif data["type"] == "get_history":
-                # Get execution history for time-travel
-                history = research_graph.get_state_history(
-                    {"configurable": {"thread_id": thread_id}}
+                # One page of checkpoint metadata for time-travel
+                try:
+                    limit = int(data.get("limit", DEFAULT_PAGE_SIZE))
+                    cursor = data.get("cursor")
+                    cursor = int(cursor) if cursor is not None else None
+                except (TypeError, ValueError):
+                    await manager.send_message(ErrorEvent("limit and cursor must be integers"), client_id)
+                    continue
+                index = get_checkpoint_index(research_graph.checkpointer, thread_id)
+                entries, next_cursor = await index.page(cursor, max(1, min(limit, MAX_PAGE_SIZE)))
+                await manager.send_message(
+                    History([entry.to_dict() for entry in entries], next_cursor), client_id
                 )
+            
+            elif data["type"] == "get_checkpoint":
+                # Load one checkpoint's values on demand
+                checkpoint_id, step = data.get("checkpoint_id"), data.get("step")
+                if not isinstance(checkpoint_id, str) and not isinstance(step, int):
+                    await manager.send_message(ErrorEvent("get_checkpoint needs a checkpoint_id or an integer step"), client_id)
+                    continue
+                index = get_checkpoint_index(research_graph.checkpointer, thread_id)
+                if isinstance(checkpoint_id, str):
+                    entry = await index.find(checkpoint_id)
+                else:
+                    entry = await index.get(step)
+                if entry is None:
+                    await manager.send_message(ErrorEvent("Checkpoint not found"), client_id)
+                    continue
                 
-                states = []
-                for state in history:
-                    states.append({
-                        "state": state.values,
-                        "step": state.metadata.get("step", 0),
-                        "timestamp": state.metadata.get("timestamp", "")
-                    })
-                
-                await websocket.send_json({
-                    "type": "history",
-                    "states": states
-                })
+                values = await load_checkpoint(thread_id, entry.checkpoint_id)
+                patch = manager.state_patch(client_id, thread_id, values)
+                await manager.send_message(
+                    CheckpointState(entry.step, entry.checkpoint_id, values, *(patch or ())),
+                    client_id
+                )
             
             elif data["type"] == "rewind":
                 # Rewind to a specific state
-                target_step = data["step"]
+                target_step = data.get("step")
+                if not isinstance(target_step, int):
+                    await manager.send_message(ErrorEvent("step must be an integer"), client_id)
+                    continue
                 config = {"configurable": {"thread_id": thread_id}}
                 
+                if await store.lease_owner(session):
+                    await manager.send_message(ErrorEvent("An execution is already running"), client_id)
+                    continue
+                
                 # Get the state at the target step
-                history = list(research_graph.get_state_history(config))
-                if target_step < len(history):
-                    target_state = history[-(target_step + 1)]
+                entry = await get_checkpoint_index(research_graph.checkpointer, thread_id).get(target_step)
+                if entry is not None:
+                    values = await load_checkpoint(thread_id, entry.checkpoint_id)
                     
                     # Update to that state
-                    await research_graph.aupdate_state(
-                        config,
-                        target_state.values
-                    )
+                    await research_graph.aupdate_state(config, values)
                     
-                    await websocket.send_json({
-                        "type": "rewound",
-                        "step": target_step,
-                        "state": target_state.values
-                    })
+                    # Delta clients get a patch against their acknowledged version
+                    patch = manager.state_patch(client_id, thread_id, values)
+                    await manager.send_message(Rewound(target_step, values, *(patch or ())), client_id)
+                else:
+                    await manager.send_message(ErrorEvent("Checkpoint not found"), client_id)
             
             elif data["type"] == "update_and_continue":
                 # Update a node's state and continue execution
                 config = {"configurable": {"thread_id": thread_id}}
                 node_updates = data.get("updates", {})
+                if await store.lease_owner(session):
+                    await manager.send_message(ErrorEvent("An execution is already running"), client_id)
+                    continue
                 
                 # Update the state
                 await research_graph.aupdate_state(config, node_updates)
@@ -112,40 +232,70 @@ async def workflow_websocket(websocket: WebSocket):
                 # Continue execution from current state
                 current_state = await research_graph.aget_state(config)
                 
-                async for event in research_graph.astream(None, config):
-                    for node, state_update in event.items():
-                        await websocket.send_json({
-                            "type": "node_update",
-                            "node": node,
-                            "state": state_update,
-                            "timestamp": datetime.now().isoformat()
-                        })
+                if not await start_execution(session, None, config, started=False):
+                    await manager.send_message(ErrorEvent("An execution is already running"), client_id)
                 
             elif data["type"] == "get_state":
                 # Get current state
                 config = {"configurable": {"thread_id": thread_id}}
                 state = await research_graph.aget_state(config)
                 
-                await websocket.send_json({
-                    "type": "current_state",
-                    "state": state.values,
-                    "next": state.next
-                })
+                await manager.send_message(CurrentState(state.values, state.next), client_id)
+            
+            elif data["type"] == "cancel":
+                # Routed to whichever worker runs the execution
+                if not await route_control(session, "cancel"):
+                    await manager.send_message(ErrorEvent("No execution is running"), client_id)
+            
+            elif data["type"] == "subscribe":
+                # Watch another session's execution stream; the session's
+                # resume token proves the client may see it
+                watch = await watchable_thread(store, data.get("resume_token"))
+                if watch is None:
+                    await manager.send_message(ErrorEvent("Session not found"), client_id)
+                else:
+                    await manager.subscribe(client_id, watch)
+            
+            elif data["type"] == "unsubscribe":
+                topic = data.get("thread_id")
+                if not isinstance(topic, str):
+                    await manager.send_message(ErrorEvent("unsubscribe needs a thread_id"), client_id)
+                else:
+                    await manager.unsubscribe(client_id, topic)
+            
+            elif data["type"] == "get_trace":
+                # Traces of this session's own executions only
+                trace_id = data.get("trace_id")
+                spans = None
+                if isinstance(trace_id, str):
+                    spans = await run_in_threadpool(get_tracer().get_trace, trace_id, thread_id=thread_id)
+                if spans is None:
+                    await manager.send_message(ErrorEvent("Trace not found"), client_id)
+                else:
+                    await manager.send_message(Trace(trace_id, spans), client_id)
+            
+            elif data["type"] == "ack":
+                # Delta clients acknowledge the state version they applied
+                version, topic = data.get("version"), data.get("thread_id", thread_id)
+                if not isinstance(version, int) or not isinstance(topic, str):
+                    await manager.send_message(ErrorEvent("ack needs an integer version"), client_id)
+                    continue
+                manager.ack(client_id, topic, version)
     
     except WebSocketDisconnect:
-        # Clean up session
-        if session_id in active_sessions:
-            del active_sessions[session_id]
         print(f"WebSocket disconnected for session {session_id}")
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
         import traceback
         traceback.print_exc()
         try:
-            await websocket.send_json({
-                "type": "error",
-                "message": str(e)
-            })
+            await manager.send_message(ErrorEvent(str(e)), client_id)
+            await manager.flush(client_id)
+            await websocket.close()
         except:
             pass
-        await websocket.close()
\ No newline at end of file
+    finally:
+        keepalive.cancel()
+        await manager.disconnect(client_id)
+        # The execution keeps running; the session can be resumed until it expires
+        await store.detach(session)
\ No newline at end of file
@@ -1,75 +1,220 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import Query as OrmQuery, Session
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime
+import base64
+import json
 
 from app.core.database import get_db
 from app.api.auth import get_current_user
-from app.models import User, Workflow, WorkflowNode, WorkflowEdge
-from app.schemas.workflow import WorkflowCreate, WorkflowResponse
+from app.services.principals import Principal
+from app.models import Workflow
+from app.schemas.workflow import WorkflowCreate, WorkflowGraphUpdate, WorkflowPage, WorkflowResponse, WorkflowSummary
+from app.services.workflow_cache import etag_matches, workflow_cache, workflow_etag
+from app.services.workflow_graphs import Graph, load_graph, load_graphs, store_graph
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sortable columns; id breaks ties so every row has a unique position.
+# Creation order is id order: ids are assigned on insert and, unlike the
+# timestamp, are unique and compare the same way on every database.
+SORT_COLUMNS = {
+    "created_at": Workflow.id,
+    "name": Workflow.name,
+}
+
+def encode_cursor(sort: str, order: str, workflow: Workflow) -> str:
+    """Opaque cursor holding the sort key of the last row of a page."""
+    value = getattr(workflow, SORT_COLUMNS[sort].key)
+    raw = json.dumps([sort, order, value, workflow.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, workflow_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(status_code=400, detail="Cursor belongs to a different sort order")
+    return value, workflow_id
+
+def workflow_response(workflow: Workflow, graph: Graph) -> WorkflowResponse:
+    nodes, edges = graph
+    return WorkflowResponse(
+        **WorkflowSummary.model_validate(workflow).model_dump(), nodes=nodes, edges=edges
+    )
+
+def json_response(body: str, etag: str) -> Response:
+    # no-cache: clients keep the body but revalidate it with If-None-Match
+    return Response(
+        content=body, media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
 @router.post("/", response_model=WorkflowResponse)
 async def create_workflow(
     workflow: WorkflowCreate,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    nodes = [node.model_dump() for node in workflow.nodes]
+    edges = [edge.model_dump() for edge in workflow.edges]
     db_workflow = Workflow(
         name=workflow.name,
         description=workflow.description,
         user_id=current_user.id,
-        is_public=workflow.is_public
+        is_public=workflow.is_public,
+        graph_hash=store_graph(db, nodes, edges)
     )
     db.add(db_workflow)
-    db.flush()
-    
-    for node in workflow.nodes:
-        db_node = WorkflowNode(
-            workflow_id=db_workflow.id,
-            node_id=node.node_id,
-            type=node.type,
-            position=node.position,
-            data=node.data
-        )
-        db.add(db_node)
-    
-    for edge in workflow.edges:
-        db_edge = WorkflowEdge(
-            workflow_id=db_workflow.id,
-            source=edge.source,
-            target=edge.target
-        )
-        db.add(db_edge)
-    
     db.commit()
     db.refresh(db_workflow)
+    await workflow_cache.invalidate(db_workflow)
     
-    return db_workflow
+    response.headers["ETag"] = workflow_etag(db_workflow)
+    return workflow_response(db_workflow, (nodes, edges))
 
-@router.get("/", response_model=List[WorkflowResponse])
+def list_workflows(
+    db: Session,
+    user_id: int,
+    include_public: bool = False,
+    public_only: bool = False,
+    include_graph: bool = False,
+    q: Optional[str] = None,
+    forked_from: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> WorkflowPage:
+    """
+    One page of workflows ordered by `sort`, then id.
+    
+    Pages are keyset-paginated: the next page starts after the sort key in
+    `next_cursor`, an index range scan however deep the page is. Summaries
+    leave out the graph; with include_graph, nodes and edges for the whole
+    page are loaded in one query each.
+    """
+    column = SORT_COLUMNS[sort]
+    position = decode_cursor(cursor, sort, order) if cursor else None
+    
+    def ordered(query: OrmQuery) -> OrmQuery:
+        # One extra row tells whether there is a next page
+        query = query.order_by(getattr(column, order)())
+        if column is not Workflow.id:
+            query = query.order_by(getattr(Workflow.id, order)())
+        return query.limit(limit + 1)
+    
+    def page_query(visibility) -> OrmQuery:
+        query = db.query(Workflow).filter(visibility)
+        
+        if q:
+            query = query.filter(Workflow.name.icontains(q, autoescape=True))
+        if forked_from is not None:
+            query = query.filter(Workflow.forked_from == forked_from)
+        if created_after is not None:
+            query = query.filter(Workflow.created_at >= created_after)
+        if created_before is not None:
+            query = query.filter(Workflow.created_at < created_before)
+        
+        if position is not None:
+            value, workflow_id = position
+            if column is Workflow.id:
+                key, after = Workflow.id, workflow_id
+            else:
+                key, after = tuple_(column, Workflow.id), tuple_(value, workflow_id)
+            query = query.filter(key < after if order == "desc" else key > after)
+        
+        return ordered(query)
+    
+    if public_only:
+        workflows = page_query(Workflow.is_public == True).all()
+    elif include_public:
+        # Two index range scans of at most a page each; filtering on "own or
+        # public" would make the database sort every match to find one page.
+        # The database merges them too, so names compare by its collation
+        # like on every other page and the cursor stays consistent
+        own = page_query(Workflow.user_id == user_id).with_entities(Workflow.id).subquery()
+        public = page_query(
+            (Workflow.is_public == True) & (Workflow.user_id != user_id)
+        ).with_entities(Workflow.id).subquery()
+        candidates = union_all(select(own.c.id), select(public.c.id))
+        workflows = ordered(db.query(Workflow).filter(Workflow.id.in_(candidates))).all()
+    else:
+        workflows = page_query(Workflow.user_id == user_id).all()
+    
+    next_cursor = None
+    if len(workflows) > limit:
+        workflows = workflows[:limit]
+        next_cursor = encode_cursor(sort, order, workflows[-1])
+    
+    items: List[Union[WorkflowResponse, WorkflowSummary]]
+    if include_graph:
+        # Every graph on the page in two queries; forks share their parent's
+        graphs = load_graphs(db, [workflow.graph_hash for workflow in workflows])
+        items = [workflow_response(workflow, graphs.get(workflow.graph_hash, ([], []))) for workflow in workflows]
+    else:
+        items = [WorkflowSummary.model_validate(workflow) for workflow in workflows]
+    return WorkflowPage(items=items, next_cursor=next_cursor)
+
+@router.get("/", response_model=WorkflowPage)
 async def get_workflows(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    include_public: bool = False
+    current_user: Principal = Depends(get_current_user),
+    include_public: bool = False,
+    public_only: bool = False,
+    include_graph: bool = False,
+    q: Optional[str] = None,
+    forked_from: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = Query("created_at", pattern="^(created_at|name)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
-    query = db.query(Workflow)
-    
-    if include_public:
-        query = query.filter(
-            (Workflow.user_id == current_user.id) | (Workflow.is_public == True)
-        )
-    else:
-        query = query.filter(Workflow.user_id == current_user.id)
+    """
+    See list_workflows. The encoded page is cached, and its ETag changes
+    whenever a workflow the listing can contain is written, so polling with
+    If-None-Match costs no queries until something changes.
+    """
+    params: Dict[str, Any] = dict(
+        include_public=include_public, public_only=public_only, include_graph=include_graph,
+        q=q, forked_from=forked_from, created_after=created_after, created_before=created_before,
+        sort=sort, order=order, cursor=cursor, limit=limit,
+    )
+    key = await workflow_cache.listing_key(
+        current_user.id, public=public_only or include_public, own=not public_only, params=params
+    )
+    etag = f'"{key.rsplit(":", 1)[-1][:32]}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
     
-    workflows = query.all()
-    return workflows
+    body = await workflow_cache.get(key)
+    if body is None:
+        body = list_workflows(db, current_user.id, **params).model_dump_json()
+        await workflow_cache.set(key, body)
+    return json_response(body, etag)
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
     workflow_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     
@@ -79,13 +224,67 @@ async def get_workflow(
     if workflow.user_id != current_user.id and not workflow.is_public:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    return workflow
+    # The row version is the ETag, so revalidating costs just the lookup above
+    etag = workflow_etag(workflow)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
+    key = workflow_cache.workflow_key(workflow)
+    body = await workflow_cache.get(key)
+    if body is None:
+        body = workflow_response(workflow, load_graph(db, workflow)).model_dump_json()
+        await workflow_cache.set(key, body)
+    return json_response(body, etag)
+
+@router.put("/{workflow_id}/graph", response_model=WorkflowResponse)
+async def update_workflow_graph(
+    workflow_id: int,
+    update: WorkflowGraphUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Replace the workflow's graph. Graph versions are immutable and shared,
+    so this points the workflow at the version with this content (stored
+    if new); forks of the workflow keep the version they were made from.
+    
+    With If-Match, the update only applies to the version the client last
+    saw (412 otherwise); a concurrent write that lands first gives 409.
+    """
+    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    if workflow.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if if_match and not etag_matches(if_match, workflow_etag(workflow)):
+        raise HTTPException(status_code=412, detail="Workflow has changed")
+    
+    previous_version = workflow.version
+    nodes = [node.model_dump() for node in update.nodes]
+    edges = [edge.model_dump() for edge in update.edges]
+    workflow.graph_hash = store_graph(db, nodes, edges)
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Workflow was modified concurrently")
+    db.refresh(workflow)
+    await workflow_cache.invalidate(workflow, previous_version=previous_version)
+    
+    response.headers["ETag"] = workflow_etag(workflow)
+    return workflow_response(workflow, (nodes, edges))
 
 @router.post("/{workflow_id}/fork", response_model=WorkflowResponse)
 async def fork_workflow(
     workflow_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     original = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     
@@ -95,35 +294,19 @@ async def fork_workflow(
     if not original.is_public and original.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot fork private workflow")
     
+    # The fork shares the original's graph version until either is edited
     forked = Workflow(
         name=f"{original.name} (Fork)",
         description=original.description,
         user_id=current_user.id,
         is_public=False,
-        forked_from=original.id
+        forked_from=original.id,
+        graph_hash=original.graph_hash
     )
     db.add(forked)
-    db.flush()
-    
-    for node in original.nodes:
-        new_node = WorkflowNode(
-            workflow_id=forked.id,
-            node_id=node.node_id,
-            type=node.type,
-            position=node.position,
-            data=node.data
-        )
-        db.add(new_node)
-    
-    for edge in original.edges:
-        new_edge = WorkflowEdge(
-            workflow_id=forked.id,
-            source=edge.source,
-            target=edge.target
-        )
-        db.add(new_edge)
-    
     db.commit()
     db.refresh(forked)
+    await workflow_cache.invalidate(forked)
     
-    return forked
\ No newline at end of file
+    response.headers["ETag"] = workflow_etag(forked)
+    return workflow_response(forked, load_graph(db, forked))
\ No newline at end of file
@@ -0,0 +1,137 @@
+from typing import Dict, Any, Iterable, Iterator, Optional
+import hashlib
+import json
+import os
+import re
+import tempfile
+from urllib.parse import quote
+from app.core.config import settings
+
+ARTIFACT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 64 * 1024
+
+class ArtifactNotFound(Exception):
+    pass
+
+class ArtifactStore:
+    """
+    Content-addressed storage for generated binary artifacts (PDFs, ...).
+
+    Artifacts are identified by the SHA-256 of their content, so storing the
+    same bytes twice is a no-op and references can be cached forever.
+    """
+
+    def put_bytes(self, data: bytes, content_type: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        return self.put_stream([data], content_type, filename)
+
+    def put_file(self, path: str, content_type: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        def chunks():
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        return self.put_stream(chunks(), content_type, filename)
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stat(self, artifact_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def open_range(self, artifact_id: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def delete(self, artifact_id: str):
+        raise NotImplementedError
+
+class LocalArtifactStore(ArtifactStore):
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or settings.ARTIFACT_STORE_PATH)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, artifact_id: str) -> str:
+        if not ARTIFACT_ID_PATTERN.match(artifact_id):
+            raise ArtifactNotFound(artifact_id)
+        return os.path.join(self.root, artifact_id[:2], artifact_id[2:4], artifact_id)
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        digest = hashlib.sha256()
+        size = 0
+
+        # Hash while writing to a temp file, then move it into place atomically
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            artifact_id = digest.hexdigest()
+            path = self._path(artifact_id)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.json", "w") as meta:
+                    json.dump({"content_type": content_type, "size": size}, meta)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return {
+            "artifact_id": artifact_id,
+            "size": size,
+            "content_type": content_type,
+            "filename": filename,
+            "url": f"/api/artifacts/{artifact_id}" + (f"?filename={quote(filename)}" if filename else ""),
+        }
+
+    def stat(self, artifact_id: str) -> Dict[str, Any]:
+        path = self._path(artifact_id)
+        try:
+            with open(f"{path}.json") as meta:
+                info = json.load(meta)
+            info["size"] = os.path.getsize(path)
+        except FileNotFoundError:
+            raise ArtifactNotFound(artifact_id)
+        info["artifact_id"] = artifact_id
+        return info
+
+    def open_range(self, artifact_id: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the bytes in [start, end] (inclusive) in fixed-size chunks."""
+        path = self._path(artifact_id)
+        if not os.path.exists(path):
+            raise ArtifactNotFound(artifact_id)
+
+        def reader():
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = None if end is None else end - start + 1
+                while remaining is None or remaining > 0:
+                    size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                    chunk = f.read(size)
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+        return reader()
+
+    def delete(self, artifact_id: str):
+        path = self._path(artifact_id)
+        for p in (path, f"{path}.json"):
+            if os.path.exists(p):
+                os.unlink(p)
+
+_artifact_store: Optional[ArtifactStore] = None
+
+def get_artifact_store() -> ArtifactStore:
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = LocalArtifactStore()
+    return _artifact_store
\ No newline at end of file
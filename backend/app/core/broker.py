@@ -0,0 +1,179 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+
+from app.core.cache import REDIS_ERRORS
+from app.core.config import settings
+from app.core.events import Event, RawEvent
+from app.core.serialization import get_serializer
+
+EventHandler = Callable[[str, Event], Awaitable[None]]
+
+class Broker:
+    """
+    Topic-based pub/sub for execution events.
+
+    A topic is an execution or thread id; every process that has a viewer
+    for that topic subscribes once and fans the event out locally.
+    """
+
+    async def publish(self, topic: str, event: Event):
+        raise NotImplementedError
+
+    async def subscribe(self, topic: str, handler: EventHandler):
+        raise NotImplementedError
+
+    async def unsubscribe(self, topic: str, handler: EventHandler):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class InProcessBroker(Broker):
+    def __init__(self):
+        self._handlers: Dict[str, List[EventHandler]] = {}
+
+    async def publish(self, topic: str, event: Event):
+        for handler in list(self._handlers.get(topic, ())):
+            await handler(topic, event)
+
+    async def subscribe(self, topic: str, handler: EventHandler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def unsubscribe(self, topic: str, handler: EventHandler):
+        handlers = self._handlers.get(topic)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[topic]
+
+class RedisBroker(Broker):
+    """
+    Redis pub/sub broker for running several workers.
+
+    Events travel as their JSON encoding and are re-wrapped as RawEvent on
+    the receiving side, so JSON viewers get the published bytes unchanged.
+    Any client with the redis.asyncio API (e.g. fakeredis) can be injected.
+    """
+
+    CHANNEL_PREFIX = "events:"
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(url or settings.BROKER_URL)
+        self.client = client
+        self._pubsub: Optional[Any] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._serializer = get_serializer("json")
+
+    async def publish(self, topic: str, event: Event):
+        await self.client.publish(self.CHANNEL_PREFIX + topic, event.encode(self._serializer))
+
+    async def subscribe(self, topic: str, handler: EventHandler):
+        handlers = self._handlers.setdefault(topic, [])
+        handlers.append(handler)
+        if len(handlers) == 1:
+            if self._pubsub is None:
+                self._pubsub = self.client.pubsub()
+            await self._pubsub.subscribe(self.CHANNEL_PREFIX + topic)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, topic: str, handler: EventHandler):
+        handlers = self._handlers.get(topic)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[topic]
+                if self._pubsub is not None:
+                    await self._pubsub.unsubscribe(self.CHANNEL_PREFIX + topic)
+
+    async def _reconnect(self):
+        # A fresh pubsub on a new connection, subscribed to every topic that
+        # still has local handlers
+        old, self._pubsub = self._pubsub, self.client.pubsub()
+        if old is not None:
+            try:
+                await old.aclose()
+            except REDIS_ERRORS:
+                pass
+        channels = [self.CHANNEL_PREFIX + topic for topic in self._handlers]
+        if channels:
+            await self._pubsub.subscribe(*channels)
+
+    async def _listen(self):
+        delay = 0.0
+        while self._handlers:
+            try:
+                if delay:
+                    await self._reconnect()
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except REDIS_ERRORS as e:
+                # Back off and resubscribe; events published while Redis is
+                # away are lost, as with any pub/sub
+                delay = min(max(delay * 2, 0.1), settings.REDIS_RETRY_INTERVAL)
+                print(f"Broker lost its Redis subscription ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            if delay:
+                print(f"Broker resubscribed to {len(self._handlers)} topic(s)")
+                delay = 0.0
+            if not message or message.get("type") != "message":
+                continue
+
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            topic = channel[len(self.CHANNEL_PREFIX):]
+
+            try:
+                event = RawEvent(message["data"])
+            except ValueError as e:
+                # Not one of ours; one bad message mustn't stop the listener
+                print(f"Broker dropped a malformed message on {topic}: {e}")
+                continue
+            for handler in list(self._handlers.get(topic, ())):
+                try:
+                    await handler(topic, event)
+                except Exception as e:
+                    print(f"Broker handler error on {topic}: {e}")
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        await self.client.aclose()
+
+_broker: Optional[Broker] = None
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        if settings.BROKER_URL and settings.BROKER_URL not in ("memory", "none"):
+            try:
+                _broker = RedisBroker()
+            except Exception:
+                print("Redis broker not available, falling back to in-process broker")
+                _broker = InProcessBroker()
+        else:
+            _broker = InProcessBroker()
+    return _broker
+
+async def init_broker() -> Broker:
+    """
+    Create the broker and check that Redis answers. redis.asyncio connects
+    on first use, so an unreachable server would otherwise only show up as
+    failing publishes; called at startup, before anything subscribes.
+    """
+    global _broker
+    broker = get_broker()
+    if isinstance(broker, RedisBroker):
+        try:
+            await broker.client.ping()
+        except Exception as e:
+            print(f"Redis broker not reachable, falling back to in-process broker: {e}")
+            await broker.client.aclose()
+            broker = _broker = InProcessBroker()
+    return broker
@@ -1,8 +1,50 @@
+import asyncio
+import heapq
 import json
-from typing import Optional, Dict, Any
+import math
+import random
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, List, Tuple, Type
 from app.core.config import settings
 
+# How often a worker waiting on another worker's recomputation looks for its value
+LOCK_POLL_INTERVAL = 0.05
+# Keys per DEL when the outage journal is replayed into Redis
+JOURNAL_BATCH = 500
+
+def _decode_entry(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    if raw is None:
+        return None
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or "expires" not in entry:
+        return None
+    return entry
+
+def _refresh_early(entry: Dict[str, Any], beta: Optional[float]) -> bool:
+    # XFetch: recompute when now - delta * beta * ln(rand) passes the expiry
+    beta = beta if beta is not None else settings.CACHE_EARLY_REFRESH_BETA
+    if not beta:
+        return False
+    return time.time() - entry.get("delta", 0) * beta * math.log(1.0 - random.random()) >= entry["expires"]
+
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    REDIS_ERRORS: Tuple[Type[Exception], ...] = (RedisConnectionError, RedisTimeoutError, OSError)
+except ImportError:
+    REDIS_ERRORS = (OSError,)
+
 class CacheInterface:
+    def __init__(self):
+        # In-flight get_or_compute recomputations by key
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.compute_stats = {"computed": 0, "coalesced": 0, "early_refreshes": 0, "lock_waits": 0}
+    
     async def get(self, key: str) -> Optional[str]:
         raise NotImplementedError
     
@@ -11,44 +53,654 @@ class CacheInterface:
     
     async def delete(self, key: str):
         raise NotImplementedError
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """The values of the keys that are present."""
+        values = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+    
+    async def set_many(self, items: Dict[str, str], expire: Optional[int] = None):
+        for key, value in items.items():
+            await self.set(key, value, expire=expire)
+    
+    async def get_many_with_ttl(self, keys: Iterable[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        """
+        The present keys' values with the seconds they have left, None
+        when they don't expire or the backend can't tell.
+        """
+        return {key: (value, None) for key, value in (await self.get_many(keys)).items()}
+    
+    async def add(self, key: str, value: str, expire: Optional[int] = None) -> bool:
+        """Set `key` only if it is absent; True if this call set it."""
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, expire=expire)
+        return True
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        beta: Optional[float] = None,
+    ) -> Any:
+        """
+        The cached value of `key`, computing and caching it when missing.
+        
+        Values are stored as JSON with how long they took to compute, which
+        drives probabilistic early refresh (XFetch): the closer an entry is
+        to expiry and the slower it is to compute, the likelier a read
+        recomputes it ahead of time, so a hot key doesn't expire for all its
+        readers at once. Recomputation is single-flight: concurrent callers
+        in this process share one computation, and a `lock:` key taken with
+        add() keeps other workers from starting their own. They serve the
+        value they have, or wait up to CACHE_LOCK_TIMEOUT for the winner's.
+        """
+        entry = _decode_entry(await self.get(key))
+        if entry is not None and not _refresh_early(entry, beta):
+            return entry["value"]
+        
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.compute_stats["coalesced"] += 1
+            if entry is not None:
+                return entry["value"]
+            return await asyncio.shield(flight)
+        
+        if entry is not None:
+            self.compute_stats["early_refreshes"] += 1
+        flight = asyncio.ensure_future(self._recompute(key, compute, ttl, entry))
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._flights.pop(key, None) if self._flights.get(key) is done else None)
+        # Shielded: a caller that goes away doesn't cancel the others' value
+        return await asyncio.shield(flight)
+    
+    async def _recompute(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale: Optional[Dict[str, Any]]) -> Any:
+        lock = f"lock:{key}"
+        if not await self.add(lock, "1", expire=settings.CACHE_LOCK_TIMEOUT):
+            if stale is not None:
+                return stale["value"]
+            self.compute_stats["lock_waits"] += 1
+            deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                entry = _decode_entry(await self.get(key))
+                if entry is not None:
+                    return entry["value"]
+            # The other worker died or is too slow; compute it here
+        
+        try:
+            start = time.monotonic()
+            value = await compute()
+            delta = time.monotonic() - start
+            self.compute_stats["computed"] += 1
+            entry = {"value": value, "delta": delta, "expires": time.time() + ttl}
+            await self.set(key, json.dumps(entry), expire=ttl)
+            return value
+        finally:
+            await self.delete(lock)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {}
+    
+    async def start(self):
+        """Start background work, if any; called once the event loop runs."""
+    
+    async def close(self):
+        pass
 
 class RedisCache(CacheInterface):
-    def __init__(self):
-        import redis
-        self.client = redis.from_url(settings.REDIS_URL)
+    """
+    Redis cache on redis.asyncio, so a round trip never blocks the event loop.
+
+    Every call goes through one connection pool per URL, capped at
+    REDIS_MAX_CONNECTIONS; batch operations are a single MGET or one
+    pipelined round trip. When Redis can't be reached the cache degrades to
+    an in-process fallback instead of failing requests, and probes Redis
+    again (PING) every REDIS_RETRY_INTERVAL seconds. The fallback is
+    cleared on recovery, since writes made during the outage never reached
+    Redis; the keys written or deleted meanwhile are journaled and deleted
+    in Redis before it is used again, so a value invalidated during the
+    outage (a generation bump, a revocation) can't come back from Redis.
+    """
+    
+    def __init__(self, url: Optional[str] = None, client: Any = None, fallback: Optional[CacheInterface] = None):
+        super().__init__()
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.Redis(connection_pool=get_redis_pool(url or settings.REDIS_URL))
+        self.client = client
+        self.fallback = fallback or InMemoryCache()
+        self.healthy = True
+        self._retry_at = 0.0
+        self._probe: Optional[asyncio.Lock] = None
+        self._journal: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.fallbacks = 0
+    
+    def _failed(self, error: Exception):
+        self.errors += 1
+        if self.healthy:
+            print(f"Redis cache unavailable, using in-memory fallback: {error}")
+        self.healthy = False
+        self._retry_at = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+    
+    async def _available(self) -> bool:
+        if self.healthy:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        if self._probe is None:
+            self._probe = asyncio.Lock()
+        if self._probe.locked():
+            # Another request is probing; don't pile onto a dead server
+            return False
+        async with self._probe:
+            if await self.ping() and await self._replay_journal():
+                self.healthy = True
+                if isinstance(self.fallback, InMemoryCache):
+                    self.fallback.clear()
+                print("Redis cache reachable again")
+            return self.healthy
+    
+    async def _replay_journal(self) -> bool:
+        # Keys journaled while this runs are picked up by the next batch
+        while self._journal:
+            keys = list(self._journal)[:JOURNAL_BATCH]
+            try:
+                await self.client.delete(*keys)
+            except REDIS_ERRORS as e:
+                self._failed(e)
+                return False
+            self._journal.difference_update(keys)
+        return True
+    
+    async def ping(self) -> bool:
+        """Health check: True if Redis answers."""
+        try:
+            await self.client.ping()
+            return True
+        except REDIS_ERRORS as e:
+            self._failed(e)
+            return False
     
     async def get(self, key: str) -> Optional[str]:
-        value = self.client.get(key)
-        return value.decode() if value else None
+        if await self._available():
+            try:
+                value = await self.client.get(key)
+            except REDIS_ERRORS as e:
+                self._failed(e)
+            else:
+                if value is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return value.decode()
+        self.fallbacks += 1
+        return await self.fallback.get(key)
     
     async def set(self, key: str, value: str, expire: Optional[int] = None):
-        self.client.set(key, value, ex=expire)
+        if await self._available():
+            try:
+                await self.client.set(key, value, ex=expire)
+                return
+            except REDIS_ERRORS as e:
+                self._failed(e)
+        self.fallbacks += 1
+        self._journal.add(key)
+        await self.fallback.set(key, value, expire=expire)
     
     async def delete(self, key: str):
-        self.client.delete(key)
+        if await self._available():
+            try:
+                await self.client.delete(key)
+                return
+            except REDIS_ERRORS as e:
+                self._failed(e)
+        self.fallbacks += 1
+        self._journal.add(key)
+        await self.fallback.delete(key)
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        if await self._available():
+            try:
+                values = await self.client.mget(keys)
+            except REDIS_ERRORS as e:
+                self._failed(e)
+            else:
+                found = {key: value.decode() for key, value in zip(keys, values) if value is not None}
+                self.hits += len(found)
+                self.misses += len(keys) - len(found)
+                return found
+        self.fallbacks += 1
+        return await self.fallback.get_many(keys)
+    
+    async def get_many_with_ttl(self, keys: Iterable[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        if await self._available():
+            try:
+                # GET and PTTL of every key in one round trip
+                async with self.client.pipeline(transaction=False) as pipeline:
+                    for key in keys:
+                        pipeline.get(key)
+                        pipeline.pttl(key)
+                    replies = await pipeline.execute()
+            except REDIS_ERRORS as e:
+                self._failed(e)
+            else:
+                found = {}
+                for key, value, ttl_ms in zip(keys, replies[::2], replies[1::2]):
+                    if value is not None:
+                        # PTTL is -1 for keys without an expiry
+                        found[key] = (value.decode(), ttl_ms / 1000 if ttl_ms >= 0 else None)
+                self.hits += len(found)
+                self.misses += len(keys) - len(found)
+                return found
+        self.fallbacks += 1
+        return await self.fallback.get_many_with_ttl(keys)
+    
+    async def set_many(self, items: Dict[str, str], expire: Optional[int] = None):
+        if not items:
+            return
+        if await self._available():
+            try:
+                async with self.client.pipeline(transaction=False) as pipeline:
+                    for key, value in items.items():
+                        pipeline.set(key, value, ex=expire)
+                    await pipeline.execute()
+                return
+            except REDIS_ERRORS as e:
+                self._failed(e)
+        self.fallbacks += 1
+        self._journal.update(items)
+        await self.fallback.set_many(items, expire=expire)
+    
+    async def add(self, key: str, value: str, expire: Optional[int] = None) -> bool:
+        if await self._available():
+            try:
+                return bool(await self.client.set(key, value, ex=expire, nx=True))
+            except REDIS_ERRORS as e:
+                self._failed(e)
+        self.fallbacks += 1
+        self._journal.add(key)
+        return await self.fallback.add(key, value, expire=expire)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        pool = self.client.connection_pool
+        return {
+            "backend": "redis",
+            "healthy": self.healthy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "errors": self.errors,
+            "fallback_calls": self.fallbacks,
+            "journaled_keys": len(self._journal),
+            "connections": len(getattr(pool, "_in_use_connections", ())) + len(getattr(pool, "_available_connections", ())),
+            "fallback": self.fallback.stats(),
+            **self.compute_stats,
+        }
+    
+    async def start(self):
+        await self.ping()
+        await self.fallback.start()
+    
+    async def close(self):
+        await self.fallback.close()
+        await self.client.aclose()
 
 class InMemoryCache(CacheInterface):
-    def __init__(self):
-        self._cache: Dict[str, Any] = {}
+    """
+    In-process LRU cache with TTL expiry and a memory budget.
+
+    Entries live in an OrderedDict in recency order, so get/set/delete are
+    O(1) and the least recently used entry is evicted first once the cache
+    holds more than `max_bytes` (estimated with sys.getsizeof) or
+    `max_entries`. Expired entries are dropped when read, and a background
+    sweep pops them off an expiry heap so entries nobody reads again don't
+    hold memory until they are evicted.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        super().__init__()
+        self.max_bytes = max_bytes if max_bytes is not None else settings.CACHE_MAX_BYTES
+        self.max_entries = max_entries if max_entries is not None else settings.CACHE_MAX_ENTRIES
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.CACHE_SWEEP_INTERVAL
+        # key -> (value, expires_at or None, size)
+        self._cache: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        # (expires_at, key); stale pairs are skipped when popped
+        self._expiry: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+    
+    @staticmethod
+    def _size(key: str, value: Any) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value)
+    
+    def _lookup(self, key: str, now: float) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def _store(self, key: str, value: Any, expire: Optional[int], now: float):
+        self._remove(key)
+        size = self._size(key, value)
+        if self.max_bytes and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.rejected += 1
+            return
+        expires_at = now + expire if expire else None
+        self._cache[key] = (value, expires_at, size)
+        self._bytes += size
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, key))
+            if len(self._expiry) > 2 * len(self._cache) + 64:
+                self._compact_expiry()
+        while (self.max_bytes and self._bytes > self.max_bytes) or (
+            self.max_entries and len(self._cache) > self.max_entries
+        ):
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str) -> bool:
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+    
+    def _compact_expiry(self):
+        # Overwritten and deleted keys leave stale heap pairs behind
+        self._expiry = [
+            (expires_at, key) for key, (_, expires_at, _) in self._cache.items() if expires_at is not None
+        ]
+        heapq.heapify(self._expiry)
+    
+    async def get(self, key: str) -> Optional[str]:
+        return self._lookup(key, time.time())
+    
+    async def set(self, key: str, value: str, expire: Optional[int] = None):
+        self._store(key, value, expire, time.time())
+    
+    async def delete(self, key: str):
+        self._remove(key)
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        now = time.time()
+        values = {}
+        for key in keys:
+            value = self._lookup(key, now)
+            if value is not None:
+                values[key] = value
+        return values
+    
+    async def set_many(self, items: Dict[str, str], expire: Optional[int] = None):
+        now = time.time()
+        for key, value in items.items():
+            self._store(key, value, expire, now)
+    
+    async def get_many_with_ttl(self, keys: Iterable[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        now = time.time()
+        found = {}
+        for key in keys:
+            value = self._lookup(key, now)
+            if value is not None:
+                expires_at = self._cache[key][1]
+                found[key] = (value, expires_at - now if expires_at is not None else None)
+        return found
+    
+    async def add(self, key: str, value: str, expire: Optional[int] = None) -> bool:
+        # Atomic: nothing else runs on the event loop between lookup and store
+        now = time.time()
+        if self._lookup(key, now) is not None:
+            return False
+        self._store(key, value, expire, now)
+        return True
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop every expired entry; returns how many."""
+        now = now if now is not None else time.time()
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._cache.get(key)
+            # Only if the key wasn't overwritten with a later expiry since
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        return removed
+    
+    async def _sweep_periodically(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+    
+    async def start(self):
+        if self.sweep_interval and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+    
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+    
+    def clear(self):
+        self._cache.clear()
+        self._expiry.clear()
+        self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expirations,
+            "rejected": self.rejected,
+            **self.compute_stats,
+        }
+
+class TieredCache(CacheInterface):
+    """
+    An in-process L1 (InMemoryCache) in front of a shared L2 such as Redis.
+    
+    Reads try L1 first and copy L2 hits into it; writes go to both. L1
+    entries live at most CACHE_L1_TTL seconds, and no longer than the L2
+    entry they were read from (its remaining TTL comes back with the value
+    in the same round trip). Every write or delete is
+    broadcast on the broker so other workers drop their L1 copy, keeping
+    hot reads off the network without serving stale values for long. Lock
+    keys for get_or_compute are taken in L2 (add), so single-flight holds
+    across the whole fleet.
+    """
+    
+    TOPIC = "cache:invalidate"
+    
+    def __init__(self, l2: CacheInterface, l1: Optional[InMemoryCache] = None, l1_ttl: Optional[int] = None, broker: Any = None):
+        super().__init__()
+        self.l1 = l1 or InMemoryCache(max_bytes=settings.CACHE_L1_MAX_BYTES)
+        self.l2 = l2
+        self.l1_ttl = l1_ttl if l1_ttl is not None else settings.CACHE_L1_TTL
+        self.origin = uuid.uuid4().hex
+        self._broker = broker
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+    
+    @property
+    def broker(self):
+        if self._broker is None:
+            from app.core.broker import get_broker
+            self._broker = get_broker()
+        return self._broker
+    
+    def _l1_expire(self, expire: Optional[int]) -> Optional[int]:
+        if not self.l1_ttl:
+            return expire
+        return min(expire, self.l1_ttl) if expire else self.l1_ttl
+    
+    async def _fill_l1(self, found: Dict[str, Tuple[str, Optional[float]]]):
+        # An L1 copy never outlives the L2 entry it was read from; one
+        # expiring within the second isn't copied at all
+        for key, (value, ttl) in found.items():
+            if ttl is not None and ttl < 1:
+                continue
+            await self.l1.set(key, value, expire=self._l1_expire(int(ttl) if ttl is not None else None))
+    
+    async def _invalidate_others(self, keys: List[str]):
+        from app.core.events import CacheInvalidation
+        try:
+            await self.broker.publish(self.TOPIC, CacheInvalidation(keys, self.origin))
+            self.invalidations_sent += 1
+        except Exception as e:
+            # Other workers' copies still expire after CACHE_L1_TTL
+            print(f"Cache invalidation not published: {e}")
+    
+    async def _on_invalidation(self, topic: str, event):
+        data = event.to_dict()
+        if data.get("origin") == self.origin:
+            return
+        self.invalidations_received += 1
+        for key in data.get("keys", ()):
+            await self.l1.delete(key)
     
     async def get(self, key: str) -> Optional[str]:
-        return self._cache.get(key)
+        value = await self.l1.get(key)
+        if value is None:
+            found = await self.l2.get_many_with_ttl([key])
+            if key not in found:
+                return None
+            await self._fill_l1(found)
+            value = found[key][0]
+        return value
     
     async def set(self, key: str, value: str, expire: Optional[int] = None):
-        # Note: expire is ignored in this simple implementation
-        self._cache[key] = value
+        await self.l2.set(key, value, expire=expire)
+        await self.l1.set(key, value, expire=self._l1_expire(expire))
+        await self._invalidate_others([key])
     
     async def delete(self, key: str):
-        self._cache.pop(key, None)
+        await self.l2.delete(key)
+        await self.l1.delete(key)
+        await self._invalidate_others([key])
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        values = await self.l1.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = await self.l2.get_many_with_ttl(missing)
+            await self._fill_l1(found)
+            values.update((key, value) for key, (value, _) in found.items())
+        return values
+    
+    async def set_many(self, items: Dict[str, str], expire: Optional[int] = None):
+        if not items:
+            return
+        await self.l2.set_many(items, expire=expire)
+        await self.l1.set_many(items, expire=self._l1_expire(expire))
+        await self._invalidate_others(list(items))
+    
+    async def add(self, key: str, value: str, expire: Optional[int] = None) -> bool:
+        # Only L2 is authoritative for who got the key
+        return await self.l2.add(key, value, expire=expire)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "tiered",
+            "l1": self.l1.stats(),
+            "l2": self.l2.stats(),
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            **self.compute_stats,
+        }
+    
+    async def start(self):
+        await self.l1.start()
+        await self.l2.start()
+        await self.broker.subscribe(self.TOPIC, self._on_invalidation)
+    
+    async def close(self):
+        try:
+            await self.broker.unsubscribe(self.TOPIC, self._on_invalidation)
+        except Exception:
+            pass
+        await self.l1.close()
+        await self.l2.close()
+
+_redis_pools: Dict[str, Any] = {}
+
+def get_redis_pool(url: str):
+    """One connection pool per Redis URL, shared by every client in the process."""
+    pool = _redis_pools.get(url)
+    if pool is None:
+        import redis.asyncio as aioredis
+        # Blocking: past max_connections, callers wait for a free connection
+        # instead of failing
+        pool = _redis_pools[url] = aioredis.BlockingConnectionPool.from_url(
+            url,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return pool
 
 # Factory function to get cache instance
 def get_cache() -> CacheInterface:
     if settings.REDIS_URL and settings.REDIS_URL != "none":
         try:
-            return RedisCache()
-        except Exception:
-            print("Redis not available, falling back to in-memory cache")
+            # Connecting is lazy; an unreachable server is handled per call
+            redis_cache = RedisCache()
+        except Exception as e:
+            print(f"Redis cache not available, falling back to in-memory cache: {e}")
             return InMemoryCache()
+        if settings.CACHE_L1_MAX_BYTES:
+            return TieredCache(redis_cache)
+        return redis_cache
     else:
         return InMemoryCache()
 
@@ -4,11 +4,85 @@ from typing import Optional
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./langgraph_workflow.db"
     REDIS_URL: str = "none"  # Use "none" for in-memory cache
+    REDIS_MAX_CONNECTIONS: int = 50  # shared pool per Redis URL
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds idle before a pooled connection is pinged on checkout
+    REDIS_RETRY_INTERVAL: float = 5.0  # seconds between reconnect probes while on the fallback cache
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # in-memory cache budget; least recently used entries go first
+    CACHE_MAX_ENTRIES: int = 0  # 0 bounds the in-memory cache by bytes only
+    CACHE_SWEEP_INTERVAL: float = 30.0  # seconds between expired-entry sweeps; 0 disables
+    CACHE_L1_MAX_BYTES: int = 16 * 1024 * 1024  # in-process tier in front of Redis; 0 disables it
+    CACHE_L1_TTL: int = 30  # longest an L1 copy is served if an invalidation message is lost
+    CACHE_LOCK_TIMEOUT: int = 30  # seconds a worker holds a recompute lock / others wait for its value
+    CACHE_EARLY_REFRESH_BETA: float = 1.0  # >1 refreshes hot entries earlier, 0 disables early refresh
     SECRET_KEY: str = "your-secret-key-here"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
+    AUTH_CACHE_TTL: int = 60  # seconds a resolved token is trusted without a user lookup; 0 disables
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4  # threads for bcrypt hashing/verification
     OPENAI_API_KEY: Optional[str] = None
     
+    # GitHub code search
+    GITHUB_API_URL: str = "https://api.github.com"
+    GITHUB_TOKEN: Optional[str] = None
+    GITHUB_MAX_CONNECTIONS: int = 10
+    GITHUB_MAX_CONCURRENT_PAGES: int = 4
+    GITHUB_ETAG_CACHE_TTL: int = 3600
+    
+    # Generated artifacts (PDF reports, ...)
+    ARTIFACT_STORE_PATH: str = "./artifacts"
+    
+    # arXiv results shared between identical literature searches
+    LITERATURE_SEARCH_CACHE_TTL: int = 3600
+    
+    # Recorded agent runs replayed for identical inputs (0 disables)
+    AGENT_REPLAY_TTL: int = 3600
+    AGENT_REPLAY_MAX_EVENTS: int = 1000  # longer runs are not recorded
+    
+    # Research plan reuse for near-duplicate questions
+    PLAN_REUSE_THRESHOLD: float = 0.8
+    PLAN_STORE_MAX_ENTRIES: int = 1000
+    PLAN_STORE_DIR: Optional[str] = None  # None keeps plans in memory only
+    
+    # Pub/sub for execution events shared between viewers and workers
+    BROKER_URL: str = "memory"  # "memory" or a redis:// URL
+    
+    # Per-connection WebSocket send queues
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest, drop_newest or disconnect
+    WS_SLOW_CONSUMER_DROPS: int = 1000  # disconnect after this many drops without draining; 0 disables
+    WS_SEND_TIMEOUT: float = 10.0
+    
+    # Delta-encoded state updates (clients opt in with ?delta=1)
+    DELTA_SNAPSHOT_INTERVAL: int = 20  # full snapshot after this many patches
+    STATE_HISTORY_WINDOW: int = 32  # versions kept per thread to diff against
+    
+    # Resumable research sessions
+    SESSION_LOG_SIZE: int = 256  # events kept per session for replay
+    SESSION_RESUME_TTL: int = 1800  # seconds a detached, idle session can be resumed
+    
+    # Shared state for running several workers
+    SESSION_STORE_URL: str = "memory"  # "memory" or a redis:// URL
+    CHECKPOINT_URL: str = "memory"  # "memory" or sqlite:///path.db
+    EXECUTION_LEASE_TTL: float = 30.0  # seconds; renewed while an execution runs
+    
+    # Workflow execution history retention
+    EXECUTION_ARCHIVE_AFTER_DAYS: int = 7  # finished executions older than this move to cold storage; 0 disables
+    EXECUTION_RETENTION_DAYS: int = 365  # summary rows and archives are deleted after this; 0 keeps them
+    EXECUTION_KEEP_LATEST: int = 1  # most recent executions per workflow never archived (reruns read them)
+    EXECUTION_ARCHIVE_INTERVAL: int = 3600  # seconds between archiver runs; 0 disables the background task
+    EXECUTION_ARCHIVE_BATCH: int = 500
+    
+    # Serialized workflow responses (ETag / conditional GET)
+    WORKFLOW_CACHE_TTL: int = 300
+    
+    # Execution tracing (graph nodes, LLM calls, HTTP requests, DB commits, socket sends)
+    TRACE_EXPORTER: str = "memory"  # memory, file or none
+    TRACE_FILE: str = "./traces.jsonl"  # used by the file exporter
+    TRACE_MAX_TRACES: int = 200  # traces kept by the in-memory exporter
+    TRACE_MAX_SPANS: int = 5000  # spans kept per trace; later ones are counted and dropped
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,391 @@
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, Union
+from collections import OrderedDict
+import asyncio
+import itertools
+
+from fastapi import WebSocket
+
+from app.core.broker import Broker, get_broker
+from app.core.config import settings
+from app.core.deltas import StateHistory, diff
+from app.core.events import Event, StatePatch, StateSnapshot, StateVersion, StatusUpdate, send_event
+from app.core.metrics import ws_connections_opened, ws_events_dropped, ws_events_sent
+from app.core.serialization import EventSerializer, negotiate_serializer
+from app.core.tracing import span
+
+# Close code sent to consumers that cannot keep up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+class Connection:
+    """
+    A socket with a bounded outbound queue drained by its own writer task.
+
+    Producers never wait on the network: `enqueue` returns immediately. A
+    queued node update is replaced by a newer one for the same node, and
+    when the queue is full the overflow policy decides what to drop. A
+    consumer that keeps overflowing without ever catching up, or whose send
+    stalls past the timeout, is disconnected.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        serializer: EventSerializer,
+        max_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        slow_consumer_drops: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        on_close=None,
+        delta: bool = False,
+    ):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.serializer = serializer
+        self.max_size = max_size or settings.WS_SEND_QUEUE_SIZE
+        self.overflow_policy = overflow_policy or settings.WS_SEND_OVERFLOW_POLICY
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow_policy}")
+        self.slow_consumer_drops = (
+            slow_consumer_drops if slow_consumer_drops is not None else settings.WS_SLOW_CONSUMER_DROPS
+        )
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT
+        self.on_close = on_close
+
+        # Delta-encoded state: last version acknowledged per topic, and
+        # patches sent since the last full snapshot
+        self.delta = delta
+        self.acked: Dict[str, int] = {}
+        self.patches_since_snapshot: Dict[str, int] = {}
+        # Live events held per topic until a replay of that topic is queued,
+        # and the last sequence number replayed, below which live ones are dropped
+        self.held: Dict[str, List[Event]] = {}
+        self.replayed: Dict[str, int] = {}
+
+        self._pending: "OrderedDict[Hashable, Event]" = OrderedDict()
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drops_since_drain = 0
+        self.closed = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+        self._writer = asyncio.create_task(self._write())
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, event: Event, topic: Optional[str] = None, bounded: bool = True) -> bool:
+        """
+        Queue an event for sending; returns False if it was not queued.
+        Unbounded enqueues are for replays, which are already size-limited.
+        """
+        if self.closed:
+            return False
+
+        key: Optional[Tuple[Optional[str], ...]] = event.coalesce_key()
+        if key is not None:
+            # Updates from different executions never supersede each other
+            key = (topic,) + key
+        if key is not None and key in self._pending:
+            self._pending[key] = event
+            self._pending.move_to_end(key)
+            self.coalesced += 1
+            return True
+
+        if bounded and len(self._pending) >= self.max_size:
+            if self.overflow_policy == "disconnect":
+                self._close_slow_consumer()
+                return False
+            self.dropped += 1
+            ws_events_dropped.inc()
+            self._drops_since_drain += 1
+            if self.slow_consumer_drops and self._drops_since_drain >= self.slow_consumer_drops:
+                self._close_slow_consumer()
+                return False
+            if self.overflow_policy == "drop_newest":
+                return False
+            self._pending.popitem(last=False)
+
+        self._pending[key if key is not None else next(self._seq)] = event
+        self._drained.clear()
+        self._ready.set()
+        return True
+
+    async def drain(self, timeout: float):
+        """Wait (up to timeout) until everything queued has been sent."""
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _write(self):
+        try:
+            while True:
+                while not self._pending:
+                    self._drops_since_drain = 0
+                    self._drained.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+
+                _, event = self._pending.popitem(last=False)
+                # Traced as a child of the span the event was created in
+                with span("ws.send", parent=event.span, client_id=self.client_id, event=event.type):
+                    await asyncio.wait_for(
+                        send_event(self.websocket, event, self.serializer),
+                        timeout=self.send_timeout
+                    )
+                self.sent += 1
+                ws_events_sent.inc()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            await self._close_socket(SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            # The socket is gone; the receive loop will see the disconnect
+            pass
+        self.close()
+
+    def _close_slow_consumer(self):
+        print(f"Disconnecting slow consumer {self.client_id} ({len(self._pending)} queued, {self.dropped} dropped)")
+        self.close()
+        asyncio.create_task(self._close_socket(SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if self.on_close is not None:
+            self.on_close(self.client_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._pending),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+class ConnectionManager:
+    """
+    Tracks open sockets and their topic subscriptions.
+
+    Events published to a topic (an execution or thread id) go through the
+    broker once; each process registers a single broker handler per topic
+    and fans the event out to its local subscribers, encoding it at most
+    once per wire format. Sends are queued per connection, so publishing
+    never waits on a client's network.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None):
+        self.connections: Dict[str, Connection] = {}
+        self.subscribers: Dict[str, Set[str]] = {}
+        self.subscriptions: Dict[str, Set[str]] = {}
+        self.histories: Dict[str, StateHistory] = {}
+        self._broker = broker
+
+    @property
+    def broker(self) -> Broker:
+        if self._broker is None:
+            self._broker = get_broker()
+        return self._broker
+
+    async def connect(self, websocket: WebSocket, client_id: str) -> EventSerializer:
+        serializer, subprotocol = negotiate_serializer(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        ws_connections_opened.inc()
+        self.connections[client_id] = Connection(
+            client_id, websocket, serializer,
+            on_close=self._connection_closed,
+            delta=websocket.query_params.get("delta") in ("1", "true"),
+        )
+        return serializer
+
+    def _connection_closed(self, client_id: str):
+        # Subscriptions are released by disconnect() once the handler exits
+        self.connections.pop(client_id, None)
+
+    async def disconnect(self, client_id: str):
+        connection = self.connections.pop(client_id, None)
+        if connection is not None:
+            connection.close()
+        for topic in list(self.subscriptions.get(client_id, ())):
+            await self.unsubscribe(client_id, topic)
+        self.subscriptions.pop(client_id, None)
+
+    async def flush(self, client_id: str, timeout: float = 1.0):
+        connection = self.connections.get(client_id)
+        if connection is not None:
+            await connection.drain(timeout)
+
+    async def send_message(self, message: Union[Event, dict], client_id: str):
+        connection = self.connections.get(client_id)
+        if connection is not None:
+            if not isinstance(message, Event):
+                message = StatusUpdate(**message)
+            connection.enqueue(message)
+
+    async def subscribe(self, client_id: str, topic: str, hold: bool = False):
+        """
+        With `hold`, events published to the topic are kept back until
+        `replay` is called for it, so none are sent twice or out of order.
+        """
+        connection = self.connections.get(client_id)
+        if hold and connection is not None:
+            connection.held.setdefault(topic, [])
+        subscribers = self.subscribers.get(topic)
+        if subscribers is None:
+            subscribers = self.subscribers[topic] = set()
+            await self.broker.subscribe(topic, self._deliver)
+        subscribers.add(client_id)
+        self.subscriptions.setdefault(client_id, set()).add(topic)
+
+    async def unsubscribe(self, client_id: str, topic: str):
+        self.subscriptions.get(client_id, set()).discard(topic)
+        subscribers = self.subscribers.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(client_id)
+        if not subscribers:
+            del self.subscribers[topic]
+            self.histories.pop(topic, None)
+            await self.broker.unsubscribe(topic, self._deliver)
+
+    async def publish(self, topic: str, message: Union[Event, dict]):
+        if not isinstance(message, Event):
+            message = StatusUpdate(**message)
+        await self.broker.publish(topic, message)
+
+    async def _deliver(self, topic: str, event: Event):
+        history = None
+        if event.type == "state_version":
+            event = StateVersion.from_event(event)
+            history = self.histories.setdefault(topic, StateHistory())
+            history.add(event.version, event.state)
+
+        for client_id in list(self.subscribers.get(topic, ())):
+            connection = self.connections.get(client_id)
+            if connection is None:
+                continue
+            if topic in connection.held:
+                connection.held[topic].append(event)
+            elif event.seq is not None and event.seq <= connection.replayed.get(topic, 0):
+                continue
+            elif history is not None and isinstance(event, StateVersion):
+                connection.enqueue(self._state_event(connection, topic, event, history), topic)
+            else:
+                connection.enqueue(event, topic)
+
+    def _state_event(
+        self, connection: Connection, topic: str, event: StateVersion, history: StateHistory
+    ) -> Event:
+        if not connection.delta:
+            return event.legacy()
+
+        base = connection.acked.get(topic)
+        sent = connection.patches_since_snapshot.get(topic, 0)
+        if base is not None and sent < settings.DELTA_SNAPSHOT_INTERVAL:
+            ops = history.patch(base, event.version)
+            if ops is not None:
+                connection.patches_since_snapshot[topic] = sent + 1
+                return history.shared(
+                    ("patch", base, event.version),
+                    lambda: self._sequenced(
+                        StatePatch(event.thread_id, event.node, base, event.version, ops), event
+                    )
+                )
+
+        connection.patches_since_snapshot[topic] = 0
+        return history.shared(
+            ("snapshot", event.version),
+            lambda: self._sequenced(
+                StateSnapshot(event.thread_id, event.node, event.version, event.state), event
+            )
+        )
+
+    @staticmethod
+    def _sequenced(derived: Event, event: Event) -> Event:
+        derived.seq = event.seq
+        return derived
+
+    def replay(self, client_id: str, topic: str, events: List[Event]):
+        """
+        Queue logged events for one client, converted as if just published,
+        followed by any held live events the log did not already contain.
+        """
+        connection = self.connections.get(client_id)
+        if connection is None:
+            return
+
+        held = connection.held.pop(topic, [])
+        last = max((event.seq for event in events if event.seq is not None), default=0)
+        events = list(events) + [event for event in held if event.seq is None or event.seq > last]
+        connection.replayed[topic] = max(last, connection.replayed.get(topic, 0))
+
+        history = self.histories.get(topic)
+        if history is None:
+            # Nobody was watching; rebuild the window from the log
+            history = self.histories[topic] = StateHistory()
+            for event in events:
+                if event.type == "state_version":
+                    event = StateVersion.from_event(event)
+                    history.add(event.version, event.state)
+
+        for event in events:
+            if event.type == "state_version":
+                event = StateVersion.from_event(event)
+                if event.version in history:
+                    event = self._state_event(connection, topic, event, history)
+                elif connection.delta:
+                    event = self._sequenced(
+                        StateSnapshot(event.thread_id, event.node, event.version, event.state), event
+                    )
+                else:
+                    event = event.legacy()
+            connection.enqueue(event, topic, bounded=False)
+
+    def ack(self, client_id: str, topic: str, version: int):
+        """Record the state version a delta client has applied."""
+        connection = self.connections.get(client_id)
+        if connection is not None and version > connection.acked.get(topic, -1):
+            connection.acked[topic] = version
+
+    def state_patch(self, client_id: str, topic: str, state: Dict[str, Any]):
+        """(base, ops) turning the client's acknowledged state into `state`, if known."""
+        connection = self.connections.get(client_id)
+        history = self.histories.get(topic)
+        if connection is None or not connection.delta or history is None:
+            return None
+        base = connection.acked.get(topic)
+        if base is None or base not in history:
+            return None
+        return base, diff(history.get(base), state)
+
+    def is_delta(self, client_id: str) -> bool:
+        connection = self.connections.get(client_id)
+        return connection is not None and connection.delta
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.connections),
+            "topics": len(self.subscribers),
+            "queued": sum(len(c) for c in self.connections.values()),
+            "dropped": sum(c.dropped for c in self.connections.values()),
+            "coalesced": sum(c.coalesced for c in self.connections.values()),
+        }
+
+manager = ConnectionManager()
\ No newline at end of file
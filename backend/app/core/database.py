@@ -1,8 +1,13 @@
-from sqlalchemy import create_engine
+import os
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import db_commit_seconds
+from app.core.tracing import start_span
 
 # SQLite specific settings
 connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
@@ -12,6 +17,42 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Commit latency, flush included, for every session made by SessionLocal;
+# commits made within a trace also get a span
+@event.listens_for(SessionLocal, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+    session.info["commit_span"] = start_span("db.commit")
+
+@event.listens_for(SessionLocal, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        db_commit_seconds.observe(time.perf_counter() - started)
+    commit_span = session.info.pop("commit_span", None)
+    if commit_span is not None:
+        commit_span.end()
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _commit_failed(session):
+    session.info.pop("commit_started", None)
+    commit_span = session.info.pop("commit_span", None)
+    if commit_span is not None:
+        commit_span.set(rolled_back=True)
+        commit_span.end()
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+def init_db():
+    """Create or upgrade the schema by running the Alembic migrations to head."""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,127 @@
+from typing import Any, Callable, Dict, List, Optional
+from collections import OrderedDict
+import copy
+
+from app.core.config import settings
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    JSON-patch (RFC 6902) operations turning `old` into `new`.
+
+    Only add/replace/remove are emitted. Dicts are diffed key by key and a
+    list that only grew (e.g. `messages`, which the graph appends to) is sent
+    as appends and one that was truncated as removals from the end; any
+    other list change replaces the list.
+    """
+    if old is new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(old[key], value, child))
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        if all(a is b or a == b for a, b in zip(old, new)):
+            if len(new) >= len(old):
+                return [{"op": "add", "path": f"{path}/-", "value": value} for value in new[len(old):]]
+            # Truncated, e.g. walking history backwards
+            return [{"op": "remove", "path": f"{path}/{i}"} for i in range(len(old) - 1, len(new) - 1, -1)]
+        return [{"op": "replace", "path": path, "value": new}]
+
+    if old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+def apply_patch(doc: Any, ops: List[Dict[str, Any]]) -> Any:
+    """Apply operations produced by `diff` to a copy of `doc`."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if op["path"] == "":
+            doc = copy.deepcopy(op["value"])
+            continue
+
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if op["op"] == "remove":
+            if isinstance(parent, list):
+                del parent[int(last)]
+            else:
+                del parent[last]
+        elif isinstance(parent, list):
+            value = copy.deepcopy(op["value"])
+            if last == "-":
+                parent.append(value)
+            elif op["op"] == "add":
+                parent.insert(int(last), value)
+            else:
+                parent[int(last)] = value
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return doc
+
+class StateHistory:
+    """
+    Recent versions of one thread's state, kept so a delta can be computed
+    against whatever version a client last acknowledged. Patches are cached
+    per (base, version), so viewers that acked the same version share one
+    patch.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window or settings.STATE_HISTORY_WINDOW
+        self._states: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._patches: Dict[tuple, List[Dict[str, Any]]] = {}
+        # Events built from these versions, shared between viewers so each
+        # is encoded once per wire format
+        self._events: Dict[tuple, Any] = {}
+
+    @property
+    def latest(self) -> Optional[int]:
+        return next(reversed(self._states)) if self._states else None
+
+    def __contains__(self, version: int) -> bool:
+        return version in self._states
+
+    def get(self, version: int) -> Optional[Dict[str, Any]]:
+        return self._states.get(version)
+
+    def add(self, version: int, state: Dict[str, Any]):
+        self._states[version] = state
+        while len(self._states) > self.window:
+            evicted, _ = self._states.popitem(last=False)
+            self._patches = {k: v for k, v in self._patches.items() if evicted not in k}
+            self._events = {k: v for k, v in self._events.items() if evicted not in k[1:]}
+
+    def patch(self, base: int, version: int) -> Optional[List[Dict[str, Any]]]:
+        if base not in self._states or version not in self._states:
+            return None
+        key = (base, version)
+        if key not in self._patches:
+            self._patches[key] = diff(self._states[base], self._states[version])
+        return self._patches[key]
+
+    def shared(self, key: tuple, factory: Callable[[], Any]) -> Any:
+        """Cache an object built from versions; `key` is (kind, *versions)."""
+        value = self._events.get(key)
+        if value is None:
+            value = self._events[key] = factory()
+        return value
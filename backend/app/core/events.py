@@ -0,0 +1,449 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime
+import json
+import time
+
+from fastapi import WebSocket
+
+from app.core.serialization import EventSerializer
+from app.core.tracing import current_span
+
+_last_timestamp = (0, "")
+
+def event_timestamp() -> str:
+    """ISO timestamp with millisecond resolution, formatted at most once per ms."""
+    global _last_timestamp
+    ms = int(time.time() * 1000)
+    if ms != _last_timestamp[0]:
+        _last_timestamp = (ms, datetime.fromtimestamp(ms / 1000).isoformat(timespec="milliseconds"))
+    return _last_timestamp[1]
+
+class Event:
+    """
+    Base class for messages pushed to WebSocket clients.
+
+    Events use __slots__ to stay small, and cache their encoded form per
+    serializer so an event sent to several sockets is only serialized once.
+    Events logged by a resumable session carry a sequence number, and
+    events created within a trace remember the span they were created in,
+    so sending them to each socket is traced as part of that execution.
+    """
+
+    __slots__ = ("timestamp", "seq", "_encoded", "span")
+    type = "event"
+
+    def __init__(self, timestamped: bool = True):
+        self.timestamp: Optional[str] = event_timestamp() if timestamped else None
+        self.seq: Optional[int] = None
+        self._encoded: Optional[Dict[str, Union[str, bytes]]] = None
+        self.span = current_span()
+
+    def payload(self) -> Dict[str, Any]:
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"type": self.type}
+        data.update(self.payload())
+        if self.timestamp is not None:
+            data["timestamp"] = self.timestamp
+        if self.seq is not None:
+            data["seq"] = self.seq
+        return data
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        """Events with the same key supersede each other while still queued."""
+        return None
+
+    def encode(self, serializer: EventSerializer) -> Union[str, bytes]:
+        if self._encoded is None:
+            self._encoded = {}
+        encoded = self._encoded.get(serializer.name)
+        if encoded is None:
+            encoded = serializer.dumps(self.to_dict())
+            self._encoded[serializer.name] = encoded
+        return encoded
+
+class ExecutionStarted(Event):
+    """Carries the execution's trace id, to pull up its timeline afterwards."""
+
+    __slots__ = ("thread_id", "trace_id")
+    type = "execution_started"
+
+    def __init__(self, thread_id: str, trace_id: Optional[str] = None):
+        super().__init__()
+        self.thread_id = thread_id
+        self.trace_id = trace_id
+
+    def payload(self) -> Dict[str, Any]:
+        if self.trace_id is None:
+            return {"thread_id": self.thread_id}
+        return {"thread_id": self.thread_id, "trace_id": self.trace_id}
+
+class ExecutionCompleted(Event):
+    __slots__ = ("thread_id",)
+    type = "execution_completed"
+
+    def __init__(self, thread_id: str):
+        super().__init__()
+        self.thread_id = thread_id
+
+    def payload(self) -> Dict[str, Any]:
+        return {"thread_id": self.thread_id}
+
+class NodeUpdate(Event):
+    """State update produced by a research graph node."""
+
+    __slots__ = ("node", "state")
+    type = "node_update"
+
+    def __init__(self, node: str, state: Any):
+        super().__init__()
+        self.node = node
+        self.state = state
+
+    def payload(self) -> Dict[str, Any]:
+        return {"node": self.node, "state": self.state}
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        return (self.type, self.node)
+
+class AgentNodeUpdate(Event):
+    """Output of an agent node in a saved workflow (WorkflowExecutor)."""
+
+    __slots__ = ("node_id", "data")
+    type = "node_update"
+
+    def __init__(self, node_id: str, data: Dict[str, Any]):
+        super().__init__(timestamped=False)
+        self.node_id = node_id
+        self.data = data
+
+    def payload(self) -> Dict[str, Any]:
+        return {"node_id": self.node_id, "data": self.data}
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        return (self.type, self.node_id)
+
+class StatusUpdate(Event):
+    """Untyped execution status message (`status`, `error`, ...)."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, **fields: Any):
+        super().__init__(timestamped=False)
+        self.fields = fields
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.fields)
+        if self.seq is not None:
+            data["seq"] = self.seq
+        return data
+
+class StateVersion(Event):
+    """
+    A numbered version of a thread's full state after a node ran.
+
+    Published on the thread's topic but never sent as is: the connection
+    manager turns it into a legacy `node_update` or, for clients that opted
+    into deltas, a `state_patch` / `state_snapshot`.
+    """
+
+    __slots__ = ("thread_id", "node", "version", "update", "state", "_legacy")
+    type = "state_version"
+
+    def __init__(self, thread_id: str, node: str, version: int, update: Any, state: Dict[str, Any]):
+        super().__init__()
+        self.thread_id = thread_id
+        self.node = node
+        self.version = version
+        self.update = update
+        self.state = state
+        self._legacy: Optional[NodeUpdate] = None
+
+    @classmethod
+    def from_event(cls, event: Event) -> "StateVersion":
+        if isinstance(event, cls):
+            return event
+        data = event.to_dict()
+        version = cls(data["thread_id"], data["node"], data["version"], data["update"], data["state"])
+        version.timestamp = data.get("timestamp")
+        version.seq = data.get("seq")
+        return version
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "thread_id": self.thread_id,
+            "node": self.node,
+            "version": self.version,
+            "update": self.update,
+            "state": self.state,
+        }
+
+    def legacy(self) -> "NodeUpdate":
+        if self._legacy is None:
+            self._legacy = NodeUpdate(self.node, self.update)
+            self._legacy.timestamp = self.timestamp
+            self._legacy.seq = self.seq
+        return self._legacy
+
+class StatePatch(Event):
+    """JSON-patch operations from the client's acknowledged version `base` to `version`."""
+
+    __slots__ = ("thread_id", "node", "base", "version", "ops")
+    type = "state_patch"
+
+    def __init__(self, thread_id: str, node: str, base: int, version: int, ops: List[Dict[str, Any]]):
+        super().__init__()
+        self.thread_id = thread_id
+        self.node = node
+        self.base = base
+        self.version = version
+        self.ops = ops
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "thread_id": self.thread_id,
+            "node": self.node,
+            "base": self.base,
+            "version": self.version,
+            "patch": self.ops,
+        }
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        # Every patch is relative to an acknowledged version, so a newer one
+        # can always replace a queued one
+        return ("state", self.thread_id)
+
+class StateSnapshot(Event):
+    __slots__ = ("thread_id", "node", "version", "state")
+    type = "state_snapshot"
+
+    def __init__(self, thread_id: str, node: str, version: int, state: Dict[str, Any]):
+        super().__init__()
+        self.thread_id = thread_id
+        self.node = node
+        self.version = version
+        self.state = state
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "thread_id": self.thread_id,
+            "node": self.node,
+            "version": self.version,
+            "state": self.state,
+        }
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        return ("state", self.thread_id)
+
+class History(Event):
+    """One page of checkpoint metadata, newest first; values load on demand."""
+
+    __slots__ = ("entries", "next_cursor")
+    type = "history"
+
+    def __init__(self, entries: List[Dict[str, Any]], next_cursor: Optional[int]):
+        super().__init__(timestamped=False)
+        self.entries = entries
+        self.next_cursor = next_cursor
+
+    def payload(self) -> Dict[str, Any]:
+        return {"entries": self.entries, "next_cursor": self.next_cursor}
+
+class CheckpointState(Event):
+    """State values of one checkpoint, or a patch against the client's acked version."""
+
+    __slots__ = ("step", "checkpoint_id", "state", "base", "ops")
+    type = "checkpoint"
+
+    def __init__(
+        self,
+        step: int,
+        checkpoint_id: str,
+        state: Dict[str, Any],
+        base: Optional[int] = None,
+        ops: Optional[List[Dict[str, Any]]] = None,
+    ):
+        super().__init__(timestamped=False)
+        self.step = step
+        self.checkpoint_id = checkpoint_id
+        self.state = state
+        self.base = base
+        self.ops = ops
+
+    def payload(self) -> Dict[str, Any]:
+        data = {"step": self.step, "checkpoint_id": self.checkpoint_id}
+        if self.ops is not None:
+            data.update(base=self.base, patch=self.ops)
+        else:
+            data["state"] = self.state
+        return data
+
+class Rewound(Event):
+    __slots__ = ("step", "state", "base", "ops")
+    type = "rewound"
+
+    def __init__(
+        self,
+        step: int,
+        state: Dict[str, Any],
+        base: Optional[int] = None,
+        ops: Optional[List[Dict[str, Any]]] = None,
+    ):
+        super().__init__(timestamped=False)
+        self.step = step
+        self.state = state
+        self.base = base
+        self.ops = ops
+
+    def payload(self) -> Dict[str, Any]:
+        if self.ops is not None:
+            # Patch against the client's acknowledged version
+            return {"step": self.step, "base": self.base, "patch": self.ops}
+        return {"step": self.step, "state": self.state}
+
+class CurrentState(Event):
+    __slots__ = ("state", "next")
+    type = "current_state"
+
+    def __init__(self, state: Dict[str, Any], next_nodes: Any):
+        super().__init__(timestamped=False)
+        self.state = state
+        self.next = next_nodes
+
+    def payload(self) -> Dict[str, Any]:
+        return {"state": self.state, "next": self.next}
+
+class Trace(Event):
+    """Spans of one of the session's executions, in start order."""
+
+    __slots__ = ("trace_id", "spans")
+    type = "trace"
+
+    def __init__(self, trace_id: str, spans: List[Dict[str, Any]]):
+        super().__init__(timestamped=False)
+        self.trace_id = trace_id
+        self.spans = spans
+
+    def payload(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "spans": self.spans}
+
+class SessionInfo(Event):
+    """First message on a socket: the session and the token to resume it with."""
+
+    __slots__ = ("session_id", "thread_id", "resume_token", "resumed", "last_seq")
+    type = "session"
+
+    def __init__(self, session_id: str, thread_id: str, resume_token: str, resumed: bool, last_seq: int):
+        super().__init__(timestamped=False)
+        self.session_id = session_id
+        self.thread_id = thread_id
+        self.resume_token = resume_token
+        self.resumed = resumed
+        self.last_seq = last_seq
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "thread_id": self.thread_id,
+            "resume_token": self.resume_token,
+            "resumed": self.resumed,
+            "last_seq": self.last_seq,
+        }
+
+class ControlMessage(Event):
+    """A control action for an execution, routed to the worker that owns it."""
+
+    __slots__ = ("session_id", "action")
+    type = "control"
+
+    def __init__(self, session_id: str, action: str):
+        super().__init__(timestamped=False)
+        self.session_id = session_id
+        self.action = action
+
+    def payload(self) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "action": self.action}
+
+class PrincipalRevoked(Event):
+    """Tells every worker to drop a token from its principal cache."""
+
+    __slots__ = ("token_digest", "until")
+    type = "principal_revoked"
+
+    def __init__(self, token_digest: str, until: float):
+        super().__init__(timestamped=False)
+        self.token_digest = token_digest
+        self.until = until
+
+    def payload(self) -> Dict[str, Any]:
+        return {"token_digest": self.token_digest, "until": self.until}
+
+class CacheInvalidation(Event):
+    """Keys another worker wrote or deleted, to drop from the local L1 cache."""
+
+    __slots__ = ("keys", "origin")
+    type = "cache_invalidation"
+
+    def __init__(self, keys: List[str], origin: str):
+        super().__init__(timestamped=False)
+        self.keys = keys
+        self.origin = origin
+
+    def payload(self) -> Dict[str, Any]:
+        return {"keys": self.keys, "origin": self.origin}
+
+class ErrorEvent(Event):
+    __slots__ = ("message",)
+    type = "error"
+
+    def __init__(self, message: str):
+        super().__init__(timestamped=False)
+        self.message = message
+
+    def payload(self) -> Dict[str, Any]:
+        return {"message": self.message}
+
+class RawEvent(Event):
+    """
+    An event received already encoded as JSON, e.g. from another worker.
+
+    JSON viewers get the original text back unchanged; other formats decode
+    it once and re-encode.
+    """
+
+    __slots__ = ("raw", "_data")
+
+    def __init__(self, raw: Union[str, bytes]):
+        super().__init__(timestamped=False)
+        self.raw = raw.decode() if isinstance(raw, bytes) else raw
+        self._data: Optional[Dict[str, Any]] = None
+        self.seq = self.to_dict().get("seq")
+
+    @property
+    def type(self) -> str:
+        return self.to_dict().get("type", "event")
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(self.raw)
+        return self._data
+
+    def coalesce_key(self) -> Optional[Tuple[str, str]]:
+        data = self.to_dict()
+        node = data.get("node") or data.get("node_id")
+        if data.get("type") == "node_update" and node is not None:
+            return ("node_update", node)
+        return None
+
+    def encode(self, serializer: EventSerializer) -> Union[str, bytes]:
+        if serializer.name == "json":
+            return self.raw
+        return super().encode(serializer)
+
+async def send_event(websocket: WebSocket, event: Event, serializer: EventSerializer):
+    data = event.encode(serializer)
+    if isinstance(data, bytes):
+        await websocket.send_bytes(data)
+    else:
+        await websocket.send_text(data)
\ No newline at end of file
@@ -0,0 +1,284 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterable, List, Protocol, Sequence, Tuple, TypeVar, cast
+import functools
+import inspect
+import threading
+import time
+
+from app.core.tracing import span
+
+# (suffix, labels, value) samples a collector reports for one metric
+Sample = Tuple[str, Dict[str, str], float]
+
+class _Child(Protocol):
+    """One labelled series of a metric."""
+
+    def samples(self) -> Iterable[Sample]: ...
+
+C = TypeVar("C", bound=_Child)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric(Generic[C]):
+    """
+    A named metric with a fixed set of label names.
+
+    labels(...) returns the child for one combination of label values and
+    is cached, so hot paths look a child up once and then only pay for
+    inc()/observe(): a lock and an addition.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], C] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> C:
+        raise NotImplementedError
+
+    def labels(self, *values: str, **labels: str) -> C:
+        if labels:
+            values = tuple(str(labels[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield suffix, {**labels, **extra}, value
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> Iterable[Sample]:
+        yield "_total", {}, self.value
+
+class Counter(Metric[_CounterChild]):
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def samples(self) -> Iterable[Sample]:
+        yield "", {}, self.value
+
+class Gauge(Metric[_GaugeChild]):
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket plus +Inf; made cumulative when scraped
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield "_bucket", {"le": _format_value(bound)}, cumulative
+        yield "_sum", {}, total
+        yield "_count", {}, cumulative
+
+class Histogram(Metric[_HistogramChild]):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+# A collector returns (name, type, help, samples) for values read at scrape
+# time, e.g. cache statistics or queue depths kept by other components
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+M = TypeVar("M", bound=Metric[Any])
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric[Any]] = {}
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: M) -> M:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"{metric.name} is already registered as a {existing.type}")
+            # Modules reloaded in tests re-register the same metric
+            return cast(M, existing)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def _families(self):
+        for metric in self._metrics.values():
+            yield metric.name, metric.type, metric.documentation, list(metric.samples())
+        for collector in self._collectors:
+            try:
+                yield from collector()
+            except Exception as e:
+                # A broken collector must not take the whole scrape down
+                print(f"Metrics collector failed: {e}")
+
+    def render(self) -> str:
+        lines = []
+        for name, metric_type, documentation, samples in self._families():
+            # Counter samples are <name>_total, and so is their family
+            family = f"{name}_total" if metric_type == "counter" else name
+            lines.append(f"# HELP {family} {documentation}")
+            lines.append(f"# TYPE {family} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metrics recorded on the hot path
+graph_node_seconds = registry.histogram(
+    "graph_node_duration_seconds", "Time spent in a research graph node.", ("graph", "node")
+)
+agent_run_seconds = registry.histogram(
+    "agent_run_duration_seconds", "Time for a workflow agent to stream all its events.", ("agent", "outcome")
+)
+llm_calls = registry.counter("llm_calls", "LLM calls by model.", ("model", "outcome"))
+llm_tokens = registry.counter("llm_tokens", "LLM tokens by model and kind (prompt/completion).", ("model", "kind"))
+llm_call_seconds = registry.histogram("llm_call_duration_seconds", "LLM call latency.", ("model",))
+db_commit_seconds = registry.histogram(
+    "db_commit_duration_seconds", "Session commit latency, including the flush.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+ws_connections_opened = registry.counter("ws_connections_opened", "WebSocket connections accepted.")
+ws_events_sent = registry.counter("ws_events_sent", "Events written to WebSocket clients.")
+ws_events_dropped = registry.counter("ws_events_dropped", "Events dropped from full per-connection send queues.")
+
+def instrument_node(graph: str, node: str, func: Callable) -> Callable:
+    """
+    Wrap a graph node (async function) so its duration is recorded, and
+    traced as a span when the execution is traced.
+    """
+    child = graph_node_seconds.labels(graph, node)
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def stream(*args, **kwargs):
+            with child.time(), span("node", graph=graph, node=node):
+                async for item in func(*args, **kwargs):
+                    yield item
+        return stream
+
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        with child.time(), span("node", graph=graph, node=node):
+            return await func(*args, **kwargs)
+    return run
@@ -0,0 +1,91 @@
+from typing import Any, Dict, Optional, Tuple, Union
+import json
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+class EventSerializer:
+    name = "base"
+    # Binary serializers are sent as binary WebSocket frames
+    binary = False
+
+    def dumps(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        raise NotImplementedError
+
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        raise NotImplementedError
+
+class JSONSerializer(EventSerializer):
+    name = "json"
+
+    def __init__(self):
+        try:
+            import orjson
+            self._orjson = orjson
+        except ImportError:
+            self._orjson = None
+
+    def dumps(self, data: Dict[str, Any]) -> str:
+        if self._orjson is not None:
+            # Text frames need str; decoding orjson output is still far
+            # cheaper than json.dumps
+            return self._orjson.dumps(
+                data, default=str, option=self._orjson.OPT_NON_STR_KEYS
+            ).decode()
+        return json.dumps(data, default=str, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        if self._orjson is not None:
+            return self._orjson.loads(raw)
+        return json.loads(raw)
+
+class MsgPackSerializer(EventSerializer):
+    name = "msgpack"
+    binary = True
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return self._msgpack.packb(data, default=str, use_bin_type=True)
+
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        return self._msgpack.unpackb(raw, raw=False)
+
+_serializers: Dict[str, EventSerializer] = {}
+
+def get_serializer(name: str = "json") -> EventSerializer:
+    if name not in _serializers:
+        if name == "msgpack":
+            _serializers[name] = MsgPackSerializer()
+        else:
+            _serializers[name] = JSONSerializer()
+    return _serializers[name]
+
+def negotiate_serializer(websocket: WebSocket) -> Tuple[EventSerializer, Optional[str]]:
+    """
+    Pick the wire format for a socket before it is accepted.
+
+    Clients opt into MessagePack with the `msgpack` subprotocol or an
+    `?encoding=msgpack` query parameter; everyone else gets JSON. Returns the
+    serializer and the subprotocol to echo back in `accept()`.
+    """
+    requested = websocket.scope.get("subprotocols") or []
+    if "msgpack" in requested or websocket.query_params.get("encoding") == "msgpack":
+        try:
+            serializer = get_serializer("msgpack")
+            return serializer, "msgpack" if "msgpack" in requested else None
+        except ImportError:
+            pass
+    return get_serializer("json"), "json" if "json" in requested else None
+
+async def receive_message(websocket: WebSocket, serializer: EventSerializer) -> Any:
+    """Receive one client message, text (JSON) or binary (serializer format)."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return serializer.loads(message["bytes"])
+    return json.loads(message["text"])
\ No newline at end of file
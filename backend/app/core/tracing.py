@@ -0,0 +1,322 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import os
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+
+class Span:
+    """
+    One timed operation of a trace: a graph node, an LLM call, an HTTP
+    request, a DB commit, a socket send...
+
+    Spans of the same execution share a trace id and point at their parent,
+    so the exported spans can be put back together as a timeline.
+    """
+
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id",
+        "attributes", "start_time", "duration", "error", "_start",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class _NoopSpan:
+    """Stands in for a span outside of any trace, so callers needn't check."""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes: Any):
+        pass
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+class SpanExporter:
+    """Receives the finished spans of a trace, usually all at once when its root ends."""
+
+    def export(self, spans: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """The spans of a trace, or None if it isn't (or no longer) available."""
+        return None
+
+    def find(self, **attributes: Any) -> List[Dict[str, Any]]:
+        """Root spans of the traces whose root has all the given attributes."""
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+def _matches(root: Dict[str, Any], attributes: Dict[str, Any]) -> bool:
+    return all(root["attributes"].get(name) == value for name, value in attributes.items())
+
+class InMemoryExporter(SpanExporter):
+    """The most recent traces, kept in process for the traces API."""
+
+    def __init__(self, max_traces: Optional[int] = None):
+        self.max_traces = max_traces or settings.TRACE_MAX_TRACES
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def export(self, spans: List[Dict[str, Any]]):
+        with self._lock:
+            for span in spans:
+                trace = self._traces.get(span["trace_id"])
+                if trace is None:
+                    trace = self._traces[span["trace_id"]] = []
+                trace.append(span)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+                self.evicted += 1
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def find(self, **attributes: Any) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.values())
+        roots = []
+        for spans in traces:
+            root = next((span for span in spans if span["parent_id"] is None), None)
+            if root is not None and _matches(root, attributes):
+                roots.append(root)
+        return roots
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exporter": "memory", "traces": len(self._traces), "evicted": self.evicted}
+
+class FileExporter(SpanExporter):
+    """
+    Appends spans to a JSON lines file, one span per line, for runs that
+    need to be looked at after the process is gone. Lookups scan the file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TRACE_FILE
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.exported = 0
+
+    def export(self, spans: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        # One small append per trace, so it is written inline
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+        self.exported += len(spans)
+
+    def _spans(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        spans = [span for span in self._spans() if span["trace_id"] == trace_id]
+        return spans or None
+
+    def find(self, **attributes: Any) -> List[Dict[str, Any]]:
+        return [
+            span for span in self._spans()
+            if span["parent_id"] is None and _matches(span, attributes)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exporter": "file", "path": self.path, "exported": self.exported}
+
+class Tracer:
+    """
+    Creates spans and hands finished traces to the exporter.
+
+    The current span lives in a context variable, so it follows the
+    execution into the tasks LangGraph starts for nodes and the executor
+    threads that run sync callbacks. Outside of a trace, span() is a no-op
+    and costs a context variable lookup.
+
+    Spans of a trace are buffered until its root ends and then exported
+    together; spans ending later (a socket send of the last event) are
+    exported on their own. At most TRACE_MAX_SPANS are kept per trace.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, max_spans: Optional[int] = None):
+        self.exporter = exporter
+        self.max_spans = max_spans or settings.TRACE_MAX_SPANS
+        self._open: Dict[str, List[Span]] = {}
+        self._dropped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Optional[Span]:
+        """A child of `parent` (default: the current span), or None outside of a trace."""
+        parent = parent or _current.get()
+        if parent is None or self.exporter is None:
+            return None
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Start a new trace whose root span is current inside the block."""
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        root = Span(self, name, uuid.uuid4().hex, None, attributes)
+        with self._lock:
+            self._open[root.trace_id] = []
+        with self._activate(root):
+            yield root
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Any]:
+        span = self.start_span(name, parent, **attributes)
+        if span is None:
+            yield NOOP_SPAN
+            return
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[Span]:
+        token = _current.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            span.end()
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Async generators can be resumed from another context
+                pass
+
+    def _finish(self, span: Span):
+        with self._lock:
+            buffered = self._open.get(span.trace_id)
+            if span.parent_id is None:
+                self._open.pop(span.trace_id, None)
+                dropped = self._dropped.pop(span.trace_id, 0)
+                if dropped:
+                    span.attributes["dropped_spans"] = dropped
+            elif buffered is not None:
+                if len(buffered) < self.max_spans:
+                    buffered.append(span)
+                else:
+                    self._dropped[span.trace_id] = self._dropped.get(span.trace_id, 0) + 1
+                return
+
+        spans = (buffered or []) + [span] if span.parent_id is None else [span]
+        # The exporter may have been removed while the trace was open
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export([item.to_dict() for item in spans])
+        except Exception as e:
+            print(f"Trace export failed: {e}")
+
+    def get_trace(self, trace_id: str, **owner: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Exported spans of a trace in start order, provided its root span has
+        all the `owner` attributes (user_id of a workflow run, thread_id of
+        a research session), else None.
+        """
+        spans = self.exporter.get(trace_id) if self.exporter is not None else None
+        if not spans:
+            return None
+        root = next((span for span in spans if span["parent_id"] is None), None)
+        if root is None or not _matches(root, owner):
+            return None
+        return sorted(spans, key=lambda span: span["start_time"])
+
+    def find_traces(self, **attributes: Any) -> List[Dict[str, Any]]:
+        """Root spans of the exported traces with these root attributes, newest first."""
+        roots = self.exporter.find(**attributes) if self.exporter is not None else []
+        return sorted(roots, key=lambda span: span["start_time"], reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.exporter.stats() if self.exporter is not None else {"exporter": "none"}
+        return {**stats, "open_traces": len(self._open)}
+
+def _create_exporter() -> Optional[SpanExporter]:
+    kind = settings.TRACE_EXPORTER
+    if kind == "file":
+        return FileExporter()
+    if kind == "memory":
+        return InMemoryExporter()
+    return None
+
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(_create_exporter())
+    return _tracer
+
+def start_trace(name: str, **attributes: Any):
+    return get_tracer().trace(name, **attributes)
+
+def span(name: str, parent: Optional[Span] = None, **attributes: Any):
+    return get_tracer().span(name, parent, **attributes)
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes: Any) -> Optional[Span]:
+    return get_tracer().start_span(name, parent, **attributes)
@@ -3,14 +3,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 
-from app.api import auth, workflows, agents, websocket
+from app.api import auth, workflows, agents, websocket, artifacts, metrics, traces
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.broker import get_broker, init_broker
+from app.core.cache import cache
+from app.core.database import init_db
+from app.core.security import shutdown_hash_executor
+from app.services.execution_archiver import start_archiver, stop_archiver
+from app.services.github_client import get_github_client
+from app.services.principals import start_revocation_listener
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    init_db()
+    await init_broker()
+    await cache.start()
+    start_archiver()
+    await start_revocation_listener()
     yield
+    await stop_archiver()
+    shutdown_hash_executor()
+    await get_github_client().aclose()
+    await get_broker().close()
+    await cache.close()
 
 app = FastAPI(
     title="LangGraph Workflow API",
@@ -29,7 +44,10 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(workflows.router, prefix="/api/workflows", tags=["workflows"])
 app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
+app.include_router(artifacts.router, prefix="/api/artifacts", tags=["artifacts"])
 app.include_router(websocket.router, prefix="/ws", tags=["websocket"])
+app.include_router(metrics.router, tags=["metrics"])
+app.include_router(traces.router, prefix="/api/traces", tags=["traces"])
 
 @app.get("/")
 async def root():
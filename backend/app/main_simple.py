@@ -3,14 +3,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 
-from app.core.database import engine, Base
-from app.api import workflow_ws
+from app.core.broker import get_broker, init_broker
+from app.core.cache import cache
+from app.core.database import init_db
+from app.services.github_client import get_github_client
+from app.services.sessions import init_session_store, start_control_listener
+from app.workflows.checkpointer import attach_checkpointer, close_checkpointer
+from app.workflows.research_graph import research_graph
+from app.api import metrics, workflow_ws
+from app.services.plan_store import plan_store_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Create tables
-    Base.metadata.create_all(bind=engine)
+    init_db()
+    await init_broker()
+    # Shared checkpoints and cross-worker control routing
+    await attach_checkpointer(research_graph)
+    await init_session_store()
+    await start_control_listener()
+    await cache.start()
     yield
+    await get_github_client().aclose()
+    await get_broker().close()
+    await cache.close()
+    await close_checkpointer()
 
 app = FastAPI(
     title="LangGraph Workflow API",
@@ -28,6 +45,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(workflow_ws.router, prefix="/ws", tags=["websocket"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
@@ -37,5 +55,9 @@ async def root():
 async def test():
     return {"status": "ok", "message": "API is working"}
 
+@app.get("/api/plan-cache")
+async def plan_cache_stats():
+    return plan_store_stats()
+
 if __name__ == "__main__":
     uvicorn.run("app.main_simple:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
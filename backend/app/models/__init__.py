@@ -1,4 +1,4 @@
 from app.models.user import User
-from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge, WorkflowExecution
+from app.models.workflow import Workflow, WorkflowGraph, NodeDefinition, WorkflowExecution
 
-__all__ = ["User", "Workflow", "WorkflowNode", "WorkflowEdge", "WorkflowExecution"]
\ No newline at end of file
+__all__ = ["User", "Workflow", "WorkflowGraph", "NodeDefinition", "WorkflowExecution"]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -12,35 +12,46 @@ class Workflow(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     is_public = Column(Boolean, default=False)
     forked_from = Column(Integer, ForeignKey("workflows.id"), nullable=True)
+    graph_hash = Column(String(64), ForeignKey("workflow_graphs.hash"), nullable=True, index=True)
+    # Incremented by every UPDATE (and checked by it, so concurrent writes fail)
+    version = Column(Integer, nullable=False, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     user = relationship("User", backref="workflows")
-    nodes = relationship("WorkflowNode", back_populates="workflow", cascade="all, delete-orphan")
-    edges = relationship("WorkflowEdge", back_populates="workflow", cascade="all, delete-orphan")
+    graph = relationship("WorkflowGraph")
     executions = relationship("WorkflowExecution", back_populates="workflow", cascade="all, delete-orphan")
+    
+    # Keyset pagination of the listing: one index per (filter, sort) pair,
+    # ending in id as the tie-breaker (creation order is id order)
+    __table_args__ = (
+        Index("ix_workflows_user_id", "user_id", "id"),
+        Index("ix_workflows_user_name", "user_id", "name", "id"),
+        Index("ix_workflows_public_id", "is_public", "id"),
+        Index("ix_workflows_public_name", "is_public", "name", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
-class WorkflowNode(Base):
-    __tablename__ = "workflow_nodes"
+class NodeDefinition(Base):
+    """A node's type and configuration, stored once however many graphs use it."""
+    __tablename__ = "node_definitions"
     
-    id = Column(Integer, primary_key=True, index=True)
-    workflow_id = Column(Integer, ForeignKey("workflows.id"))
-    node_id = Column(String, nullable=False)
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the canonical JSON
     type = Column(String, nullable=False)  # 'agent', 'tool', 'start', 'end'
-    position = Column(JSON)  # {x: number, y: number}
     data = Column(JSON)  # Node configuration
-    
-    workflow = relationship("Workflow", back_populates="nodes")
 
-class WorkflowEdge(Base):
-    __tablename__ = "workflow_edges"
+class WorkflowGraph(Base):
+    """
+    An immutable version of a workflow graph, addressed by the hash of its
+    content. Workflows with the same graph (a template and its unedited
+    forks) share one row; editing a workflow points it at a new version.
+    """
+    __tablename__ = "workflow_graphs"
     
-    id = Column(Integer, primary_key=True, index=True)
-    workflow_id = Column(Integer, ForeignKey("workflows.id"))
-    source = Column(String, nullable=False)
-    target = Column(String, nullable=False)
-    
-    workflow = relationship("Workflow", back_populates="edges")
+    hash = Column(String(64), primary_key=True)  # SHA-256 of the canonical JSON
+    nodes = Column(JSON, nullable=False)  # [{node_id, position, definition}]
+    edges = Column(JSON, nullable=False)  # [{source, target}]
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class WorkflowExecution(Base):
     __tablename__ = "workflow_executions"
@@ -55,6 +66,19 @@ class WorkflowExecution(Base):
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set once the JSON columns above were moved to cold storage; the row is
+    # kept as a summary and archive_ref is the artifact holding the full record
+    archived_at = Column(DateTime(timezone=True), nullable=True)
+    archive_ref = Column(String, nullable=True)
     
     workflow = relationship("Workflow", back_populates="executions")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        # Latest execution of a workflow
+        Index("ix_workflow_executions_workflow_created", "workflow_id", "created_at"),
+        # Archiver: oldest executions not yet archived
+        Index("ix_workflow_executions_archived_created", "archived_at", "created_at"),
+        # Retention: summary rows past their retention period
+        Index("ix_workflow_executions_created", "created_at"),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
 from app.schemas.user import UserCreate, UserResponse, Token
-from app.schemas.workflow import WorkflowCreate, WorkflowResponse, NodeCreate, EdgeCreate
+from app.schemas.workflow import WorkflowCreate, WorkflowGraphUpdate, WorkflowResponse, WorkflowSummary, WorkflowPage, NodeCreate, EdgeCreate
 
-__all__ = ["UserCreate", "UserResponse", "Token", "WorkflowCreate", "WorkflowResponse", "NodeCreate", "EdgeCreate"]
\ No newline at end of file
+__all__ = ["UserCreate", "UserResponse", "Token", "WorkflowCreate", "WorkflowGraphUpdate", "WorkflowResponse", "WorkflowSummary", "WorkflowPage", "NodeCreate", "EdgeCreate"]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 
 class NodeCreate(BaseModel):
@@ -19,20 +19,51 @@ class WorkflowCreate(BaseModel):
     nodes: List[NodeCreate]
     edges: List[EdgeCreate]
 
-class WorkflowResponse(BaseModel):
+class WorkflowGraphUpdate(BaseModel):
+    nodes: List[NodeCreate]
+    edges: List[EdgeCreate]
+
+class NodeResponse(BaseModel):
+    node_id: str
+    type: str
+    position: Optional[Dict[str, float]]
+    data: Optional[Dict[str, Any]]
+    
+    class Config:
+        from_attributes = True
+
+class EdgeResponse(BaseModel):
+    source: str
+    target: str
+    
+    class Config:
+        from_attributes = True
+
+class WorkflowSummary(BaseModel):
     id: int
     name: str
     description: Optional[str]
     user_id: int
     is_public: bool
+    forked_from: Optional[int] = None
+    # Content hash of the graph version; equal hashes mean identical graphs
+    graph_hash: Optional[str] = None
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime]
-    nodes: List[Dict[str, Any]]
-    edges: List[Dict[str, Any]]
     
     class Config:
         from_attributes = True
 
+class WorkflowResponse(WorkflowSummary):
+    nodes: List[NodeResponse]
+    edges: List[EdgeResponse]
+
+class WorkflowPage(BaseModel):
+    # Summaries unless the graph was requested
+    items: List[Union[WorkflowResponse, WorkflowSummary]]
+    next_cursor: Optional[str] = None
+
 class WorkflowExecutionCreate(BaseModel):
     workflow_id: int
     input_data: Dict[str, Any]
@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+
+from app.core.serialization import get_serializer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Thread indexes kept in memory; an evicted one is rebuilt from the checkpointer
+MAX_INDEXED_THREADS = 1000
+
+class CheckpointEntry:
+    """Metadata of one checkpoint; the state values stay in the checkpointer."""
+
+    __slots__ = ("step", "checkpoint_id", "node", "source", "timestamp", "size", "message")
+
+    def __init__(self, checkpoint_id: str, node: str, source: str, timestamp: str, size: int, message: str):
+        self.step = -1
+        self.checkpoint_id = checkpoint_id
+        self.node = node
+        self.source = source
+        self.timestamp = timestamp
+        self.size = size
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step": self.step,
+            "checkpoint_id": self.checkpoint_id,
+            "node": self.node,
+            "source": self.source,
+            "timestamp": self.timestamp,
+            "size": self.size,
+            "message": self.message,
+        }
+
+class CheckpointIndex:
+    """
+    Chronological index of a thread's checkpoints.
+
+    Steps are positions from the oldest checkpoint (0), so looking one up is
+    a list access. `refresh` only walks checkpoints created since the last
+    call: the checkpointer lists newest first and the walk stops at the
+    newest one already indexed. With a shared checkpointer, every worker
+    keeps its own index of the same threads.
+    """
+
+    def __init__(self, checkpointer, thread_id: str):
+        self.checkpointer = checkpointer
+        self.thread_id = thread_id
+        self.entries: List[CheckpointEntry] = []
+        self._steps: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": self.thread_id, "checkpoint_ns": ""}}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def refresh(self):
+        async with self._lock:
+            new = []
+            async for checkpoint in self.checkpointer.alist(self.config):
+                checkpoint_id = checkpoint.config["configurable"]["checkpoint_id"]
+                if checkpoint_id in self._steps:
+                    break
+                new.append(self._entry(checkpoint_id, checkpoint))
+
+            for entry in reversed(new):
+                entry.step = len(self.entries)
+                self._steps[entry.checkpoint_id] = entry.step
+                self.entries.append(entry)
+
+    def _entry(self, checkpoint_id: str, checkpoint) -> CheckpointEntry:
+        values = checkpoint.checkpoint.get("channel_values", {})
+        source = checkpoint.metadata.get("source", "")
+        messages = values.get("messages") or []
+        return CheckpointEntry(
+            checkpoint_id,
+            node=values.get("current_step") or source,
+            source=source,
+            timestamp=checkpoint.checkpoint.get("ts", ""),
+            # Computed once per checkpoint, at index time
+            size=len(get_serializer("json").dumps(values)),
+            message=messages[-1] if messages else "",
+        )
+
+    async def get(self, step: int) -> Optional[CheckpointEntry]:
+        if step < 0 or step >= len(self.entries):
+            await self.refresh()
+        if 0 <= step < len(self.entries):
+            return self.entries[step]
+        return None
+
+    async def find(self, checkpoint_id: str) -> Optional[CheckpointEntry]:
+        if checkpoint_id not in self._steps:
+            await self.refresh()
+        step = self._steps.get(checkpoint_id)
+        return self.entries[step] if step is not None else None
+
+    async def page(self, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[CheckpointEntry], Optional[int]]:
+        """
+        Entries newest first, starting just before step `cursor` (or at the
+        newest checkpoint). Returns the page and the cursor for the next one.
+        """
+        await self.refresh()
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        end = len(self.entries) if cursor is None else max(0, min(cursor, len(self.entries)))
+        start = max(0, end - limit)
+        page = self.entries[start:end][::-1]
+        return page, start if start > 0 else None
+
+_indexes: "OrderedDict[str, CheckpointIndex]" = OrderedDict()
+
+def get_checkpoint_index(checkpointer, thread_id: str) -> CheckpointIndex:
+    index = _indexes.get(thread_id)
+    if index is None or index.checkpointer is not checkpointer:
+        index = _indexes[thread_id] = CheckpointIndex(checkpointer, thread_id)
+    _indexes.move_to_end(thread_id)
+    while len(_indexes) > MAX_INDEXED_THREADS:
+        _indexes.popitem(last=False)
+    return index
\ No newline at end of file
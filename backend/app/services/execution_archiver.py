@@ -0,0 +1,191 @@
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import gzip
+import json
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+
+from app.core.artifacts import ArtifactStore, get_artifact_store
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import WorkflowExecution
+
+# Only finished executions are archived
+FINISHED_STATUSES = ("completed", "failed")
+ARCHIVE_CONTENT_TYPE = "application/gzip"
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def execution_record(execution: WorkflowExecution) -> Dict[str, Any]:
+    """The full execution as stored in cold storage."""
+    return {
+        "id": execution.id,
+        "workflow_id": execution.workflow_id,
+        "user_id": execution.user_id,
+        "status": execution.status,
+        "input_data": execution.input_data,
+        "output_data": execution.output_data,
+        "node_states": execution.node_states,
+        "started_at": _isoformat(execution.started_at),
+        "completed_at": _isoformat(execution.completed_at),
+        "created_at": _isoformat(execution.created_at),
+    }
+
+class ExecutionArchiver:
+    """
+    Keeps the workflow_executions table to recent, lightweight rows.
+
+    Finished executions older than EXECUTION_ARCHIVE_AFTER_DAYS have their
+    full record written gzip-compressed to the artifact store; the row stays
+    as a summary (ids, status, timestamps) with its JSON columns cleared and
+    archive_ref pointing at the archive. The latest EXECUTION_KEEP_LATEST
+    executions of every workflow stay hot, since reruns start from them.
+    Rows older than EXECUTION_RETENTION_DAYS are deleted with their archive.
+
+    Work is done in batches, one transaction each. Archives are content
+    addressed, so two workers archiving the same row write the same artifact.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        store: Optional[ArtifactStore] = None,
+        archive_after_days: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        keep_latest: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.store = store or get_artifact_store()
+        self.archive_after_days = (
+            archive_after_days if archive_after_days is not None else settings.EXECUTION_ARCHIVE_AFTER_DAYS
+        )
+        self.retention_days = retention_days if retention_days is not None else settings.EXECUTION_RETENTION_DAYS
+        self.keep_latest = keep_latest if keep_latest is not None else settings.EXECUTION_KEEP_LATEST
+        self.batch_size = batch_size or settings.EXECUTION_ARCHIVE_BATCH
+
+    def archive_batch(self, now: Optional[datetime] = None) -> int:
+        """Archive up to one batch of executions; returns how many."""
+        if not self.archive_after_days:
+            return 0
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.archive_after_days)
+
+        with self.session_factory() as db:
+            query = db.query(WorkflowExecution).filter(
+                WorkflowExecution.archived_at.is_(None),
+                WorkflowExecution.created_at < cutoff,
+                WorkflowExecution.status.in_(FINISHED_STATUSES),
+            )
+            if self.keep_latest:
+                # Newer executions of the same workflow, counted on the
+                # (workflow_id, created_at) index
+                newer = aliased(WorkflowExecution)
+                newer_count = db.query(func.count(newer.id)).filter(
+                    newer.workflow_id == WorkflowExecution.workflow_id,
+                    newer.created_at > WorkflowExecution.created_at,
+                ).scalar_subquery()
+                query = query.filter(newer_count >= self.keep_latest)
+
+            executions = query.order_by(WorkflowExecution.created_at).limit(self.batch_size).all()
+            for execution in executions:
+                data = gzip.compress(json.dumps(execution_record(execution)).encode())
+                artifact = self.store.put_bytes(data, ARCHIVE_CONTENT_TYPE, f"execution-{execution.id}.json.gz")
+                execution.archive_ref = artifact["artifact_id"]
+                execution.archived_at = now
+                execution.input_data = None
+                execution.output_data = None
+                execution.node_states = None
+            db.commit()
+            return len(executions)
+
+    def purge_batch(self, now: Optional[datetime] = None) -> int:
+        """Delete up to one batch of executions past retention; returns how many."""
+        if not self.retention_days:
+            return 0
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.retention_days)
+
+        with self.session_factory() as db:
+            rows = db.query(WorkflowExecution.id, WorkflowExecution.archive_ref).filter(
+                WorkflowExecution.created_at < cutoff
+            ).order_by(WorkflowExecution.created_at).limit(self.batch_size).all()
+            if not rows:
+                return 0
+            db.query(WorkflowExecution).filter(
+                WorkflowExecution.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+            db.commit()
+
+        # Only once the rows are gone, so no row points at a missing archive
+        for row in rows:
+            if row.archive_ref:
+                self.store.delete(row.archive_ref)
+        return len(rows)
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        counts = {"purged": 0, "archived": 0}
+        # Purge first, so nothing past retention is archived only to be deleted
+        for key, step in (("purged", self.purge_batch), ("archived", self.archive_batch)):
+            while True:
+                done = step(now)
+                counts[key] += done
+                if done < self.batch_size:
+                    break
+        return counts
+
+    async def run_periodically(self, interval: float):
+        while True:
+            try:
+                counts = await asyncio.to_thread(self.run_once)
+                if any(counts.values()):
+                    print(f"Execution archiver: {counts['archived']} archived, {counts['purged']} purged")
+            except Exception as e:
+                print(f"Execution archiver failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+def load_archive(execution: WorkflowExecution, store: Optional[ArtifactStore] = None) -> Dict[str, Any]:
+    """The full record of an archived execution."""
+    store = store or get_artifact_store()
+    data = b"".join(store.open_range(execution.archive_ref))
+    return json.loads(gzip.decompress(data))
+
+async def restore_execution(db: Session, execution: WorkflowExecution, store: Optional[ArtifactStore] = None):
+    """
+    Move an archived execution back into the hot table, e.g. to rerun it.
+    Reading and deleting the archive run on a worker thread.
+    """
+    if execution.archive_ref is None:
+        return
+    store = store or get_artifact_store()
+    ref = execution.archive_ref
+    record = await asyncio.to_thread(load_archive, execution, store)
+    execution.input_data = record["input_data"]
+    execution.output_data = record["output_data"]
+    execution.node_states = record["node_states"]
+    execution.archive_ref = None
+    execution.archived_at = None
+    db.commit()
+    await asyncio.to_thread(store.delete, ref)
+
+_archiver_task: Optional[asyncio.Task] = None
+
+def start_archiver():
+    global _archiver_task
+    if settings.EXECUTION_ARCHIVE_INTERVAL and _archiver_task is None:
+        _archiver_task = asyncio.create_task(
+            ExecutionArchiver().run_periodically(settings.EXECUTION_ARCHIVE_INTERVAL)
+        )
+
+async def stop_archiver():
+    global _archiver_task
+    if _archiver_task is not None:
+        _archiver_task.cancel()
+        try:
+            await _archiver_task
+        except asyncio.CancelledError:
+            pass
+        _archiver_task = None
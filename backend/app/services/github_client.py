@@ -0,0 +1,230 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import json
+import math
+import time
+import httpx
+
+from app.core.cache import CacheInterface, cache
+from app.core.config import settings
+from app.core.tracing import span
+
+# GitHub caps search results at 1000 items and 100 items per page
+MAX_PER_PAGE = 100
+MAX_SEARCH_RESULTS = 1000
+
+class GitHubRateLimitError(Exception):
+    def __init__(self, reset_at: float):
+        self.reset_at = reset_at
+        super().__init__(f"GitHub rate limit exhausted until {int(reset_at)}")
+
+class GitHubSearchError(Exception):
+    def __init__(self, status_code: int, message: str = ""):
+        self.status_code = status_code
+        super().__init__(message or f"GitHub search failed with status {status_code}")
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class GitHubCodeSearchClient:
+    """
+    Shared GitHub code-search client.
+
+    Keeps one pooled (HTTP/2 when available) connection open across agent
+    calls, revalidates repeated queries with If-None-Match so unchanged
+    results come back as 304s, fetches result pages concurrently and backs
+    off according to the X-RateLimit-* / Retry-After response headers.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        token: Optional[str] = None,
+        response_cache: Optional[CacheInterface] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_connections: Optional[int] = None,
+        max_concurrent_pages: Optional[int] = None,
+        max_rate_limit_wait: float = 60.0,
+    ):
+        self.base_url = (base_url or settings.GITHUB_API_URL).rstrip("/")
+        self.token = token if token is not None else settings.GITHUB_TOKEN
+        self.response_cache = response_cache or cache
+        self.transport = transport
+        self.max_connections = max_connections or settings.GITHUB_MAX_CONNECTIONS
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self._page_semaphore = asyncio.Semaphore(
+            max_concurrent_pages or settings.GITHUB_MAX_CONCURRENT_PAGES
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Last rate-limit state reported by GitHub
+        self.rate_limit_remaining: Optional[int] = None
+        self.rate_limit_reset: float = 0.0
+        self._retry_after_until: float = 0.0
+
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limited": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "langgraph-workflow-app",
+            }
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                http2=self.transport is None and _http2_available(),
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=httpx.Timeout(15.0, connect=5.0),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search_code(
+        self,
+        query: str,
+        language: str = "",
+        per_page: int = 10,
+        pages: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search code and return up to per_page * pages raw result items.
+
+        The first page is fetched alone to learn total_count, the remaining
+        pages are then requested concurrently.
+        """
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+        max_pages = max(1, math.ceil(MAX_SEARCH_RESULTS / per_page))
+        pages = max(1, min(pages, max_pages))
+        params = {
+            "q": f"{query} language:{language}" if language else query,
+            "per_page": per_page,
+        }
+
+        first = await self._fetch_page(params, 1)
+        items = list(first.get("items", []))
+
+        total = min(first.get("total_count", len(items)), MAX_SEARCH_RESULTS)
+        last_page = min(pages, math.ceil(total / per_page))
+        if last_page > 1:
+            rest = await asyncio.gather(*[
+                self._fetch_page(params, page) for page in range(2, last_page + 1)
+            ])
+            for data in rest:
+                items.extend(data.get("items", []))
+
+        return items[:per_page * pages]
+
+    async def _fetch_page(self, params: Dict[str, Any], page: int) -> Dict[str, Any]:
+        async with self._page_semaphore:
+            return await self._get("/search/code", {**params, "page": page})
+
+    async def _get(self, path: str, params: Dict[str, Any], retries: int = 2) -> Dict[str, Any]:
+        cache_key = self._cache_key(path, params)
+        cached = await self._load_cached(cache_key)
+
+        headers = {}
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+
+        await self._wait_for_rate_limit()
+
+        self.stats["requests"] += 1
+        with span("http", method="GET", url=f"{self.base_url}{path}", page=params.get("page")) as request_span:
+            response = await self._get_client().get(path, params=params, headers=headers)
+            request_span.set(status=response.status_code)
+        self._update_rate_limit(response)
+
+        if response.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            return cached["data"]
+
+        if response.status_code in (403, 429) and self._is_rate_limited(response):
+            self.stats["rate_limited"] += 1
+            if retries > 0:
+                return await self._get(path, params, retries - 1)
+            raise GitHubRateLimitError(max(self.rate_limit_reset, self._retry_after_until))
+
+        if response.status_code != 200:
+            raise GitHubSearchError(response.status_code, response.text[:200])
+
+        data = response.json()
+        etag = response.headers.get("etag")
+        if etag:
+            await self.response_cache.set(
+                cache_key,
+                json.dumps({"etag": etag, "data": data}),
+                expire=settings.GITHUB_ETAG_CACHE_TTL,
+            )
+        return data
+
+    def _cache_key(self, path: str, params: Dict[str, Any]) -> str:
+        raw = json.dumps([self.base_url, path, params, bool(self.token)], sort_keys=True)
+        return f"github:etag:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    async def _load_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.response_cache.get(cache_key)
+            return json.loads(raw) if raw else None
+        except Exception:
+            return None
+
+    def _update_rate_limit(self, response: httpx.Response):
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+        if remaining is not None and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+        if reset is not None and reset.isdigit():
+            self.rate_limit_reset = float(reset)
+
+        retry_after = response.headers.get("retry-after")
+        if retry_after is not None and retry_after.isdigit():
+            self._retry_after_until = time.time() + int(retry_after)
+
+    def _is_rate_limited(self, response: httpx.Response) -> bool:
+        return (
+            "retry-after" in response.headers
+            or response.headers.get("x-ratelimit-remaining") == "0"
+        )
+
+    async def _wait_for_rate_limit(self):
+        now = time.time()
+        wait_until = self._retry_after_until
+        if self.rate_limit_remaining == 0:
+            wait_until = max(wait_until, self.rate_limit_reset)
+
+        delay = wait_until - now
+        if delay <= 0:
+            return
+        if delay > self.max_rate_limit_wait:
+            raise GitHubRateLimitError(wait_until)
+
+        await asyncio.sleep(delay)
+        # Assume the window has been refilled; the next response corrects it
+        if self.rate_limit_remaining == 0:
+            self.rate_limit_remaining = None
+
+_github_client: Optional[GitHubCodeSearchClient] = None
+
+def get_github_client() -> GitHubCodeSearchClient:
+    global _github_client
+    if _github_client is None:
+        _github_client = GitHubCodeSearchClient()
+    return _github_client
\ No newline at end of file
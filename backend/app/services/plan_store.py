@@ -0,0 +1,231 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter, OrderedDict
+import copy
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from app.core.config import settings
+
+KNOWN_AGENTS = {"planner", "literature_search", "code_search", "summarizer", "pdf_generator"}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "of", "on", "or", "please",
+    "should", "that", "the", "this", "to", "what", "when", "which", "who", "why",
+    "with", "you", "about", "find", "tell", "give", "some", "there", "their",
+}
+
+def _stem(token: str) -> str:
+    # Deliberately crude: enough to match plurals and common verb forms
+    for suffix in ("ing", "ies", "es", "s", "ed"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+def question_terms(question: str) -> Counter:
+    words = [_stem(w) for w in re.findall(r"[a-z0-9]+", question.lower()) if w not in STOPWORDS]
+    terms = Counter(words)
+    # Bigrams keep some word order, so "graph neural" != "neural graph"
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+def validate_plan(plan: Any) -> bool:
+    """Only structurally valid plans are stored and reused."""
+    if not isinstance(plan, dict):
+        return False
+    steps = plan.get("steps")
+    if not isinstance(steps, list) or not steps:
+        return False
+    return all(isinstance(step, dict) and step.get("agent") in KNOWN_AGENTS for step in steps)
+
+def rebind_plan(plan: Dict[str, Any], question: str) -> Dict[str, Any]:
+    """
+    A copy of a stored plan for a new question. Step queries were written
+    for the question the plan was made for, so they are replaced with the
+    new one; a near-duplicate shares the steps, not the search terms.
+    """
+    plan = copy.deepcopy(plan)
+    for step in plan["steps"]:
+        if "query" in step:
+            step["query"] = question
+    return plan
+
+class PlanEntry:
+    __slots__ = ("id", "question", "plan", "terms", "created_at", "uses")
+
+    def __init__(self, entry_id: int, question: str, plan: Dict[str, Any], created_at: float):
+        self.id = entry_id
+        self.question = question
+        self.plan = plan
+        self.terms = question_terms(question)
+        self.created_at = created_at
+        self.uses = 0
+
+class PlanStore:
+    """
+    Local store of validated research plans, indexed by question similarity.
+
+    Questions are turned into TF-IDF vectors (stemmed unigrams + bigrams) and
+    kept in an inverted index, so a lookup only scores entries that share at
+    least one term with the new question. When the best cosine similarity
+    reaches the threshold, the stored plan is reused instead of calling the
+    planner LLM again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        path: Optional[str] = None,
+    ):
+        self.name = name
+        self.threshold = threshold if threshold is not None else settings.PLAN_REUSE_THRESHOLD
+        self.max_entries = max_entries or settings.PLAN_STORE_MAX_ENTRIES
+        self.path = path
+
+        self._entries: "OrderedDict[int, PlanEntry]" = OrderedDict()
+        self._postings: Dict[str, set] = {}
+        self._df: Counter = Counter()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self._hit_similarity_total = 0.0
+        self._best_similarity_total = 0.0
+
+        if self.path and os.path.exists(self.path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._entries) + 1) / (self._df.get(term, 0) + 1)) + 1.0
+
+    def _vector(self, terms: Counter) -> Tuple[Dict[str, float], float]:
+        vector = {term: count * self._idf(term) for term, count in terms.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return vector, norm
+
+    def _similarity(self, query: Dict[str, float], query_norm: float, entry: PlanEntry) -> float:
+        vector, norm = self._vector(entry.terms)
+        if not norm or not query_norm:
+            return 0.0
+        dot = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+        return dot / (query_norm * norm)
+
+    def find_similar(self, question: str) -> Tuple[Optional[PlanEntry], float]:
+        terms = question_terms(question)
+        with self._lock:
+            candidates = set()
+            for term in terms:
+                candidates |= self._postings.get(term, set())
+            if not candidates:
+                return None, 0.0
+
+            query, query_norm = self._vector(terms)
+            best, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                score = self._similarity(query, query_norm, entry)
+                if score > best_score:
+                    best, best_score = entry, score
+            return best, best_score
+
+    def lookup(self, question: str) -> Optional[Tuple[Dict[str, Any], float, str]]:
+        """Return (plan, similarity, original question) for a near-duplicate, else None."""
+        entry, score = self.find_similar(question)
+
+        with self._lock:
+            self.lookups += 1
+            self._best_similarity_total += score
+            if entry is None or score < self.threshold:
+                return None
+
+            self.hits += 1
+            self._hit_similarity_total += score
+            entry.uses += 1
+            self._entries.move_to_end(entry.id)
+        return rebind_plan(entry.plan, question), score, entry.question
+
+    def add(self, question: str, plan: Dict[str, Any]) -> bool:
+        if not validate_plan(plan):
+            return False
+
+        # The caller goes on to use (and may change) its plan
+        plan = copy.deepcopy(plan)
+        with self._lock:
+            entry = self._insert(question, plan, time.time())
+        if self.path:
+            self._append(self.path, entry)
+        return True
+
+    def _insert(self, question: str, plan: Dict[str, Any], created_at: float) -> PlanEntry:
+        entry = PlanEntry(self._next_id, question, plan, created_at)
+        self._next_id += 1
+        self._entries[entry.id] = entry
+        for term in entry.terms:
+            self._postings.setdefault(term, set()).add(entry.id)
+            self._df[term] += 1
+
+        # Evict the least recently used plans beyond the size budget
+        while len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            for term in old.terms:
+                self._postings[term].discard(old.id)
+                if not self._postings[term]:
+                    del self._postings[term]
+                self._df[term] -= 1
+                if self._df[term] <= 0:
+                    del self._df[term]
+        return entry
+
+    def _append(self, path: str, entry: PlanEntry):
+        # Append-only log; replayed on startup
+        record = {"question": entry.question, "plan": entry.plan, "created_at": entry.created_at}
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if validate_plan(record.get("plan")):
+                    self._insert(record["question"], record["plan"], record.get("created_at", 0.0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "misses": self.lookups - self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "mean_hit_similarity": self._hit_similarity_total / self.hits if self.hits else 0.0,
+                "mean_best_similarity": self._best_similarity_total / self.lookups if self.lookups else 0.0,
+            }
+
+_plan_stores: Dict[str, PlanStore] = {}
+
+def get_plan_store(name: str) -> PlanStore:
+    if name not in _plan_stores:
+        path = None
+        if settings.PLAN_STORE_DIR:
+            os.makedirs(settings.PLAN_STORE_DIR, exist_ok=True)
+            path = os.path.join(settings.PLAN_STORE_DIR, f"{name}.jsonl")
+        _plan_stores[name] = PlanStore(name, path=path)
+    return _plan_stores[name]
+
+def plan_store_stats() -> List[Dict[str, Any]]:
+    return [store.stats() for store in _plan_stores.values()]
\ No newline at end of file
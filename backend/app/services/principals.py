@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import time
+
+from jose import JWTError
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.connections import manager
+from app.core.database import SessionLocal
+from app.core.events import Event, PrincipalRevoked
+from app.core.security import auth_latency, decode_access_token
+from app.models import User
+
+REVOCATION_TOPIC = "auth:revocations"
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as endpoints see it; detached from any session."""
+
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id, username=user.username, email=user.email,
+            is_active=user.is_active, created_at=user.created_at,
+        )
+
+def token_digest(token: str) -> str:
+    # Raw tokens are never used as keys, so cache dumps don't leak credentials
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class PrincipalCache:
+    """
+    Bounded LRU of token digest -> Principal.
+
+    An entry is trusted for `ttl` seconds, and never past the token's own
+    expiry; after that the token is decoded and the user looked up again.
+    Revoked digests are remembered until the token would have expired.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.AUTH_CACHE_TTL
+        self.max_entries = max_entries or settings.AUTH_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest: str) -> Optional[Principal]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.time():
+            self.evict(digest)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return principal
+
+    def put(self, digest: str, principal: Principal, token_expires_at: Optional[float] = None):
+        if not self.ttl:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        self.evict(digest)
+        self._entries[digest] = (principal, expires_at)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self.evict(oldest)
+            self.evictions += 1
+
+    def evict(self, digest: str):
+        self._entries.pop(digest, None)
+
+    def revoke(self, digest: str, until: float):
+        self.evict(digest)
+        self._revoked[digest] = until
+        if len(self._revoked) > self.max_entries:
+            now = time.time()
+            self._revoked = {key: expiry for key, expiry in self._revoked.items() if expiry > now}
+
+    def is_revoked(self, digest: str) -> bool:
+        until = self._revoked.get(digest)
+        if until is None:
+            return False
+        if until <= time.time():
+            del self._revoked[digest]
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+principal_cache = PrincipalCache()
+
+def _revoked_key(digest: str) -> str:
+    return f"auth:revoked:{digest}"
+
+def _load_principal(username: str) -> Optional[Principal]:
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == username).first()
+        return Principal.from_user(user) if user is not None else None
+
+async def resolve_principal(token: str) -> Optional[Principal]:
+    """
+    The principal a bearer token stands for, or None if the token is
+    invalid, expired, revoked or its user is gone. Cached tokens cost a dict
+    lookup; others are decoded and the user loaded on a worker thread.
+    """
+    start = time.perf_counter()
+    digest = token_digest(token)
+    principal = principal_cache.get(digest)
+    if principal is not None:
+        auth_latency.observe("resolve_cached", time.perf_counter() - start)
+        return principal
+
+    try:
+        if principal_cache.is_revoked(digest):
+            return None
+        try:
+            # Revocations made by other workers, including ones from before
+            # this process started
+            if await cache.get(_revoked_key(digest)) is not None:
+                return None
+        except Exception:
+            pass
+
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            return None
+        username = payload.get("sub")
+        if username is None:
+            return None
+
+        principal = await asyncio.to_thread(_load_principal, username)
+        if principal is not None:
+            principal_cache.put(digest, principal, payload.get("exp"))
+        return principal
+    finally:
+        auth_latency.observe("resolve_uncached", time.perf_counter() - start)
+
+async def revoke_token(token: str):
+    """Log a token out on every worker until it would have expired anyway."""
+    digest = token_digest(token)
+    try:
+        until = float(decode_access_token(token)["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        until = time.time() + settings.JWT_EXPIRATION_HOURS * 3600
+    principal_cache.revoke(digest, until)
+    remaining = int(until - time.time()) + 1
+    if remaining > 0:
+        try:
+            await cache.set(_revoked_key(digest), "1", expire=remaining)
+        except Exception as e:
+            print(f"Could not store token revocation: {e}")
+    await manager.broker.publish(REVOCATION_TOPIC, PrincipalRevoked(token_digest=digest, until=until))
+
+async def _on_revocation(topic: str, event: Event):
+    data = event.to_dict()
+    principal_cache.revoke(data["token_digest"], data["until"])
+
+async def start_revocation_listener():
+    await manager.broker.subscribe(REVOCATION_TOPIC, _on_revocation)
@@ -0,0 +1,419 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import os
+import secrets
+import socket
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.connections import manager
+from app.core.events import ControlMessage, Event, RawEvent
+from app.core.serialization import get_serializer
+
+# Identifies this process in execution leases and control routing
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+class ResearchSession:
+    """
+    A research thread that outlives the socket that started it.
+
+    Every event published for the session gets a sequence number and is kept
+    in a bounded log in the session store, so a client reconnecting with the
+    resume token - on any worker - gets whatever it missed while the
+    execution kept running. Only the worker holding the execution lease runs
+    the graph for the session.
+    """
+
+    def __init__(self, store: "SessionStore", session_id: str, thread_id: str, resume_token: str):
+        self.store = store
+        self.session_id = session_id
+        self.thread_id = thread_id
+        self.resume_token = resume_token
+
+    @property
+    def task(self) -> Optional[asyncio.Task]:
+        """The execution task, if it runs in this process."""
+        return _local_tasks.get(self.session_id)
+
+    async def publish(self, event: Event):
+        await self.store.append(self, event)
+        await manager.publish(self.thread_id, event)
+
+class SessionStore:
+    """
+    Session metadata, event logs and execution leases.
+
+    Detached sessions can be resumed for SESSION_RESUME_TTL seconds; a
+    session whose execution is still running never expires.
+    """
+
+    async def create(self) -> ResearchSession:
+        raise NotImplementedError
+
+    async def resume(self, token: Optional[str]) -> Optional[ResearchSession]:
+        raise NotImplementedError
+
+    async def append(self, session: ResearchSession, event: Event):
+        """Assign the event its sequence number and log it."""
+        raise NotImplementedError
+
+    async def events_after(self, session: ResearchSession, seq: int) -> Tuple[List[Event], bool]:
+        """Logged events newer than `seq`, and whether older ones were already evicted."""
+        raise NotImplementedError
+
+    async def last_seq(self, session: ResearchSession) -> int:
+        raise NotImplementedError
+
+    async def next_version(self, session: ResearchSession) -> int:
+        raise NotImplementedError
+
+    async def attach(self, session: ResearchSession):
+        raise NotImplementedError
+
+    async def detach(self, session: ResearchSession):
+        raise NotImplementedError
+
+    async def acquire_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        raise NotImplementedError
+
+    async def renew_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        raise NotImplementedError
+
+    async def release_lease(self, session: ResearchSession):
+        raise NotImplementedError
+
+    async def lease_owner(self, session: ResearchSession) -> Optional[str]:
+        raise NotImplementedError
+
+class _SessionData:
+    __slots__ = ("session", "log", "next_seq", "version", "detached_at", "lease_owner", "lease_expires")
+
+    def __init__(self, session: ResearchSession, log_size: int):
+        self.session = session
+        self.log: deque = deque(maxlen=log_size)
+        self.next_seq = 1
+        self.version = 0
+        self.detached_at: Optional[float] = None
+        self.lease_owner: Optional[str] = None
+        self.lease_expires = 0.0
+
+class InMemorySessionStore(SessionStore):
+    """Sessions in this process only; the default for a single worker."""
+
+    def __init__(self, ttl: Optional[int] = None, log_size: Optional[int] = None):
+        self.ttl = ttl or settings.SESSION_RESUME_TTL
+        self.log_size = log_size or settings.SESSION_LOG_SIZE
+        self._by_token: Dict[str, _SessionData] = {}
+        self._by_id: Dict[str, _SessionData] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    async def create(self) -> ResearchSession:
+        self.sweep()
+        session_id = str(uuid.uuid4())
+        session = ResearchSession(self, session_id, f"research_{session_id}", secrets.token_urlsafe(32))
+        data = _SessionData(session, self.log_size)
+        self._by_token[session.resume_token] = data
+        self._by_id[session_id] = data
+        return session
+
+    async def resume(self, token: Optional[str]) -> Optional[ResearchSession]:
+        self.sweep()
+        data = self._by_token.get(token) if token else None
+        return data.session if data else None
+
+    async def append(self, session: ResearchSession, event: Event):
+        data = self._by_id[session.session_id]
+        event.seq = data.next_seq
+        data.next_seq += 1
+        data.log.append(event)
+
+    async def events_after(self, session: ResearchSession, seq: int) -> Tuple[List[Event], bool]:
+        data = self._by_id[session.session_id]
+        events = [event for event in data.log if event.seq > seq]
+        first = data.log[0].seq if data.log else data.next_seq
+        return events, seq + 1 < first
+
+    async def last_seq(self, session: ResearchSession) -> int:
+        return self._by_id[session.session_id].next_seq - 1
+
+    async def next_version(self, session: ResearchSession) -> int:
+        data = self._by_id[session.session_id]
+        data.version += 1
+        return data.version
+
+    async def attach(self, session: ResearchSession):
+        self._by_id[session.session_id].detached_at = None
+
+    async def detach(self, session: ResearchSession):
+        data = self._by_id.get(session.session_id)
+        if data is not None:
+            data.detached_at = time.time()
+
+    async def acquire_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        data = self._by_id[session.session_id]
+        now = time.time()
+        if data.lease_owner is not None and data.lease_expires > now:
+            return False
+        data.lease_owner = WORKER_ID
+        data.lease_expires = now + (ttl or settings.EXECUTION_LEASE_TTL)
+        return True
+
+    async def renew_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        data = self._by_id[session.session_id]
+        if data.lease_owner != WORKER_ID:
+            return False
+        data.lease_expires = time.time() + (ttl or settings.EXECUTION_LEASE_TTL)
+        return True
+
+    async def release_lease(self, session: ResearchSession):
+        data = self._by_id.get(session.session_id)
+        if data is not None and data.lease_owner == WORKER_ID:
+            data.lease_owner = None
+
+    async def lease_owner(self, session: ResearchSession) -> Optional[str]:
+        data = self._by_id[session.session_id]
+        return data.lease_owner if data.lease_expires > time.time() else None
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl
+        for token, data in list(self._by_token.items()):
+            running = data.lease_owner is not None and data.lease_expires > time.time()
+            if data.detached_at is not None and data.detached_at < cutoff and not running:
+                del self._by_token[token]
+                del self._by_id[data.session.session_id]
+
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions shared by all workers through Redis.
+
+    Keys per session: `session:<id>` (hash), `:seq` and `:version`
+    (counters), `:log` (list of JSON-encoded events, trimmed to
+    SESSION_LOG_SIZE) and `:lease` (owner worker id with a TTL). The resume
+    token maps to the id through `session:token:<token>`. Any client with the
+    redis.asyncio API (e.g. fakeredis) can be injected.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None,
+                 ttl: Optional[int] = None, log_size: Optional[int] = None):
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(url or settings.SESSION_STORE_URL)
+        self.client = client
+        self.ttl = ttl or settings.SESSION_RESUME_TTL
+        self.log_size = log_size or settings.SESSION_LOG_SIZE
+        self._serializer = get_serializer("json")
+
+    @staticmethod
+    def _key(session: ResearchSession, suffix: str = "") -> str:
+        return f"session:{session.session_id}{suffix}"
+
+    async def _touch(self, session: ResearchSession):
+        # Every key of the session shares one expiry, pushed back on activity
+        async with self.client.pipeline(transaction=False) as pipe:
+            for suffix in ("", ":seq", ":version", ":log"):
+                pipe.expire(self._key(session, suffix), self.ttl)
+            pipe.expire(f"session:token:{session.resume_token}", self.ttl)
+            await pipe.execute()
+
+    async def create(self) -> ResearchSession:
+        session_id = str(uuid.uuid4())
+        session = ResearchSession(self, session_id, f"research_{session_id}", secrets.token_urlsafe(32))
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(session), mapping={
+                "thread_id": session.thread_id,
+                "resume_token": session.resume_token,
+            })
+            pipe.set(f"session:token:{session.resume_token}", session_id)
+            await pipe.execute()
+        await self._touch(session)
+        return session
+
+    async def resume(self, token: Optional[str]) -> Optional[ResearchSession]:
+        if not token:
+            return None
+        session_id = await self.client.get(f"session:token:{token}")
+        if session_id is None:
+            return None
+        if isinstance(session_id, bytes):
+            session_id = session_id.decode()
+        thread_id = await self.client.hget(f"session:{session_id}", "thread_id")
+        if thread_id is None:
+            return None
+        if isinstance(thread_id, bytes):
+            thread_id = thread_id.decode()
+        return ResearchSession(self, session_id, thread_id, token)
+
+    async def append(self, session: ResearchSession, event: Event):
+        event.seq = await self.client.incr(self._key(session, ":seq"))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.rpush(self._key(session, ":log"), event.encode(self._serializer))
+            pipe.ltrim(self._key(session, ":log"), -self.log_size, -1)
+            await pipe.execute()
+        await self._touch(session)
+
+    async def events_after(self, session: ResearchSession, seq: int) -> Tuple[List[Event], bool]:
+        raw = await self.client.lrange(self._key(session, ":log"), 0, -1)
+        # append() numbers every logged event; anything without a seq is skipped
+        numbered = [(event.seq, event) for event in map(RawEvent, raw) if event.seq is not None]
+        first = numbered[0][0] if numbered else await self.last_seq(session) + 1
+        return [event for event_seq, event in numbered if event_seq > seq], seq + 1 < first
+
+    async def last_seq(self, session: ResearchSession) -> int:
+        return int(await self.client.get(self._key(session, ":seq")) or 0)
+
+    async def next_version(self, session: ResearchSession) -> int:
+        return await self.client.incr(self._key(session, ":version"))
+
+    async def attach(self, session: ResearchSession):
+        await self.client.hdel(self._key(session), "detached_at")
+        await self._touch(session)
+
+    async def detach(self, session: ResearchSession):
+        await self.client.hset(self._key(session), "detached_at", time.time())
+        await self._touch(session)
+
+    async def acquire_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        ttl_ms = int((ttl or settings.EXECUTION_LEASE_TTL) * 1000)
+        return bool(await self.client.set(self._key(session, ":lease"), WORKER_ID, nx=True, px=ttl_ms))
+
+    async def renew_lease(self, session: ResearchSession, ttl: Optional[float] = None) -> bool:
+        ttl_ms = int((ttl or settings.EXECUTION_LEASE_TTL) * 1000)
+        # Compare-and-set, so a lease that expired and was taken over by
+        # another worker between the check and the write is left alone
+        if not await self.client.eval(_RENEW_LEASE, 1, self._key(session, ":lease"), WORKER_ID, ttl_ms):
+            return False
+        await self._touch(session)
+        return True
+
+    async def release_lease(self, session: ResearchSession):
+        await self.client.eval(_RELEASE_LEASE, 1, self._key(session, ":lease"), WORKER_ID)
+
+    async def lease_owner(self, session: ResearchSession) -> Optional[str]:
+        owner = await self.client.get(self._key(session, ":lease"))
+        return owner.decode() if isinstance(owner, bytes) else owner
+
+_session_store: Optional[SessionStore] = None
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        url = settings.SESSION_STORE_URL
+        if url and url not in ("memory", "none"):
+            try:
+                _session_store = RedisSessionStore()
+            except Exception:
+                print("Redis session store not available, falling back to in-process sessions")
+                _session_store = InMemorySessionStore()
+        else:
+            _session_store = InMemorySessionStore()
+    return _session_store
+
+async def init_session_store() -> SessionStore:
+    """
+    Create the session store and check that Redis answers, since
+    redis.asyncio only connects on first use. Called at startup.
+    """
+    global _session_store
+    store = get_session_store()
+    if isinstance(store, RedisSessionStore):
+        try:
+            await store.client.ping()
+        except Exception as e:
+            print(f"Redis session store not reachable, falling back to in-process sessions: {e}")
+            await store.client.aclose()
+            store = _session_store = InMemorySessionStore()
+    return store
+
+# Execution tasks running in this process, by session id
+_local_tasks: Dict[str, asyncio.Task] = {}
+
+def _apply_control(session_id: str, action: str) -> bool:
+    task = _local_tasks.get(session_id)
+    if task is None or task.done():
+        return False
+    if action == "cancel":
+        task.cancel()
+    return True
+
+async def route_control(session: ResearchSession, action: str) -> bool:
+    """
+    Apply a control action to the session's execution wherever it runs.
+    Returns False if no execution is running.
+    """
+    if _apply_control(session.session_id, action):
+        return True
+    owner = await session.store.lease_owner(session)
+    if owner is None or owner == WORKER_ID:
+        return False
+    await manager.broker.publish(f"worker:{owner}", ControlMessage(session.session_id, action))
+    return True
+
+async def _on_control(topic: str, event: Event):
+    data = event.to_dict()
+    _apply_control(data["session_id"], data["action"])
+
+async def start_control_listener():
+    await manager.broker.subscribe(f"worker:{WORKER_ID}", _on_control)
+
+async def keep_attached(session: ResearchSession):
+    """
+    Push back the session's expiry while a socket is attached, so an idle
+    but connected session keeps its log and sequence numbers. Runs until
+    cancelled when the socket goes away.
+    """
+    interval = settings.SESSION_RESUME_TTL / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await session.store.attach(session)
+        except Exception as e:
+            print(f"Failed to refresh session {session.session_id}: {e}")
+
+async def run_with_lease(session: ResearchSession, coro) -> bool:
+    """
+    Run `coro` as the session's execution if this worker can take the lease.
+    The lease is renewed while it runs; losing it cancels the execution so
+    two workers never run the same session.
+    """
+    if not await session.store.acquire_lease(session):
+        coro.close()
+        return False
+
+    async def run():
+        renewer = asyncio.create_task(_renew_lease(session, asyncio.current_task()))
+        try:
+            await coro
+        finally:
+            renewer.cancel()
+            _local_tasks.pop(session.session_id, None)
+            await session.store.release_lease(session)
+
+    _local_tasks[session.session_id] = asyncio.create_task(run())
+    return True
+
+async def _renew_lease(session: ResearchSession, task: asyncio.Task):
+    interval = settings.EXECUTION_LEASE_TTL / 3
+    while True:
+        await asyncio.sleep(interval)
+        if not await session.store.renew_lease(session):
+            print(f"Lost execution lease for session {session.session_id}")
+            task.cancel()
+            return
\ No newline at end of file
@@ -0,0 +1,83 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import uuid
+
+from app.core.cache import CacheInterface, cache
+from app.core.config import settings
+from app.models import Workflow
+
+def workflow_etag(workflow: Workflow) -> str:
+    """Every write bumps the row version, and graph versions never change."""
+    return f'"wf-{workflow.id}-v{workflow.version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in if_none_match
+
+class WorkflowCache:
+    """
+    Serialized workflow responses, so unchanged polls skip building and
+    encoding the graph.
+
+    A single workflow is cached under its row version, which every write
+    bumps. A listing is cached under the generations of the workflows it can
+    contain: the owner's, plus the public generation when public workflows
+    are included. Writes start a new generation, so the listing's cache key
+    and ETag change without having to find every cached page. Generations
+    live in the cache; with per-process caches and several workers, set
+    REDIS_URL or listings may be stale for up to WORKFLOW_CACHE_TTL.
+    """
+
+    def __init__(self, backend: Optional[CacheInterface] = None, ttl: Optional[int] = None):
+        self.backend = backend or cache
+        self.ttl = ttl or settings.WORKFLOW_CACHE_TTL
+
+    @staticmethod
+    def workflow_key(workflow: Workflow) -> str:
+        return f"workflow:{workflow.id}:v{workflow.version}"
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self.backend.get(key)
+        except Exception:
+            return None
+
+    async def set(self, key: str, body: str):
+        try:
+            await self.backend.set(key, body, expire=self.ttl)
+        except Exception:
+            pass
+
+    async def _generation(self, name: str) -> str:
+        key = f"workflows:generation:{name}"
+        generation = await self.get(key)
+        if generation is None:
+            # A fresh token, never "0": ETags issued before the cache lost the
+            # generation must not match again
+            generation = uuid.uuid4().hex
+            await self.set(key, generation)
+        return generation
+
+    async def listing_key(self, user_id: int, public: bool, own: bool, params: Dict[str, Any]) -> str:
+        generations = []
+        if own:
+            generations.append(await self._generation(f"user:{user_id}"))
+        if public:
+            generations.append(await self._generation("public"))
+        raw = json.dumps([user_id, own, public, params, generations], sort_keys=True, default=str)
+        return f"workflows:list:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    async def invalidate(self, workflow: Workflow, previous_version: Optional[int] = None, was_public: bool = False):
+        """Call after a write to `workflow` was committed."""
+        if previous_version is not None:
+            try:
+                await self.backend.delete(f"workflow:{workflow.id}:v{previous_version}")
+            except Exception:
+                pass
+        await self.set(f"workflows:generation:user:{workflow.user_id}", uuid.uuid4().hex)
+        if workflow.is_public or was_public:
+            await self.set("workflows:generation:public", uuid.uuid4().hex)
+
+workflow_cache = WorkflowCache()
@@ -1,26 +1,67 @@
-from typing import Dict, Any
+from typing import Annotated, Dict, Any, Optional, Type, TypedDict, Union
 from sqlalchemy.orm import Session
 from datetime import datetime
 import json
+import time
 
+from app.core.events import AgentNodeUpdate, Event, StatusUpdate
+from app.core.metrics import agent_run_seconds
+from app.core.tracing import span, start_trace
 from app.models import Workflow, WorkflowExecution
+from app.agents.base import BaseAgent
 from app.agents.planner import PlannerAgent
 from app.agents.literature_search import LiteratureSearchAgent
 from app.agents.code_search import CodeSearchAgent
 from app.agents.summarizer import SummarizerAgent
 from app.agents.pdf_generator import PDFGeneratorAgent
-from app.agents.guardrails import GUARDRAIL_MAP
+from app.agents.replay import with_replay
+from app.services.execution_archiver import restore_execution
+from app.services.workflow_graphs import load_graph
 from langgraph.graph import StateGraph, END
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.checkpoint.memory import MemorySaver
 
+def timed_agent(agent_type: str, node_id: str, process):
+    """
+    Wrap an agent's process() to record how long its event stream took,
+    traced as the node's span.
+    """
+    async def run(input_data: Any):
+        start = time.perf_counter()
+        outcome = "error"
+        with span("node", graph="workflow", node=node_id, agent=agent_type) as node_span:
+            try:
+                async for event in process(input_data):
+                    if isinstance(event, dict) and event.get("status") == "completed":
+                        outcome = "completed"
+                    yield event
+            finally:
+                node_span.set(outcome=outcome)
+                agent_run_seconds.labels(agent_type, outcome).observe(time.perf_counter() - start)
+    return run
+
+def _merge_outputs(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Parallel branches each add their own node's output
+    return {**(left or {}), **(right or {})}
+
+class WorkflowState(TypedDict, total=False):
+    input: Dict[str, Any]
+    # Final event of every agent node that ran, by node id
+    outputs: Annotated[Dict[str, Any], _merge_outputs]
+
+# Event fields describing an agent's run rather than its results
+RUN_FIELDS = ("status", "message")
+
 class WorkflowExecutor:
-    def __init__(self, db: Session, connection_manager, client_id: str):
+    def __init__(self, db: Session, connection_manager, client_id: str, topic: Optional[str] = None):
         self.db = db
         self.connection_manager = connection_manager
         self.client_id = client_id
+        # Updates are published to the topic's viewers when given, else sent to the client only
+        self.topic = topic
         self.memory = MemorySaver()
         
-        self.agent_map = {
+        self.agent_map: Dict[str, Type[BaseAgent]] = {
             "planner": PlannerAgent,
             "literature_search": LiteratureSearchAgent,
             "code_search": CodeSearchAgent,
@@ -46,102 +87,122 @@ class WorkflowExecutor:
         self.db.add(execution)
         self.db.commit()
         
-        try:
-            # Build LangGraph
-            graph = self._build_graph(workflow)
-            
-            # Execute workflow
-            config = {"configurable": {"thread_id": f"execution_{execution.id}"}}
-            
-            async for event in graph.astream(input_data, config=config):
-                await self._handle_event(event, execution)
-            
-            # Mark as completed
-            execution.status = "completed"
-            execution.completed_at = datetime.utcnow()
-            self.db.commit()
-            
-            await self._send_update({
-                "status": "completed",
-                "execution_id": execution.id
-            })
-            
-        except Exception as e:
-            execution.status = "failed"
-            execution.output_data = {"error": str(e)}
-            self.db.commit()
-            
-            await self._send_update({
-                "status": "failed",
-                "error": str(e)
-            })
+        # One trace per execution; its id comes back with the final status
+        with start_trace(
+            "workflow.execution", workflow_id=workflow_id, execution_id=execution.id, user_id=execution.user_id
+        ) as root:
+            try:
+                # Build LangGraph
+                graph = self._build_graph(workflow)
+                
+                # Execute workflow
+                config = {"configurable": {"thread_id": f"execution_{execution.id}"}}
+                
+                async for event in graph.astream({"input": input_data}, config=config, stream_mode="updates"):
+                    await self._handle_event(event, execution)
+                
+                # Mark as completed
+                execution.status = "completed"
+                execution.completed_at = datetime.utcnow()
+                self.db.commit()
+                
+                await self._send_update({
+                    "status": "completed",
+                    "execution_id": execution.id,
+                    "trace_id": root.trace_id
+                })
+                
+            except Exception as e:
+                root.set(error=str(e))
+                execution.status = "failed"
+                execution.output_data = {"error": str(e)}
+                self.db.commit()
+                
+                await self._send_update({
+                    "status": "failed",
+                    "error": str(e),
+                    "trace_id": root.trace_id
+                })
     
-    def _build_graph(self, workflow) -> StateGraph:
-        graph = Graph()
+    def _build_graph(self, workflow) -> CompiledStateGraph:
+        graph = StateGraph(WorkflowState)
+        nodes, edges = load_graph(self.db, workflow)
         
         # Add nodes
-        for node in workflow.nodes:
-            if node.type == "agent":
-                agent_class = self.agent_map.get(node.data.get("agent"))
+        for node in nodes:
+            if node["type"] == "agent":
+                agent_type = node["data"].get("agent")
+                agent_class = self.agent_map.get(agent_type)
                 if agent_class:
-                    config = node.data.get("config", {})
+                    config = node["data"].get("config", {})
                     
-                    # Setup guardrails
-                    input_guardrails = []
-                    output_guardrails = []
+                    # Agents build their input/output guardrails from the
+                    # config via GUARDRAIL_MAP; cacheable ones replay
+                    # recorded runs for identical inputs
+                    agent = with_replay(agent_class(config), agent_type)
                     
-                    for guardrail_name in config.get("input_guardrails", []):
-                        guardrail_class = GUARDRAIL_MAP.get(guardrail_name)
-                        if guardrail_class:
-                            guardrail = guardrail_class(config.get(f"{guardrail_name}_config", {}))
-                            input_guardrails.append(guardrail)
-                    
-                    for guardrail_name in config.get("output_guardrails", []):
-                        guardrail_class = GUARDRAIL_MAP.get(guardrail_name)
-                        if guardrail_class:
-                            guardrail = guardrail_class(config.get(f"{guardrail_name}_config", {}))
-                            output_guardrails.append(guardrail)
-                    
-                    # Create agent with guardrails
-                    agent = agent_class(config)
-                    agent.input_guardrails = input_guardrails
-                    agent.output_guardrails = output_guardrails
-                    
-                    graph.add_node(node.node_id, agent.process)
-        
-        # Add edges
-        for edge in workflow.edges:
-            if edge.target == "end":
-                graph.add_edge(edge.source, END)
-            else:
-                graph.add_edge(edge.source, edge.target)
+                    graph.add_node(node["node_id"], self._agent_node(node["node_id"], agent_type, agent))
         
         # Set entry point
-        start_node = next((n for n in workflow.nodes if n.type == "start"), None)
+        start_node = next((n for n in nodes if n["type"] == "start"), None)
+        start_id = start_node["node_id"] if start_node else None
         if start_node:
-            first_edge = next((e for e in workflow.edges if e.source == start_node.node_id), None)
+            first_edge = next((e for e in edges if e["source"] == start_id), None)
             if first_edge:
-                graph.set_entry_point(first_edge.target)
+                graph.set_entry_point(first_edge["target"])
+        
+        # Add edges
+        for edge in edges:
+            if edge["source"] == start_id:
+                continue
+            if edge["target"] == "end":
+                graph.add_edge(edge["source"], END)
+            else:
+                graph.add_edge(edge["source"], edge["target"])
         
         return graph.compile(checkpointer=self.memory)
     
-    async def _handle_event(self, event: Dict[str, Any], execution: WorkflowExecution):
-        # Update node states
-        for node_id, node_data in event.items():
-            if isinstance(node_data, dict):
-                execution.node_states[node_id] = node_data
-                
+    def _agent_node(self, node_id: str, agent_type: str, agent):
+        """
+        A graph node running the agent: its events are sent as they come,
+        and its final event becomes the node's output.
+        """
+        process = timed_agent(agent_type, node_id, agent.process)
+        
+        async def run(state: WorkflowState) -> Dict[str, Any]:
+            # Agents get the run's input plus the results of the nodes before them
+            inputs = dict(state.get("input") or {})
+            for output in (state.get("outputs") or {}).values():
+                inputs.update({key: value for key, value in output.items() if key not in RUN_FIELDS})
+            
+            final: Dict[str, Any] = {}
+            async for event in process(inputs):
+                final = event
                 # Send real-time update
-                await self._send_update({
-                    "type": "node_update",
-                    "node_id": node_id,
-                    "data": node_data
-                })
+                await self._send_update(AgentNodeUpdate(node_id, event))
+            return {"outputs": {node_id: final}}
         
-        self.db.commit()
+        return run
+    
+    async def _handle_event(self, event: Dict[str, Any], execution: WorkflowExecution):
+        with span("executor.handle_event", nodes=list(event)):
+            # Update node states with each finished node's final event
+            node_states = dict(execution.node_states or {})
+            for node_id, update in event.items():
+                if isinstance(update, dict):
+                    node_states.update(update.get("outputs") or {})
+            # Reassigned: in-place changes to a JSON column aren't persisted
+            execution.node_states = node_states
+            
+            self.db.commit()
     
-    async def _send_update(self, message: Dict[str, Any]):
-        await self.connection_manager.send_message(message, self.client_id)
+    async def _send_update(self, message: Union[Event, Dict[str, Any]]):
+        if not isinstance(message, Event):
+            message = StatusUpdate(**message)
+        if self.topic:
+            await self.connection_manager.publish(self.topic, message)
+        else:
+            await self.connection_manager.send_message(message, self.client_id)
     
     async def update_and_rerun_node(self, workflow_id: int, node_id: str, new_params: Dict[str, Any]):
         # Get the latest execution
@@ -159,43 +220,57 @@ class WorkflowExecutor:
             await self._send_update({"error": "Workflow not found"})
             return
         
-        try:
-            # Build graph
-            graph = self._build_graph(workflow)
-            
-            # Get the checkpoint from the previous execution
-            config = {"configurable": {"thread_id": f"execution_{execution.id}"}}
-            
-            # Get current state
-            state = graph.get_state(config)
-            
-            # Update node parameters
-            node_states = execution.node_states or {}
-            if node_id in node_states:
-                node_states[node_id].update(new_params)
-            
-            # Resume from the updated node
-            await self._send_update({
-                "status": "rerunning",
-                "node_id": node_id,
-                "message": f"Re-running from node {node_id}"
-            })
-            
-            # Re-execute from this node forward
-            async for event in graph.astream(None, config=config, stream_mode="updates"):
-                await self._handle_event(event, execution)
-            
-            execution.status = "completed"
-            execution.completed_at = datetime.utcnow()
-            self.db.commit()
-            
-            await self._send_update({
-                "status": "completed",
-                "message": "Re-run completed successfully"
-            })
-            
-        except Exception as e:
-            await self._send_update({
-                "status": "error",
-                "error": str(e)
-            })
\ No newline at end of file
+        # The rerun updates the node states the archiver moved to cold storage
+        if execution.archive_ref:
+            await restore_execution(self.db, execution)
+        
+        with start_trace(
+            "workflow.rerun", workflow_id=workflow_id, execution_id=execution.id, node_id=node_id, user_id=execution.user_id
+        ) as root:
+            try:
+                # Build graph
+                graph = self._build_graph(workflow)
+                
+                # Get the checkpoint from the previous execution
+                config = {"configurable": {"thread_id": f"execution_{execution.id}"}}
+                
+                # Update node parameters on the (restored) record
+                node_states = dict(execution.node_states or {})
+                if node_id in node_states:
+                    node_states[node_id] = {**node_states[node_id], **new_params}
+                # Reassigned: in-place changes to a JSON column aren't persisted
+                execution.node_states = node_states
+                execution.status = "running"
+                self.db.commit()
+                
+                # Resume from the updated node
+                await self._send_update({
+                    "status": "rerunning",
+                    "node_id": node_id,
+                    "message": f"Re-running from node {node_id}",
+                    "trace_id": root.trace_id
+                })
+                
+                # Re-execute from this node forward
+                async for event in graph.astream(None, config=config, stream_mode="updates"):
+                    await self._handle_event(event, execution)
+                
+                execution.status = "completed"
+                execution.completed_at = datetime.utcnow()
+                self.db.commit()
+                
+                await self._send_update({
+                    "status": "completed",
+                    "message": "Re-run completed successfully"
+                })
+                
+            except Exception as e:
+                root.set(error=str(e))
+                execution.status = "failed"
+                execution.output_data = {"error": str(e)}
+                self.db.commit()
+                
+                await self._send_update({
+                    "status": "error",
+                    "error": str(e)
+                })
\ No newline at end of file
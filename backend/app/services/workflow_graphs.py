@@ -0,0 +1,83 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models import NodeDefinition, Workflow, WorkflowGraph
+
+# (nodes, edges) with each node expanded to node_id, type, position, data
+Graph = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+def content_hash(value: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of `value`."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _insert_missing(db: Session, model, rows: List[Dict[str, Any]]):
+    """Bulk-insert content-addressed rows, skipping hashes already stored."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        existing = set(db.scalars(select(model.hash).where(model.hash.in_([row["hash"] for row in rows]))))
+        rows = [row for row in rows if row["hash"] not in existing]
+        if rows:
+            db.execute(insert(model), rows)
+        return
+    db.execute(dialect_insert(model).on_conflict_do_nothing(index_elements=["hash"]), rows)
+
+def store_graph(db: Session, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> str:
+    """
+    Store a graph given as node dicts (node_id, type, position, data) and
+    edge dicts (source, target); returns its hash. Node definitions and the
+    graph version are each written with one bulk insert, and only if that
+    content is not stored yet.
+    """
+    definitions: Dict[str, Dict[str, Any]] = {}
+    graph_nodes = []
+    for node in nodes:
+        definition = {"type": node["type"], "data": node.get("data")}
+        key = content_hash(definition)
+        definitions[key] = {"hash": key, **definition}
+        graph_nodes.append({"node_id": node["node_id"], "position": node.get("position"), "definition": key})
+    graph_edges = [{"source": edge["source"], "target": edge["target"]} for edge in edges]
+
+    graph_hash = content_hash({"nodes": graph_nodes, "edges": graph_edges})
+    _insert_missing(db, NodeDefinition, list(definitions.values()))
+    _insert_missing(db, WorkflowGraph, [{"hash": graph_hash, "nodes": graph_nodes, "edges": graph_edges}])
+    return graph_hash
+
+def load_graphs(db: Session, graph_hashes: Iterable[Optional[str]]) -> Dict[str, Graph]:
+    """Expanded graphs by hash, loaded in two queries however many there are."""
+    hashes = {graph_hash for graph_hash in graph_hashes if graph_hash}
+    if not hashes:
+        return {}
+    graphs = db.query(WorkflowGraph).filter(WorkflowGraph.hash.in_(hashes)).all()
+    definition_hashes = {node["definition"] for graph in graphs for node in graph.nodes}
+    definitions = {
+        definition.hash: definition
+        for definition in db.query(NodeDefinition).filter(NodeDefinition.hash.in_(definition_hashes))
+    }
+
+    expanded = {}
+    for graph in graphs:
+        nodes = []
+        for node in graph.nodes:
+            definition = definitions[node["definition"]]
+            nodes.append({
+                "node_id": node["node_id"],
+                "type": definition.type,
+                "position": node["position"],
+                "data": definition.data,
+            })
+        expanded[graph.hash] = (nodes, graph.edges)
+    return expanded
+
+def load_graph(db: Session, workflow: Workflow) -> Graph:
+    return load_graphs(db, [workflow.graph_hash]).get(workflow.graph_hash, ([], []))
@@ -0,0 +1,53 @@
+from typing import Any, Dict, Optional
+import os
+
+from app.core.config import settings
+
+_connection: Optional[Any] = None
+_path: Optional[str] = None
+
+async def open_checkpointer(url: Optional[str] = None):
+    """
+    Open the checkpointer shared by all workers, or None for the default
+    in-process MemorySaver.
+
+    `sqlite:///path.db` stores checkpoints in SQLite (WAL mode), which lets
+    several workers on one host read and write the same threads.
+    """
+    global _connection, _path
+    url = url or settings.CHECKPOINT_URL
+    if not url.startswith("sqlite"):
+        return None
+
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    _path = url.split("///", 1)[-1]
+    _connection = await aiosqlite.connect(_path)
+    saver = AsyncSqliteSaver(_connection)
+    await saver.setup()
+    return saver
+
+async def attach_checkpointer(graph):
+    # The async saver needs the running loop, so it is attached at startup
+    # rather than when the graph is compiled
+    saver = await open_checkpointer()
+    if saver is not None:
+        graph.checkpointer = saver
+
+async def close_checkpointer():
+    global _connection
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
+
+def checkpoint_store_size(graph) -> Dict[str, float]:
+    """Bytes on disk of the SQLite store, or threads held by an in-process saver."""
+    if _path is not None:
+        size = 0
+        for path in (_path, _path + "-wal"):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return {"bytes": size}
+    storage = getattr(graph.checkpointer, "storage", None)
+    return {"threads": len(storage)} if storage is not None else {}
@@ -8,7 +8,10 @@ import asyncio
 import json
 import os
 
+from app.agents.llm_metrics import llm_metrics
 from app.core.config import Settings
+from app.core.metrics import instrument_node
+from app.services.plan_store import get_plan_store
 
 # Define the state
 class ResearchState(TypedDict):
@@ -36,12 +39,27 @@ else:
 llm = ChatOpenAI(
     temperature=0.7, 
     model="gpt-3.5-turbo",
-    api_key=api_key
+    api_key=api_key,
+    callbacks=[llm_metrics]
 )
 
 # Agent implementations
 async def planner_agent(state: ResearchState) -> ResearchState:
     """Create a research plan based on the question"""
+    # Reuse the validated plan of a near-duplicate earlier question
+    plan_store = get_plan_store("research_graph")
+    reused = plan_store.lookup(state["question"])
+    if reused:
+        plan, similarity, original_question = reused
+        return {
+            "plan": plan,
+            "messages": [
+                f"Reused research plan with {len(plan.get('steps', []))} steps "
+                f"from a similar question (similarity {similarity:.2f}): {original_question}"
+            ],
+            "current_step": "planner"
+        }
+    
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a research planning assistant. Given a research question, 
         create a workflow plan. Output ONLY a valid JSON object with this structure:
@@ -83,6 +101,9 @@ async def planner_agent(state: ResearchState) -> ResearchState:
         if not isinstance(plan, dict) or 'steps' not in plan:
             raise ValueError("Invalid plan structure")
         
+        # Only plans that pass validation are kept for reuse
+        plan_store.add(state["question"], plan)
+        
         return {
             "plan": plan,
             "messages": [f"Created research plan with {len(plan.get('steps', []))} steps"],
@@ -244,10 +265,11 @@ def create_research_graph():
     workflow = StateGraph(ResearchState)
     
     # Add nodes
-    workflow.add_node("planner", planner_agent)
-    workflow.add_node("literature_search", literature_search_agent)
-    workflow.add_node("code_search", code_search_agent)
-    workflow.add_node("summarizer", summarizer_agent)
+    # Each node's duration is recorded in graph_node_duration_seconds
+    workflow.add_node("planner", instrument_node("research", "planner", planner_agent))
+    workflow.add_node("literature_search", instrument_node("research", "literature_search", literature_search_agent))
+    workflow.add_node("code_search", instrument_node("research", "code_search", code_search_agent))
+    workflow.add_node("summarizer", instrument_node("research", "summarizer", summarizer_agent))
     
     # Add edges
     workflow.set_entry_point("planner")
@@ -0,0 +1,139 @@
+"""
+Check the Redis broker's topic fan-out against an in-process Redis stand-in.
+
+    python -m benchmarks.broker_fanout --workers 4 --viewers 10 --events 500
+
+Runs on fakeredis (pip install fakeredis): every simulated worker has its
+own RedisBroker on one shared fake server, with `--viewers` local handlers
+on the same topic, the way a dashboard watched by many sockets looks. Reports
+publish throughput and delivery latency next to the in-process broker, and
+checks that every viewer gets every event in order, that workers receive
+the published bytes unchanged, that a malformed message doesn't stop a
+listener, that a listener resubscribes after a Redis outage, and that
+unsubscribing the last viewer drops the Redis subscription. Exits non-zero
+if a check fails.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+try:
+    import fakeredis
+    from fakeredis import aioredis as fake_aioredis
+except ImportError:
+    sys.exit("This check needs fakeredis: pip install fakeredis")
+
+from app.core.broker import Broker, InProcessBroker, RedisBroker
+from app.core.events import StatusUpdate
+
+TOPIC = "bench:execution"
+
+failures = []
+
+def check(ok: bool, message: str):
+    print(f"  [{'ok' if ok else 'FAIL'}] {message}")
+    if not ok:
+        failures.append(message)
+
+class Viewer:
+    """A local subscriber, standing in for one socket watching the topic."""
+
+    def __init__(self, sent_at: Dict[int, float]):
+        self.sent_at = sent_at
+        self.received: List[int] = []
+        self.raw: List[str] = []
+        self.latencies: List[float] = []
+
+    async def handle(self, topic: str, event):
+        index = event.to_dict()["index"]
+        self.received.append(index)
+        self.raw.append(getattr(event, "raw", None))
+        self.latencies.append(time.perf_counter() - self.sent_at[index])
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+async def fan_out(name: str, publisher: Broker, workers: List[Broker], viewers: int, events: int) -> List[Viewer]:
+    sent_at: Dict[int, float] = {}
+    all_viewers = []
+    for broker in workers:
+        for _ in range(viewers):
+            viewer = Viewer(sent_at)
+            await broker.subscribe(TOPIC, viewer.handle)
+            all_viewers.append(viewer)
+
+    start = time.perf_counter()
+    for index in range(events):
+        sent_at[index] = time.perf_counter()
+        await publisher.publish(TOPIC, StatusUpdate(status="running", index=index))
+    published = time.perf_counter() - start
+    await wait_for(lambda: all(len(viewer.received) == events for viewer in all_viewers))
+    delivered = time.perf_counter() - start
+
+    latencies = sorted(latency for viewer in all_viewers for latency in viewer.latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(f"{name:<15} {events / published:,.0f} publishes/s, "
+          f"{len(latencies) / delivered:,.0f} deliveries/s to {len(all_viewers)} viewers, "
+          f"latency p50 {statistics.median(latencies or [0]) * 1000:.2f} ms / p99 {p99 * 1000:.2f} ms")
+
+    for broker, offset in zip(workers, range(0, len(all_viewers), viewers)):
+        for viewer in all_viewers[offset:offset + viewers]:
+            await broker.unsubscribe(TOPIC, viewer.handle)
+    return all_viewers
+
+async def run(args) -> bool:
+    local = InProcessBroker()
+    await fan_out("in-process:", local, [local], args.viewers * args.workers, args.events)
+
+    server = fakeredis.FakeServer()
+    publisher = RedisBroker(client=fake_aioredis.FakeRedis(server=server))
+    workers = [RedisBroker(client=fake_aioredis.FakeRedis(server=server)) for _ in range(args.workers)]
+    viewers = await fan_out("redis (fake):", publisher, workers, args.viewers, args.events)
+
+    check(all(viewer.received == list(range(args.events)) for viewer in viewers),
+          f"all {len(viewers)} viewers got the {args.events} events in order")
+    check(all(viewer.raw == viewers[0].raw for viewer in viewers),
+          "every worker received the published bytes unchanged")
+    channel = RedisBroker.CHANNEL_PREFIX + TOPIC
+    subscribed = dict(await publisher.client.pubsub_numsub(channel))
+    check(not any(subscribed.values()), "unsubscribing the last viewer drops each worker's Redis subscription")
+
+    worker = workers[0]
+    viewer = Viewer({0: time.perf_counter()})
+    await worker.subscribe(TOPIC, viewer.handle)
+    await publisher.client.publish(channel, b"not json")
+    await publisher.publish(TOPIC, StatusUpdate(status="running", index=0))
+    await wait_for(lambda: viewer.received == [0], timeout=3.0)
+    check(viewer.received == [0] and not worker._listener.done(), "a malformed message is skipped, the listener keeps running")
+
+    server.connected = False
+    await asyncio.sleep(1.5)
+    server.connected = True
+    viewer.sent_at[1] = time.perf_counter()
+    await wait_for(lambda: worker._pubsub.subscribed)
+    await asyncio.sleep(0.1)
+    await publisher.publish(TOPIC, StatusUpdate(status="running", index=1))
+    await wait_for(lambda: viewer.received == [0, 1], timeout=3.0)
+    check(viewer.received == [0, 1] and not worker._listener.done(), "the listener resubscribes after a Redis outage")
+    await worker.unsubscribe(TOPIC, viewer.handle)
+
+    for broker in [publisher] + workers:
+        await broker.close()
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--viewers", type=int, default=10, help="local viewers per worker")
+    parser.add_argument("--events", type=int, default=500)
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
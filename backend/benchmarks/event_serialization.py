@@ -0,0 +1,83 @@
+"""
+Benchmark per-event serialization overhead of WebSocket messages.
+
+    python -m benchmarks.event_serialization --papers 20 --viewers 10
+
+Compares the previous path (a dict with datetime.now().isoformat(), encoded
+with json.dumps like Starlette's send_json, once per socket) against typed
+events encoded once with orjson or MessagePack.
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from app.core.events import NodeUpdate
+from app.core.serialization import get_serializer
+
+def make_state(papers: int):
+    return {
+        "literature_results": [
+            {
+                "title": f"Paper {i} on graph neural networks",
+                "authors": ["A. Author", "B. Author"],
+                "summary": "A comprehensive study of message passing. " * 5,
+            }
+            for i in range(papers)
+        ],
+        "messages": [f"Found {papers} papers"],
+        "current_step": "literature_search",
+    }
+
+def per_event_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=20)
+    parser.add_argument("--viewers", type=int, default=1, help="sockets each event goes to")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    state = make_state(args.papers)
+
+    def legacy():
+        message = {
+            "type": "node_update",
+            "node": "literature_search",
+            "state": state,
+            "timestamp": datetime.now().isoformat(),
+        }
+        for _ in range(args.viewers):
+            json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def typed(serializer):
+        def run():
+            event = NodeUpdate("literature_search", state)
+            for _ in range(args.viewers):
+                event.encode(serializer)
+        return run
+
+    legacy_size = len(json.dumps(
+        {"type": "node_update", "node": "literature_search", "state": state,
+         "timestamp": datetime.now().isoformat()},
+        separators=(",", ":"), ensure_ascii=False
+    ))
+    results = [("dict + json.dumps", legacy, legacy_size)]
+    for name in ("json", "msgpack"):
+        serializer = get_serializer(name)
+        size = len(NodeUpdate("literature_search", state).encode(serializer))
+        results.append((f"event + {name}", typed(serializer), size))
+
+    print(f"{args.papers} papers per state, {args.viewers} viewer(s), {args.iterations} events")
+    baseline = None
+    for label, fn, size in results:
+        us = per_event_us(fn, args.iterations)
+        baseline = baseline or us
+        print(f"{label:<20} {us:8.1f} us/event  {size:7d} bytes  {baseline / us:5.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
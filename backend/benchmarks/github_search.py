@@ -0,0 +1,154 @@
+"""
+Check GitHubCodeSearchClient against a local stub of the code-search API.
+
+    python -m benchmarks.github_search --pages 5 --latency 50
+
+The stub answers /search/code with numbered items, ETags and a fixed
+latency per request, so no token or network access is needed. Reports the
+time for a cold search (first page, then the rest concurrently) against
+fetching the pages one after the other, and checks that a repeated search
+is served from 304s, that connections are reused, and that a 429 with
+Retry-After is waited out and retried. Exits non-zero if a check fails.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.core.cache import InMemoryCache
+from app.services.github_client import GitHubCodeSearchClient
+
+class StubState:
+    def __init__(self, total: int, latency: float):
+        self.total = total
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self.connections = 0
+        self.rate_limit_next = 0
+        self.lock = threading.Lock()
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search/code":
+                self._send(404)
+                return
+            time.sleep(state.latency)
+            with state.lock:
+                state.requests += 1
+                limited = state.rate_limit_next > 0
+                if limited:
+                    state.rate_limit_next -= 1
+            if limited:
+                self._send(429, b"{}", [("Retry-After", "1"), ("X-RateLimit-Remaining", "0")])
+                return
+
+            params = parse_qs(url.query)
+            page = int(params["page"][0])
+            per_page = int(params["per_page"][0])
+            etag = f'"{params["q"][0]}-{page}-{per_page}"'
+            if self.headers.get("If-None-Match") == etag:
+                with state.lock:
+                    state.not_modified += 1
+                self._send(304, headers=[("ETag", etag)])
+                return
+
+            start = (page - 1) * per_page
+            items = [{"name": f"file{i}.py", "path": f"src/file{i}.py"}
+                     for i in range(start, min(start + per_page, state.total))]
+            body = json.dumps({"total_count": state.total, "items": items}).encode()
+            self._send(200, body, [("Content-Type", "application/json"), ("ETag", etag),
+                                   ("X-RateLimit-Remaining", "29")])
+
+    return Handler
+
+def start_stub(state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+async def run(args) -> bool:
+    state = StubState(args.pages * args.per_page, args.latency / 1000)
+    server = start_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = GitHubCodeSearchClient(base_url=base_url, token="", response_cache=InMemoryCache())
+    sequential = GitHubCodeSearchClient(base_url=base_url, token="", response_cache=InMemoryCache(),
+                                        max_concurrent_pages=1)
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"  [{'ok' if ok else 'FAIL'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    try:
+        # The shared client stays open across agent calls, so the timed
+        # searches run on an already created client
+        for warm_client in (client, sequential):
+            await warm_client.search_code("warmup", per_page=1)
+        cold, items = await timed(client.search_code("stub", per_page=args.per_page, pages=args.pages))
+        serial, _ = await timed(sequential.search_code("serial", per_page=args.per_page, pages=args.pages))
+        warm, again = await timed(client.search_code("stub", per_page=args.per_page, pages=args.pages))
+
+        print(f"pages:          {args.pages} x {args.per_page} items, {args.latency:.0f} ms per request")
+        print(f"cold search:    {cold * 1000:.1f} ms (one page at a time: {serial * 1000:.1f} ms)")
+        print(f"warm search:    {warm * 1000:.1f} ms ({state.not_modified} not modified)")
+        check(len(items) == args.pages * args.per_page, f"cold search returned {len(items)} items")
+        check(again == items, "warm search returned the same items")
+        check(client.stats["not_modified"] == args.pages, f"{client.stats['not_modified']} pages revalidated with 304")
+        check(state.connections <= client.max_connections + sequential.max_connections,
+              f"{state.connections} connections for {state.requests} requests")
+
+        state.rate_limit_next = 1
+        waited, limited = await timed(client.search_code("limited", per_page=args.per_page))
+        print(f"rate limited:   {waited * 1000:.1f} ms including the Retry-After wait")
+        check(len(limited) == args.per_page and client.stats["rate_limited"] == 1,
+              "429 with Retry-After was waited out and retried")
+    finally:
+        await client.aclose()
+        await sequential.aclose()
+        server.shutdown()
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--per-page", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=50, help="stub latency per request, in ms")
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
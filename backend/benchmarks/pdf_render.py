@@ -0,0 +1,74 @@
+"""
+Benchmark PDF report rendering: pages per second and peak RSS.
+
+    python -m benchmarks.pdf_render --papers 5000
+    python -m benchmarks.pdf_render --papers 5000 --eager   # old list-based story
+
+Run each mode in a fresh process, since peak RSS is a process-wide high-water mark.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate
+
+from app.agents.pdf_generator import iter_report_flowables, render_report
+
+def make_sections(papers: int, sections: int):
+    per_section = max(1, papers // sections)
+    for s in range(sections):
+        yield {
+            "title": f"Section {s + 1}",
+            "content": "Findings for this section.\n\nSecond paragraph of notes.",
+            "data": [
+                {
+                    "title": f"Paper {s}-{i}: a study of scalable report rendering",
+                    "authors": ["A. Author", "B. Author", "C. Author"],
+                    "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 6,
+                }
+                for i in range(per_section)
+            ],
+        }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=2000)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--eager", action="store_true", help="materialize the whole story first")
+    args = parser.parse_args()
+
+    baseline_rss = peak_rss_mb()
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+
+    start = time.perf_counter()
+    try:
+        sections = make_sections(args.papers, args.sections)
+        if args.eager:
+            doc = SimpleDocTemplate(path, pagesize=letter, pageCompression=1)
+            doc.build(list(iter_report_flowables("Benchmark", sections, {"author": "bench"})))
+            pages = doc.page
+        else:
+            pages = render_report(path, "Benchmark", sections, {"author": "bench"})
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    finally:
+        os.unlink(path)
+
+    print(f"mode:          {'eager' if args.eager else 'lazy'}")
+    print(f"papers:        {args.papers}")
+    print(f"pages:         {pages}")
+    print(f"elapsed:       {elapsed:.2f}s")
+    print(f"pages/sec:     {pages / elapsed:.1f}")
+    print(f"pdf size:      {size / 1024:.0f} KiB")
+    print(f"peak RSS:      {peak_rss_mb():.1f} MiB (+{peak_rss_mb() - baseline_rss:.1f} during render)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Check RedisCache and TieredCache against an in-process Redis stand-in.
+
+    python -m benchmarks.redis_cache --keys 2000 --callers 50
+
+Runs on fakeredis (pip install fakeredis), so no Redis server is needed;
+several "workers" share one fake server the way processes share Redis.
+Reports the cost of single-key round trips against MGET / pipelined
+batches, and checks that get_or_compute is single-flight within and across
+workers, that an outage falls back to memory without stale values coming
+back from Redis afterwards, that a write on one worker drops the L1
+copy of another, and that an L1 copy expires with the Redis key it was
+read from. Exits non-zero if a check fails.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+try:
+    import fakeredis
+    from fakeredis import aioredis as fake_aioredis
+except ImportError:
+    sys.exit("This check needs fakeredis: pip install fakeredis")
+
+from app.core.broker import RedisBroker
+from app.core.cache import RedisCache, TieredCache
+
+failures = []
+
+def check(ok: bool, message: str):
+    print(f"  [{'ok' if ok else 'FAIL'}] {message}")
+    if not ok:
+        failures.append(message)
+
+def worker_cache(server) -> RedisCache:
+    return RedisCache(client=fake_aioredis.FakeRedis(server=server))
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+async def batching(server, keys: int):
+    cache = worker_cache(server)
+    items = {f"bench:{i}": f"value-{i}" for i in range(keys)}
+
+    async def one_by_one():
+        for key, value in items.items():
+            await cache.set(key, value)
+        return [await cache.get(key) for key in items]
+
+    single, values = await timed(one_by_one())
+    await cache.client.flushall()
+    batched_set, _ = await timed(cache.set_many(items))
+    batched_get, found = await timed(cache.get_many(list(items) + ["bench:missing"]))
+
+    print(f"single keys:    {single * 1000:.1f} ms for {keys} sets + {keys} gets")
+    print(f"batched:        {(batched_set + batched_get) * 1000:.1f} ms (set_many {batched_set * 1000:.1f} ms, get_many {batched_get * 1000:.1f} ms)")
+    check(values == list(items.values()), "single-key round trips return what was set")
+    check(found == items, "get_many returns the present keys only")
+    await cache.client.flushall()
+
+async def single_flight(server, callers: int):
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    first, second = worker_cache(server), worker_cache(server)
+    results = await asyncio.gather(*[
+        (first if i % 2 else second).get_or_compute("bench:computed", compute, ttl=60)
+        for i in range(callers)
+    ])
+    check(all(result == {"answer": 42} for result in results), f"{callers} callers got the computed value")
+    check(calls == 1, f"computed {calls} time(s) for {callers} callers on two workers")
+    coalesced = first.compute_stats["coalesced"] + second.compute_stats["coalesced"]
+    waits = first.compute_stats["lock_waits"] + second.compute_stats["lock_waits"]
+    print(f"single flight:  {coalesced} coalesced in process, {waits} waited on the other worker's lock")
+    await first.client.flushall()
+
+async def outage(server):
+    cache = worker_cache(server)
+    await cache.set("bench:generation", "1")
+    await cache.set("bench:token", "valid")
+
+    server.connected = False
+    await cache.set("bench:generation", "2")
+    await cache.delete("bench:token")
+    check(not cache.healthy, "cache switched to the fallback when Redis went away")
+    check(await cache.get("bench:generation") == "2", "fallback serves writes made during the outage")
+    journaled = cache.stats()["journaled_keys"]
+
+    server.connected = True
+    cache._retry_at = 0.0
+    generation = await cache.get("bench:generation")
+    token = await cache.get("bench:token")
+    check(cache.healthy, "cache went back to Redis after a successful probe")
+    check(journaled == 2 and cache.stats()["journaled_keys"] == 0, f"{journaled} journaled keys deleted in Redis on recovery")
+    check(generation is None and token is None, "values from before the outage don't come back")
+    await cache.client.flushall()
+
+async def invalidation(server):
+    workers = []
+    for _ in range(2):
+        client = fake_aioredis.FakeRedis(server=server)
+        tiered = TieredCache(RedisCache(client=client), broker=RedisBroker(client=fake_aioredis.FakeRedis(server=server)))
+        await tiered.start()
+        workers.append(tiered)
+    first, second = workers
+
+    await first.set("bench:shared", "v1")
+    check(await second.get("bench:shared") == "v1", "second worker reads the first worker's write")
+    received = second.invalidations_received
+    await first.set("bench:shared", "v2")
+    deadline = time.monotonic() + 2.0
+    while second.invalidations_received == received and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    check(await second.get("bench:shared") == "v2", "a write on one worker drops the other's L1 copy")
+
+    await first.l2.set("bench:short", "v", expire=2)
+    await second.get_many(["bench:short"])
+    expires_at = second.l1._cache["bench:short"][1]
+    check(expires_at is not None and expires_at - time.time() <= 2,
+          f"an L1 copy expires with its Redis key, not after the {second.l1_ttl}s L1 TTL")
+
+    for tiered in workers:
+        await tiered.close()
+        await tiered.broker.close()
+
+async def run(args) -> bool:
+    server = fakeredis.FakeServer()
+    await batching(server, args.keys)
+    await single_flight(server, args.callers)
+    await outage(server)
+    await invalidation(server)
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--callers", type=int, default=50)
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
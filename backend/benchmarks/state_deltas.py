@@ -0,0 +1,108 @@
+"""
+Benchmark bytes on the wire for a long research session.
+
+    python -m benchmarks.state_deltas --runs 10 --papers 20
+
+Replays a session of several executions on one thread, each followed by a
+get_history, and compares full node updates and full-state history (the
+previous protocol) against delta-encoded state patches (acked after every
+version) and a page of metadata-only history.
+Both are also shown after zlib compression, roughly what permessage-deflate
+does to each frame.
+"""
+import argparse
+import random
+import zlib
+
+from app.core.deltas import StateHistory, apply_patch
+from app.core.events import History, StatePatch, StateSnapshot, StateVersion
+from app.core.serialization import get_serializer
+from app.services.checkpoint_index import DEFAULT_PAGE_SIZE
+
+WORDS = ("graph neural network message passing attention node edge embedding "
+         "benchmark dataset training inference scalable sparse spectral convolution").split()
+
+def text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+def paper(run: int, i: int):
+    return {
+        "title": f"Paper {run}.{i}: {text(6)}",
+        "authors": ["A. Author", "B. Author", "C. Author"],
+        "summary": text(60),
+    }
+
+def session_steps(run: int, papers: int, state):
+    """Yield (node, update) for one execution, mutating `state` like the graph does."""
+    steps = [
+        ("planner", {"plan": {"steps": [{"id": "s1", "agent": "literature_search", "query": "gnn"}]},
+                     "messages": ["Created research plan with 2 steps"], "current_step": "planner"}),
+        ("literature_search", {"literature_results": [paper(run, i) for i in range(papers)],
+                               "messages": [f"Found {papers} papers"], "current_step": "literature_search"}),
+        ("code_search", {"code_results": [{"name": f"repo-{run}-{i}", "url": "https://github.com/x/y",
+                                           "description": text(15)} for i in range(papers // 2)],
+                         "messages": ["Found code repositories"], "current_step": "code_search"}),
+        ("summarizer", {"summary": text(400), "messages": ["Research summary completed"],
+                        "current_step": "summarizer"}),
+    ]
+    for node, update in steps:
+        state = dict(state)
+        for key, value in update.items():
+            state[key] = state.get(key, []) + value if key == "messages" else value
+        yield node, update, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--papers", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    serializer = get_serializer("json")
+    history = StateHistory(window=64)
+    totals = {"full": 0, "delta": 0, "full_deflate": 0, "delta_deflate": 0}
+
+    def count(kind, data):
+        totals[kind] += len(data.encode())
+        totals[kind + "_deflate"] += len(zlib.compress(data.encode()))
+
+    state = {"question": "graph neural networks", "messages": []}
+    checkpoints = []
+    client_doc, acked, version = None, None, 0
+    for run in range(args.runs):
+        for node, update, state in session_steps(run, args.papers, state):
+            version += 1
+            event = StateVersion("thread", node, version, update, state)
+            history.add(version, state)
+            count("full", event.legacy().encode(serializer))
+
+            if acked is None:
+                wire = StateSnapshot("thread", node, version, state)
+                client_doc = state
+            else:
+                wire = StatePatch("thread", node, acked, version, history.patch(acked, version))
+                client_doc = apply_patch(client_doc, wire.ops)
+            count("delta", wire.encode(serializer))
+            acked = version
+            checkpoints.insert(0, {"state": state, "step": version, "timestamp": ""})
+
+        count("full", serializer.dumps({"type": "history", "states": checkpoints}))
+        entries = [
+            {"step": c["step"], "checkpoint_id": f"cp-{c['step']}", "node": c["state"].get("current_step"),
+             "source": "loop", "timestamp": "", "size": len(serializer.dumps(c["state"])),
+             "message": c["state"]["messages"][-1]}
+            for c in checkpoints[:DEFAULT_PAGE_SIZE]
+        ]
+        count("delta", History(entries, None).encode(serializer))
+
+    assert client_doc == state, "patched client state diverged"
+    print(f"{args.runs} runs, {args.papers} papers per run, {version} state versions")
+    for label, full, delta in (
+        ("raw", totals["full"], totals["delta"]),
+        ("deflate", totals["full_deflate"], totals["delta_deflate"]),
+    ):
+        print(f"{label:<8} full {full / 1024:9.1f} KiB   delta {delta / 1024:8.1f} KiB   {full / delta:5.1f}x")
+    print(f"full/raw vs delta/deflate: {totals['full'] / totals['delta_deflate']:.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,639 @@
+"""
+Load-test concurrent WebSocket sessions against one worker.
+
+    python -m benchmarks.ws_load --sessions 200 --iterations 5
+    python -m benchmarks.ws_load --app workflows --sessions 100
+    python -m benchmarks.ws_load --sessions 500 --check --slo loop_lag_p99_ms=50
+
+Starts the app in a child process with an offline stub LLM (no API key or
+network needed), opens N concurrent sessions and runs a mix of scenarios
+on each: execute, get_history, rewind and update_and_continue on
+/ws/workflow, or execute on /ws/workflow/{id} with --app workflows (one
+seeded workflow per session, since every socket of a workflow sees its
+runs). Reports connection capacity, latency percentiles per operation,
+event delivery latency (server timestamp to client receipt, same host
+only), the server's event-loop lag and memory per open session.
+
+With --check the run fails (exit status 1) if any SLO is missed or could
+not be measured (shown as n/a), for catching regressions in CI; drop an SLO
+with --slo name=off, e.g. the server-side ones against --url. Raise the open file limit (ulimit -n) for
+more than a few hundred sessions.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Upper bounds; error_rate is a ratio, the rest milliseconds or KiB
+DEFAULT_SLOS = {
+    "connect_p95_ms": 500.0,
+    "request_p95_ms": 250.0,
+    "execute_ack_p95_ms": 500.0,
+    "event_delivery_p99_ms": 250.0,
+    "loop_lag_p99_ms": 100.0,
+    "memory_per_session_kb": 512.0,
+    "error_rate": 0.01,
+}
+
+# SLOs the workflows socket has nothing to measure for: it has no
+# request/reply operations, no execute ack and untimestamped events
+NOT_APPLICABLE = {
+    "workflows": ("request_p95_ms", "execute_ack_p95_ms", "event_delivery_p99_ms"),
+}
+
+# Operations whose latency counts towards request_p95_ms
+REQUESTS = ("get_history", "rewind")
+
+DEFAULT_MIX = "execute=3,get_history=3,rewind=1,update_and_continue=1"
+
+TOPICS = ("graph neural networks", "retrieval augmented generation", "protein folding",
+          "sparse attention", "federated learning", "diffusion models", "program synthesis",
+          "reinforcement learning from feedback", "vector databases", "speculative decoding")
+
+# --- Server side (child process) ---
+
+def stub_llm_class():
+    """An offline chat model answering the research graph's prompts with canned JSON."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class StubChatModel(BaseChatModel):
+        model_name: str = "stub"
+        latency: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        @staticmethod
+        def _respond(prompt: str) -> str:
+            if "research planning" in prompt:
+                return json.dumps({"steps": [
+                    {"id": "step1", "agent": "literature_search", "query": "papers", "description": "Find papers"},
+                    {"id": "step2", "agent": "code_search", "query": "code", "description": "Find code"},
+                ]})
+            if "literature search" in prompt:
+                return json.dumps([
+                    {"title": f"Paper {i}", "authors": ["A. Author", "B. Author"],
+                     "summary": "A study of the topic. " * 8}
+                    for i in range(3)
+                ])
+            if "code search" in prompt:
+                return json.dumps([
+                    {"name": f"repo-{i}", "url": f"https://github.com/example/repo-{i}",
+                     "description": "Reference implementation. " * 4}
+                    for i in range(3)
+                ])
+            return "Summary of the findings. " * 40
+
+        def _result(self, messages) -> ChatResult:
+            prompt = "\n".join(str(message.content) for message in messages)
+            text = self._respond(prompt)
+            usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+            usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+            message = AIMessage(content=text, usage_metadata=usage)
+            return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"model_name": self.model_name})
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._result(messages)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._result(messages)
+
+    return StubChatModel
+
+def install_stub_llm(latency: float):
+    from app.agents import planner, summarizer
+    from app.agents.llm_metrics import llm_metrics
+    from app.workflows import research_graph
+
+    StubChatModel = stub_llm_class()
+    research_graph.llm = StubChatModel(latency=latency, callbacks=[llm_metrics])
+    # Workflow agents build their model in __init__
+    make = lambda **kwargs: StubChatModel(latency=latency, callbacks=kwargs.get("callbacks"))
+    planner.ChatOpenAI = make
+    summarizer.ChatOpenAI = make
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class LoopMonitor:
+    """Samples how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=100_000)
+        self.peak_rss = 0
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+    def reset(self):
+        self.samples.clear()
+        self.peak_rss = rss_bytes()
+
+def seed_workflows(count: int) -> List[int]:
+    from app.core.database import SessionLocal, init_db
+    from app.models import User, Workflow
+    from app.services.workflow_graphs import store_graph
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(username="loadtest", email="loadtest@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+        graph_hash = store_graph(
+            db,
+            [
+                {"node_id": "start", "type": "start", "data": {}},
+                {"node_id": "summarize", "type": "agent", "data": {"agent": "summarizer", "config": {"cache": False}}},
+            ],
+            [{"source": "start", "target": "summarize"}, {"source": "summarize", "target": "end"}],
+        )
+        workflows = [Workflow(name=f"load {i}", user_id=user.id, graph_hash=graph_hash) for i in range(count)]
+        db.add_all(workflows)
+        db.commit()
+        return [workflow.id for workflow in workflows]
+    finally:
+        db.close()
+
+def serve(app_name: str, port: int, llm_latency: float, workflows: int, db_path: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-load-test")
+    import uvicorn
+
+    install_stub_llm(llm_latency)
+    if app_name == "workflows":
+        from app.core.security import create_access_token
+        from app.main import app
+        workflow_ids = seed_workflows(workflows)
+        token = create_access_token(data={"sub": "loadtest"})
+    else:
+        from app.main_simple import app
+        workflow_ids = []
+        token = None
+    from app.core.connections import manager
+
+    monitor = LoopMonitor()
+
+    @app.get("/bench/stats")
+    async def bench_stats(reset: bool = False):
+        if reset:
+            monitor.reset()
+        return {
+            "rss": rss_bytes(),
+            "peak_rss": monitor.peak_rss,
+            "loop_lag": list(monitor.samples),
+            "connections": len(manager.connections),
+            "workflow_ids": workflow_ids,
+            "token": token,
+        }
+
+    async def main():
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        monitor_task = asyncio.create_task(monitor.run())
+        try:
+            await server.serve()
+        finally:
+            monitor_task.cancel()
+
+    asyncio.run(main())
+
+# --- Client side ---
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+class Recorder:
+    """Latencies (ms) per operation, errors and how many sockets are open."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Counter = Counter()
+        self.operations = 0
+        self.attempted = 0
+        self.connected = 0
+        self.open = 0
+        self.peak_open = 0
+        self.finished = 0
+
+    def observe(self, operation: str, started: float):
+        self.latencies.setdefault(operation, []).append((time.perf_counter() - started) * 1000)
+
+    def error(self, kind: str):
+        self.errors[kind] += 1
+
+    def opened(self):
+        self.connected += 1
+        self.open += 1
+        self.peak_open = max(self.peak_open, self.open)
+
+    def closed(self):
+        self.open -= 1
+
+class Client:
+    """One socket; a reader task queues incoming messages and times event delivery."""
+
+    def __init__(self, websocket, recorder: Recorder, timeout: float):
+        self.websocket = websocket
+        self.recorder = recorder
+        self.timeout = timeout
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.history: List[Dict[str, Any]] = []
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for raw in self.websocket:
+                message = json.loads(raw)
+                stamp = message.get("timestamp")
+                if stamp and message.get("type") in ("node_update", "state_patch", "state_snapshot"):
+                    delay = time.time() - datetime.fromisoformat(stamp).timestamp()
+                    self.recorder.latencies.setdefault("event_delivery", []).append(max(0.0, delay * 1000))
+                await self.messages.put(message)
+        except Exception:
+            pass
+        await self.messages.put(None)
+
+    async def send(self, message: Dict[str, Any]):
+        await self.websocket.send(json.dumps(message))
+
+    async def expect(self, *types: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """The next message of one of `types` (or an error), skipping the rest."""
+        deadline = time.perf_counter() + (timeout or self.timeout)
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            message = await asyncio.wait_for(self.messages.get(), remaining)
+            if message is None:
+                raise ConnectionError("socket closed")
+            if message.get("type") in types or message.get("type") == "error" or message.get("status") in types:
+                return message
+
+    async def close(self):
+        self._reader.cancel()
+        await self.websocket.close()
+
+async def execute(client: Client, rng: random.Random):
+    topic = rng.choice(TOPICS)
+    started = time.perf_counter()
+    await client.send({"type": "execute", "question": f"What is new in {topic}? ({rng.randrange(10**6)})"})
+    message = await client.expect("execution_started")
+    if message.get("type") == "error":
+        client.recorder.error("execute")
+        return
+    client.recorder.observe("execute_ack", started)
+    message = await client.expect("execution_completed", timeout=client.timeout * 4)
+    if message.get("type") == "error":
+        client.recorder.error("execute")
+        return
+    client.recorder.observe("execute_run", started)
+
+async def get_history(client: Client, rng: random.Random):
+    started = time.perf_counter()
+    await client.send({"type": "get_history", "limit": 20})
+    message = await client.expect("history")
+    if message.get("type") == "error":
+        client.recorder.error("get_history")
+        return
+    client.recorder.observe("get_history", started)
+    client.history = message["entries"]
+
+async def rewind(client: Client, rng: random.Random):
+    if not client.history:
+        await get_history(client, rng)
+    steps = [entry["step"] for entry in client.history if entry.get("step") is not None and entry["step"] > 0]
+    if not steps:
+        return
+    started = time.perf_counter()
+    await client.send({"type": "rewind", "step": rng.choice(steps)})
+    message = await client.expect("rewound")
+    if message.get("type") == "error":
+        client.recorder.error("rewind")
+        return
+    client.recorder.observe("rewind", started)
+
+async def update_and_continue(client: Client, rng: random.Random):
+    """Edit the state and run whatever is left, timed until no node is pending."""
+    started = time.perf_counter()
+    await client.send({"type": "update_and_continue", "updates": {"summary": "Edited by the load test."}})
+    deadline = started + client.timeout * 4
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+        await client.send({"type": "get_state"})
+        message = await client.expect("current_state")
+        if message.get("type") == "error":
+            client.recorder.error("update_and_continue")
+            return
+        if not message.get("next"):
+            client.recorder.observe("update_and_continue", started)
+            return
+    client.recorder.error("update_and_continue")
+
+SCENARIOS = {
+    "execute": execute,
+    "get_history": get_history,
+    "rewind": rewind,
+    "update_and_continue": update_and_continue,
+}
+
+async def execute_workflow(client: Client, rng: random.Random):
+    started = time.perf_counter()
+    topic = rng.choice(TOPICS)
+    await client.send({"type": "execute", "input_data": {"content": f"Findings on {topic}. " * 20}})
+    message = await client.expect("completed", "failed", timeout=client.timeout * 4)
+    if message.get("status") != "completed":
+        # A run that fails measures nothing, so it counts as an error
+        client.recorder.error(f"workflow_{message.get('status') or message.get('type')}")
+        return
+    client.recorder.observe("execute_run", started)
+
+async def run_session(index: int, url: str, args, mix: Dict[str, float], recorder: Recorder,
+                      release: asyncio.Event):
+    rng = random.Random(args.seed + index)
+    await asyncio.sleep(args.ramp * index / max(1, args.sessions))
+    import websockets
+
+    recorder.attempted += 1
+    started = time.perf_counter()
+    client = None
+    try:
+        websocket = await websockets.connect(url, max_size=None, ping_interval=None, open_timeout=args.timeout)
+        client = Client(websocket, recorder, args.timeout)
+        if args.app == "research":
+            await client.expect("session")
+        recorder.observe("connect", started)
+        recorder.opened()
+
+        names, weights = zip(*mix.items())
+        for iteration in range(args.iterations):
+            if args.app == "workflows":
+                scenario = execute_workflow
+            elif iteration == 0:
+                # Everything else needs checkpoints to work on
+                scenario = execute
+            else:
+                scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            recorder.operations += 1
+            try:
+                await scenario(client, rng)
+            except asyncio.TimeoutError:
+                recorder.error(f"{scenario.__name__}_timeout")
+            await asyncio.sleep(rng.uniform(0, args.think))
+    except (ConnectionError, asyncio.TimeoutError, OSError) as e:
+        recorder.error("connect" if client is None else "disconnected")
+        if client is None:
+            print(f"session {index}: could not connect: {e!r}", file=sys.stderr)
+    except Exception as e:
+        recorder.error(type(e).__name__)
+    finally:
+        recorder.finished += 1
+        if client is not None:
+            # Sockets stay open until the server's memory has been measured
+            await release.wait()
+            recorder.closed()
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+async def fetch_stats(http_url: str, reset: bool = False) -> Optional[Dict[str, Any]]:
+    import httpx
+    try:
+        async with httpx.AsyncClient(timeout=10) as http:
+            response = await http.get(f"{http_url}/bench/stats", params={"reset": reset})
+            return response.json() if response.status_code == 200 else None
+    except httpx.HTTPError:
+        return None
+
+async def wait_for_server(http_url: str, process, timeout: float = 120.0) -> Dict[str, Any]:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and not process.is_alive():
+            raise RuntimeError("server process exited during startup")
+        stats = await fetch_stats(http_url)
+        if stats is not None:
+            return stats
+        await asyncio.sleep(0.25)
+    raise RuntimeError("server did not start")
+
+async def run_load(args, mix: Dict[str, float], http_url: str, ws_url: str, process) -> Dict[str, Any]:
+    stats = await wait_for_server(http_url, process) if process is not None else await fetch_stats(http_url)
+    workflow_ids = (stats or {}).get("workflow_ids") or ([args.workflow_id] * args.sessions if args.workflow_id else [])
+    token = (stats or {}).get("token") or args.token
+    if args.app == "workflows" and (len(workflow_ids) < args.sessions or not token):
+        raise SystemExit("--app workflows against --url needs --workflow-id and --token")
+
+    baseline = await fetch_stats(http_url, reset=True)
+    recorder = Recorder()
+    release = asyncio.Event()
+    started = time.perf_counter()
+    tasks = []
+    for index in range(args.sessions):
+        path = f"/ws/workflow/{workflow_ids[index]}?token={token}" if args.app == "workflows" else "/ws/workflow"
+        tasks.append(asyncio.create_task(run_session(index, ws_url + path, args, mix, recorder, release)))
+
+    while recorder.finished < args.sessions:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    loaded = await fetch_stats(http_url)
+    release.set()
+    await asyncio.gather(*tasks)
+    return build_report(args, recorder, elapsed, baseline, loaded)
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+def build_report(args, recorder: Recorder, elapsed: float, baseline, loaded) -> Dict[str, Any]:
+    latencies = {operation: summarize(values) for operation, values in sorted(recorder.latencies.items())}
+    requests = [value for operation in REQUESTS for value in recorder.latencies.get(operation, [])]
+    errors = sum(recorder.errors.values())
+    report = {
+        "app": args.app,
+        "sessions": args.sessions,
+        "elapsed_s": round(elapsed, 2),
+        "capacity": {
+            "attempted": recorder.attempted,
+            "connected": recorder.connected,
+            "peak_open": recorder.peak_open,
+        },
+        "operations": recorder.operations,
+        "errors": dict(recorder.errors),
+        "error_rate": errors / max(1, recorder.operations + recorder.attempted),
+        "latency_ms": latencies,
+        "request_ms": summarize(requests),
+    }
+    if baseline is not None and loaded is not None:
+        lag = [sample * 1000 for sample in loaded["loop_lag"]]
+        grown = max(loaded["rss"], loaded["peak_rss"]) - baseline["rss"]
+        report["server"] = {
+            "open_sockets": loaded["connections"],
+            "loop_lag_ms": summarize(lag),
+            "rss_mb": round(loaded["rss"] / 2**20, 1),
+            "memory_per_session_kb": round(grown / 1024 / max(1, recorder.connected), 1),
+        }
+    return report
+
+def check_slos(report: Dict[str, Any], slos: Dict[str, float]) -> List[Dict[str, Any]]:
+    latency = report["latency_ms"]
+    server = report.get("server", {})
+    measured = {
+        "connect_p95_ms": latency.get("connect", {}).get("p95"),
+        "request_p95_ms": report["request_ms"]["p95"],
+        "execute_ack_p95_ms": latency.get("execute_ack", {}).get("p95"),
+        "event_delivery_p99_ms": latency.get("event_delivery", {}).get("p99"),
+        "loop_lag_p99_ms": server.get("loop_lag_ms", {}).get("p99"),
+        "memory_per_session_kb": server.get("memory_per_session_kb"),
+        "error_rate": report["error_rate"],
+    }
+    results = []
+    for name, limit in slos.items():
+        value = measured.get(name)
+        results.append({
+            "slo": name,
+            "limit": limit,
+            "value": value,
+            # None when not measured (e.g. no server stats against --url)
+            "ok": None if value is None else value <= limit,
+        })
+    return results
+
+def print_report(report: Dict[str, Any], results: List[Dict[str, Any]]):
+    capacity = report["capacity"]
+    print(f"{report['app']}: {report['sessions']} sessions, {report['operations']} operations in {report['elapsed_s']}s")
+    print(f"connected {capacity['connected']}/{capacity['attempted']}, peak open {capacity['peak_open']}, "
+          f"error rate {report['error_rate']:.2%} {report['errors'] or ''}")
+
+    def row(label, stats):
+        values = " ".join(
+            f"{key} {stats[key]:8.1f}" if stats[key] is not None else f"{key} {'-':>8}"
+            for key in ("p50", "p95", "p99", "max")
+        )
+        print(f"  {label:<22} n={stats['count']:<6} {values}")
+
+    print("latency (ms)")
+    for operation, stats in report["latency_ms"].items():
+        row(operation, stats)
+    server = report.get("server")
+    if server:
+        row("event loop lag", server["loop_lag_ms"])
+        print(f"server rss {server['rss_mb']} MiB, {server['memory_per_session_kb']} KiB per session, "
+              f"{server['open_sockets']} sockets open at peak")
+    print("SLOs")
+    for result in results:
+        value = "-" if result["value"] is None else f"{result['value']:.3f}".rstrip("0").rstrip(".")
+        verdict = {True: "ok  ", False: "FAIL", None: "n/a "}[result["ok"]]
+        print(f"  {verdict} {result['slo']:<24} {value:>10} <= {result['limit']:g}")
+
+def parse_pairs(text: str) -> Dict[str, Optional[float]]:
+    pairs = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = None if value.strip() == "off" else float(value)
+    return pairs
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=("research", "workflows"), default="research")
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=4, help="scenarios run per session")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights (research app)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions connect")
+    parser.add_argument("--think", type=float, default=0.2, help="max pause between scenarios")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stub LLM call")
+    parser.add_argument("--url", help="target a running server (ws://host:port) instead of starting one")
+    parser.add_argument("--workflow-id", type=int, help="workflow to run with --app workflows --url")
+    parser.add_argument("--token", help="bearer token of the workflow's owner, with --app workflows --url")
+    parser.add_argument("--slo", action="append", default=[], help="override an SLO, e.g. request_p95_ms=100, or drop it with =off")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if an SLO is missed")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mix = {name: weight for name, weight in parse_pairs(args.mix).items() if weight is not None}
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+    slos: Dict[str, Optional[float]] = {
+        name: limit for name, limit in DEFAULT_SLOS.items() if name not in NOT_APPLICABLE.get(args.app, ())
+    }
+    for override in args.slo:
+        slos.update(parse_pairs(override))
+    slos = {name: limit for name, limit in slos.items() if limit is not None}
+
+    process = None
+    workdir = tempfile.TemporaryDirectory()
+    if args.url:
+        ws_url = args.url.rstrip("/")
+        http_url = "http" + ws_url[2:]
+    else:
+        port = free_port()
+        ws_url, http_url = f"ws://127.0.0.1:{port}", f"http://127.0.0.1:{port}"
+        process = multiprocessing.get_context("spawn").Process(
+            target=serve,
+            args=(args.app, port, args.llm_latency, args.sessions, os.path.join(workdir.name, "load.db")),
+            daemon=True,
+        )
+        process.start()
+
+    try:
+        report = asyncio.run(run_load(args, mix, http_url, ws_url, process))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join(10)
+        workdir.cleanup()
+
+    results = check_slos(report, slos)
+    report["slos"] = results
+    print_report(report, results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    # An SLO that wasn't measured can't be shown to hold
+    if args.check and not all(result["ok"] is True for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
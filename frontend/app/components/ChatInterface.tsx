@@ -31,11 +31,22 @@ export default function ChatInterface({ workflow, onWorkflowUpdate }: ChatInterf
     // Connect to WebSocket for real-time updates
     let ws: WebSocket | null = null;
     let reconnectTimeout: NodeJS.Timeout;
+    // Resume the same session after a reconnect; the server replays
+    // every event after its last seq while the run keeps going.
+    // Watched threads number their events on their own, so the cursor
+    // is kept per thread and only the session's own events are deduped
+    let resumeToken: string | null = null;
+    let sessionThreadId: string | null = null;
+    const lastSeqs: Record<string, number> = {};
     
     const connect = () => {
       if (ws?.readyState === WebSocket.OPEN) return;
       
-      ws = new WebSocket('ws://localhost:8000/ws/workflow');
+      const lastSeq = (sessionThreadId && lastSeqs[sessionThreadId]) || 0;
+      const query = resumeToken
+        ? `?resume=${encodeURIComponent(resumeToken)}&last_seq=${lastSeq}`
+        : '';
+      ws = new WebSocket(`ws://localhost:8000/ws/workflow${query}`);
       
       ws.onopen = () => {
         console.log('WebSocket connected');
@@ -45,6 +56,18 @@ export default function ChatInterface({ workflow, onWorkflowUpdate }: ChatInterf
         const data = JSON.parse(event.data);
         console.log('WebSocket message:', data);
         
+        if (data.type === 'session') {
+          resumeToken = data.resume_token;
+          sessionThreadId = data.thread_id;
+          if (!data.resumed) lastSeqs[data.thread_id] = 0;
+          return;
+        }
+        if (data.seq !== undefined) {
+          const threadId = data.thread_id ?? sessionThreadId;
+          if (threadId === sessionThreadId && data.seq <= (lastSeqs[threadId] || 0)) return;
+          lastSeqs[threadId] = Math.max(lastSeqs[threadId] || 0, data.seq);
+        }
+        
         if (data.type === 'node_update') {
           // Handle node updates
           const state = data.state;
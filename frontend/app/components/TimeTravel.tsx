@@ -10,12 +10,16 @@ interface TimeTravelProps {
 
 export default function TimeTravel({ wsRef, onStateUpdate }: TimeTravelProps) {
   const [history, setHistory] = useState<any[]>([]);
-  const [currentStep, setCurrentStep] = useState(0);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [currentStep, setCurrentStep] = useState<number | null>(null);
+  const [selectedState, setSelectedState] = useState<any>(null);
   const [isOpen, setIsOpen] = useState(false);
 
-  const fetchHistory = () => {
+  // History arrives in pages of checkpoint metadata, newest first; state
+  // values are only loaded when rewinding
+  const fetchHistory = (cursor: number | null = null) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
-      wsRef.current.send(JSON.stringify({ type: 'get_history' }));
+      wsRef.current.send(JSON.stringify({ type: 'get_history', cursor }));
     }
   };
 
@@ -43,8 +47,14 @@ export default function TimeTravel({ wsRef, onStateUpdate }: TimeTravelProps) {
     const handleMessage = (event: MessageEvent) => {
       const data = JSON.parse(event.data);
       if (data.type === 'history') {
-        setHistory(data.states);
+        setHistory((previous) => (
+          data.entries.length && previous.length && data.entries[0].step < previous[previous.length - 1].step
+            ? [...previous, ...data.entries]
+            : data.entries
+        ));
+        setNextCursor(data.next_cursor);
       } else if (data.type === 'rewound') {
+        setSelectedState(data.state);
         onStateUpdate(data.state);
       }
     };
@@ -82,29 +92,29 @@ export default function TimeTravel({ wsRef, onStateUpdate }: TimeTravelProps) {
               <p className="text-gray-500 text-sm">No history available</p>
             ) : (
               <div className="space-y-2">
-                {history.map((state, index) => (
+                {history.map((entry) => (
                   <div
-                    key={index}
+                    key={entry.checkpoint_id}
                     className={`p-3 rounded border cursor-pointer hover:bg-gray-50 ${
-                      index === currentStep ? 'border-blue-500 bg-blue-50' : 'border-gray-200'
+                      entry.step === currentStep ? 'border-blue-500 bg-blue-50' : 'border-gray-200'
                     }`}
-                    onClick={() => rewindToStep(index)}
+                    onClick={() => rewindToStep(entry.step)}
                   >
                     <div className="flex justify-between items-start">
                       <div>
                         <p className="font-medium text-sm">
-                          Step {index}: {state.state?.current_step || 'Unknown'}
+                          Step {entry.step}: {entry.node || 'Unknown'}
                         </p>
-                        {state.state?.messages?.length > 0 && (
+                        {entry.message && (
                           <p className="text-xs text-gray-600 mt-1">
-                            {state.state.messages[state.state.messages.length - 1]}
+                            {entry.message}
                           </p>
                         )}
                       </div>
                       <button
                         onClick={(e) => {
                           e.stopPropagation();
-                          rewindToStep(index);
+                          rewindToStep(entry.step);
                         }}
                         className="text-blue-500 hover:text-blue-700"
                       >
@@ -113,18 +123,25 @@ export default function TimeTravel({ wsRef, onStateUpdate }: TimeTravelProps) {
                     </div>
                   </div>
                 ))}
+                {nextCursor !== null && (
+                  <button
+                    onClick={() => fetchHistory(nextCursor)}
+                    className="w-full text-sm text-blue-500 hover:text-blue-700 py-1"
+                  >
+                    Load older steps
+                  </button>
+                )}
               </div>
             )}
           </div>
 
-          {history.length > 0 && (
+          {selectedState && (
             <div className="p-4 border-t border-gray-200">
               <button
                 onClick={() => {
-                  const currentState = history[currentStep];
                   // Example: modify the question and continue
                   updateAndContinue({
-                    question: currentState.state.question + " (modified)"
+                    question: selectedState.question + " (modified)"
                   });
                 }}
                 className="w-full bg-green-500 text-white py-2 rounded hover:bg-green-600 flex items-center justify-center gap-2"